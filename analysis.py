@@ -0,0 +1,322 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from board import Board
+from game_log import (RESULT_PLAYER1, RESULT_PLAYER2, STRATEGY_NAMES, GameLogReader, GameRecord,
+                      read_stream)
+from profiling import add_profile_arguments, profiled, single_process_when_profiling
+from tablebase import DRAW, LOSS, WIN, open_tablebase
+from tablebase import MAX_CELLS as TABLEBASE_MAX_CELLS
+
+# Analisi delle partite registrate, in streaming:
+#   decodifica -> replay su Board -> valutazione esatta di ogni mossa -> aggregazione
+# I record vengono raggruppati in blocchi e i blocchi distribuiti a un pool di processi; i blocchi
+# in volo sono limitati e i risultati escono nell'ordine di ingresso, quindi milioni di partite
+# (anche da stdin) usano memoria costante.
+#
+# Valutazione esatta: la tablebase del tabellone se è stata generata, altrimenti il risolutore
+# per il tris classico 3x3. Le partite su tabelloni senza valutazione esatta vengono contate
+# come non valutate.
+#
+# Per ogni mossa si confronta l'esito con gioco perfetto della mossa giocata con il migliore
+# disponibile: "missed_win" = c'era una vittoria forzata e la mossa porta al pareggio,
+# "blunder" = la posizione non era persa e la mossa porta alla sconfitta. Nelle statistiche una
+# vittoria forzata persa conta come mancata anche quando la mossa porta alla sconfitta.
+
+OUTCOME_NAMES = {WIN: "win", DRAW: "draw", LOSS: "loss"}
+_RANK = {LOSS: 0, DRAW: 1, WIN: 2}
+
+
+@dataclass
+class StrategyAccuracy:
+    moves: int = 0
+    critical: int = 0         # posizioni in cui non tutte le mosse hanno lo stesso esito
+    optimal_critical: int = 0
+    winning: int = 0          # posizioni con una vittoria forzata
+    missed_wins: int = 0
+    not_lost: int = 0         # posizioni non perse con gioco perfetto
+    blunders: int = 0
+
+    def merge(self, other: "StrategyAccuracy") -> None:
+        for name in self.__dataclass_fields__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def summary(self) -> str:
+        def rate(part: int, whole: int) -> str:
+            return f"{part / whole:6.1%}" if whole else "     -"
+        return (f"moves={self.moves:<9d} accuracy={rate(self.optimal_critical, self.critical)} "
+                f"missed_wins={rate(self.missed_wins, self.winning)} ({self.missed_wins}/{self.winning}) "
+                f"blunders={rate(self.blunders, self.not_lost)} ({self.blunders}/{self.not_lost})")
+
+
+@dataclass
+class AnalysisStats:
+    games: int = 0
+    scored: int = 0
+    unscored: int = 0         # tabellone senza valutazione esatta
+    invalid: int = 0          # mosse illegali o risultato incoerente con le mosse
+    annotated: int = 0        # partite con almeno un errore
+    strategies: Dict[str, StrategyAccuracy] = field(default_factory=dict)
+
+    def merge(self, other: "AnalysisStats") -> None:
+        self.games += other.games
+        self.scored += other.scored
+        self.unscored += other.unscored
+        self.invalid += other.invalid
+        self.annotated += other.annotated
+        for name, accuracy in other.strategies.items():
+            self.strategies.setdefault(name, StrategyAccuracy()).merge(accuracy)
+
+    def summary(self) -> str:
+        return (f"games={self.games} scored={self.scored} unscored={self.unscored} invalid={self.invalid} "
+                f"with_errors={self.annotated}")
+
+
+class ExactEvaluator:
+    # Esito con gioco perfetto di ogni mossa legale, dal punto di vista di chi muove.
+    # Le posizioni si ripetono moltissimo fra le partite: i risultati restano in una cache LRU per
+    # processo, compatta (una voce = un intero con 2 bit per cella) e di dimensione limitata.
+    def __init__(self, dims: Tuple[int, int, int], tablebase_dir: Optional[str] = None,
+                 cache_size: int = 1 << 16) -> None:
+        width, height, win_length = dims
+        self._cells = width * height
+        self._tablebase = (open_tablebase(width, height, win_length, tablebase_dir)
+                           if self._cells <= TABLEBASE_MAX_CELLS else None)
+        self._use_solver = self._tablebase is None and dims == (3, 3, 3)
+        self._powers = [3 ** i for i in range(self._cells)]
+        self._cache: "OrderedDict[int, int]" = OrderedDict()
+        self._cache_size = cache_size
+
+    @property
+    def available(self) -> bool:
+        return self._tablebase is not None or self._use_solver
+
+    def outcomes(self, mine: int, theirs: int) -> Dict[int, int]:
+        # mine/theirs: bit delle pietre di chi muove e dell'avversario; risultato: cella -> esito
+        key = mine << self._cells | theirs
+        packed = self._cache.get(key)
+        if packed is None:
+            packed = self._cache[key] = self._solve(mine, theirs)
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return {cell: packed >> 2 * cell & 3 for cell in range(self._cells) if packed >> 2 * cell & 3}
+
+    def _solve(self, mine: int, theirs: int) -> int:
+        # Esiti delle celle libere su 2 bit ciascuno; 0 (UNKNOWN) per le celle occupate
+        empty = [cell for cell in range(self._cells) if not (mine | theirs) >> cell & 1]
+        packed = 0
+        if self._use_solver:
+            import solver
+            for cell in empty:
+                score = -solver.evaluate(theirs, mine | 1 << cell)
+                packed |= (WIN if score > 0 else LOSS if score < 0 else DRAW) << 2 * cell
+            return packed
+        # Dopo la mossa muove l'avversario: cifra 1 per le sue pietre, 2 per le nostre
+        base = sum(self._powers[cell] * (1 if theirs >> cell & 1 else 2 if mine >> cell & 1 else 0)
+                   for cell in range(self._cells))
+        for cell in empty:
+            value, _ = self._tablebase.probe_index(base + 2 * self._powers[cell])
+            packed |= (WIN if value == LOSS else LOSS if value == WIN else value) << 2 * cell
+        return packed
+
+
+_evaluators: Dict[Tuple[Tuple[int, int, int], Optional[str]], ExactEvaluator] = {}
+
+
+def _evaluator(dims: Tuple[int, int, int], tablebase_dir: Optional[str]) -> ExactEvaluator:
+    key = (dims, tablebase_dir)
+    if key not in _evaluators:
+        _evaluators[key] = ExactEvaluator(dims, tablebase_dir)
+    return _evaluators[key]
+
+
+# --- Stadi della pipeline ---
+
+def replay(record: GameRecord) -> Iterator[Tuple[int, int, int, int]]:
+    # Rigioca la partita su Board: per ogni mossa (giocatore 1 o 2, cella, pietre di chi muove,
+    # pietre dell'avversario) prima della mossa. ValueError se una mossa è illegale.
+    board = Board(record.width, record.height, record.win_length)
+    players = (2, 1) if record.player2_started else (1, 2)
+    stones = {1: 0, 2: 0}
+    for ply, (row, col) in enumerate(record.moves):
+        player = players[ply % 2]
+        other = 3 - player
+        if board.check_winner("X") or board.check_winner("O") or not board.make_move(row, col, "X" if player == 1 else "O"):
+            raise ValueError(f"mossa {ply + 1} illegale: {(row, col)}")
+        cell = row * record.width + col
+        yield player, cell, stones[player], stones[other]
+        stones[player] |= 1 << cell
+    winner = 1 if board.check_winner("X") else 2 if board.check_winner("O") else None
+    expected = {RESULT_PLAYER1: 1, RESULT_PLAYER2: 2}.get(record.result)
+    if winner != expected or (winner is None and not board.is_full()):
+        raise ValueError("il risultato registrato non corrisponde alle mosse")
+
+
+def score(record: GameRecord, evaluator: ExactEvaluator) -> Iterator[dict]:
+    # Una valutazione per mossa: esito della mossa giocata, esito migliore e mosse migliori
+    width = record.width
+    for ply, (player, cell, mine, theirs) in enumerate(replay(record)):
+        outcomes = evaluator.outcomes(mine, theirs)
+        played = outcomes[cell]
+        best = max(outcomes.values(), key=_RANK.get)
+        yield {
+            "ply": ply + 1,
+            "player": player,
+            "strategy": STRATEGY_NAMES.get(record.strategy1 if player == 1 else record.strategy2, "unknown"),
+            "move": divmod(cell, width),
+            "played": played,
+            "best": best,
+            "best_moves": [divmod(c, width) for c, outcome in outcomes.items() if outcome == best],
+            "critical": len(set(outcomes.values())) > 1,
+        }
+
+
+def analyze_chunk(start: int, records: List[GameRecord], tablebase_dir: Optional[str] = None,
+                  all_games: bool = False) -> Tuple[AnalysisStats, List[dict]]:
+    # Eseguita nei processi del pool: statistiche del blocco e annotazioni delle sue partite
+    stats = AnalysisStats()
+    annotations: List[dict] = []
+    for index, record in enumerate(records, start):
+        stats.games += 1
+        evaluator = _evaluator((record.width, record.height, record.win_length), tablebase_dir)
+        if not evaluator.available:
+            stats.unscored += 1
+            continue
+        try:
+            scored = list(score(record, evaluator))
+        except ValueError as e:
+            stats.invalid += 1
+            annotations.append({"game": index, "error": str(e)})
+            continue
+        stats.scored += 1
+        errors = []
+        for move in scored:
+            accuracy = stats.strategies.setdefault(move["strategy"], StrategyAccuracy())
+            accuracy.moves += 1
+            played, best = move["played"], move["best"]
+            if move["critical"]:
+                accuracy.critical += 1
+                accuracy.optimal_critical += played == best
+            if best == WIN:
+                accuracy.winning += 1
+            if best != LOSS:
+                accuracy.not_lost += 1
+            # Da vinta a persa conta in entrambe le statistiche; l'annotazione è "blunder"
+            if best == WIN and played != WIN:
+                accuracy.missed_wins += 1
+            if played == LOSS and best != LOSS:
+                accuracy.blunders += 1
+                errors.append(_annotation(move, "blunder"))
+            elif played == DRAW and best == WIN:
+                errors.append(_annotation(move, "missed_win"))
+        if errors:
+            stats.annotated += 1
+        if errors or all_games:
+            annotations.append({"game": index, "size": f"{record.width}x{record.height}x{record.win_length}",
+                                "strategies": [STRATEGY_NAMES.get(record.strategy1, "unknown"),
+                                               STRATEGY_NAMES.get(record.strategy2, "unknown")],
+                                "result": {RESULT_PLAYER1: "player1", RESULT_PLAYER2: "player2"}.get(record.result, "draw"),
+                                "errors": errors})
+    return stats, annotations
+
+
+def _annotation(move: dict, kind: str) -> dict:
+    return {"ply": move["ply"], "player": move["player"], "strategy": move["strategy"], "kind": kind,
+            "move": list(move["move"]), "before": OUTCOME_NAMES[move["best"]], "after": OUTCOME_NAMES[move["played"]],
+            "best_moves": [list(m) for m in move["best_moves"]]}
+
+
+def chunked(records: Iterable[GameRecord], size: int) -> Iterator[Tuple[int, List[GameRecord]]]:
+    iterator = iter(records)
+    start = 0
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def analyze(records: Iterable[GameRecord], workers: Optional[int] = None, chunk_size: int = 2000,
+            tablebase_dir: Optional[str] = None,
+            all_games: bool = False) -> Iterator[Tuple[AnalysisStats, List[dict]]]:
+    # Restituisce, blocco per blocco e nell'ordine di ingresso, le statistiche aggregate fin lì
+    # e le annotazioni del blocco
+    workers = workers or os.cpu_count() or 1
+    total = AnalysisStats()
+    chunks = chunked(records, chunk_size)
+
+    if workers == 1:
+        for start, chunk in chunks:
+            stats, annotations = analyze_chunk(start, chunk, tablebase_dir, all_games)
+            total.merge(stats)
+            yield total, annotations
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future] = deque()
+        for start, chunk in itertools.chain(chunks, [(None, None)]):
+            if chunk is not None:
+                pending.append(executor.submit(analyze_chunk, start, chunk, tablebase_dir, all_games))
+            # Al massimo due blocchi in volo per worker; si attende sempre il più vecchio
+            while pending and (len(pending) >= workers * 2 or chunk is None):
+                stats, annotations = pending.popleft().result()
+                total.merge(stats)
+                yield total, annotations
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Analisi delle partite registrate: errori e precisione per strategia.")
+    parser.add_argument("paths", nargs="*", help="segmenti .tlog o cartelle; '-' o nessuno per leggere da stdin")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=2000, help="partite per blocco inviato ai worker")
+    parser.add_argument("--annotations", metavar="PATH",
+                        help="scrive le annotazioni in JSON a righe ('-' per stdout)")
+    parser.add_argument("--all-games", action="store_true", help="annota anche le partite senza errori")
+    parser.add_argument("--tablebase-dir", default=None, help="cartella delle tablebase (default: TABLEBASE_DIR o tablebases/)")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    single_process_when_profiling(args)
+
+    if not args.paths or args.paths == ["-"]:
+        records: Iterable[GameRecord] = read_stream(sys.stdin.buffer)
+    else:
+        records = GameLogReader(args.paths)
+    output = None
+    if args.annotations == "-":
+        output = sys.stdout
+    elif args.annotations:
+        output = open(args.annotations, "w", encoding="utf-8")
+    report = sys.stderr if output is sys.stdout else sys.stdout
+
+    start = time.perf_counter()
+    stats = AnalysisStats()
+    try:
+        with profiled(args.profile, args.profile_top):
+            for stats, annotations in analyze(records, args.workers, args.chunk_size, args.tablebase_dir,
+                                              args.all_games):
+                if output is not None:
+                    for annotation in annotations:
+                        output.write(json.dumps(annotation) + "\n")
+                elapsed = time.perf_counter() - start
+                print(f"[{elapsed:7.2f}s] {stats.summary()} ({stats.games / elapsed:.0f} games/s)", file=sys.stderr)
+    finally:
+        if output is not None and output is not sys.stdout:
+            output.close()
+
+    print(stats.summary(), file=report)
+    for name, accuracy in sorted(stats.strategies.items()):
+        print(f"{name:24s} {accuracy.summary()}", file=report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import threading
+from typing import Iterable, NamedTuple, Optional, Tuple
+import numpy as np
+from board import Board, winning_lines
+from constants import AI_SYMBOL, EMPTY_CELL, HUMAN_SYMBOL
+
+# Valutazione vettoriale di molte posizioni 3x3 alla volta.
+#
+# Una posizione è una riga di 9 celle (indice = riga * 3 + colonna) con 0 = vuota,
+# 1 = HUMAN_SYMBOL, 2 = AI_SYMBOL; oppure il suo codice in base 3, con la cella 0 come cifra
+# meno significativa. Le posizioni possibili sono solo 3^9 = 19683: tutto viene precalcolato
+# una volta in tabelle indicizzate dal codice e una valutazione diventa una lettura per posizione.
+
+CELLS: int = 9
+POSITIONS: int = 3 ** CELLS
+CELL_EMPTY, CELL_X, CELL_O = 0, 1, 2
+SYMBOL_CODES = {EMPTY_CELL: CELL_EMPTY, HUMAN_SYMBOL: CELL_X, AI_SYMBOL: CELL_O}
+
+LINES = np.array(winning_lines(3, 3, 3), dtype=np.intp)  # (8, 3): righe, colonne, diagonali
+
+_POWERS = (3 ** np.arange(CELLS)).astype(np.int32)
+_BITS = (1 << np.arange(CELLS)).astype(np.uint16)
+# Per ogni maschera a 9 bit la prima cella (in ordine di riga) presente, -1 se vuota
+_FIRST_CELL = np.array([(mask & -mask).bit_length() - 1 for mask in range(1 << CELLS)], dtype=np.int8)
+
+
+class _Tables(NamedTuple):
+    x_wins: np.ndarray   # bool: HUMAN_SYMBOL ha un tris
+    o_wins: np.ndarray   # bool: AI_SYMBOL ha un tris
+    full: np.ndarray     # bool: nessuna cella vuota
+    legal: np.ndarray    # uint16: bit i = cella i libera
+    win_x: np.ndarray    # uint16: celle libere che danno il tris a HUMAN_SYMBOL
+    win_o: np.ndarray    # uint16: celle libere che danno il tris ad AI_SYMBOL
+
+
+_tables: Optional[_Tables] = None
+_tables_lock = threading.Lock()
+
+
+def decode(codes: np.ndarray) -> np.ndarray:
+    codes = np.asarray(codes, dtype=np.int32)
+    return ((codes[:, None] // _POWERS) % 3).astype(np.int8)
+
+
+def encode(cells: np.ndarray) -> np.ndarray:
+    cells = np.asarray(cells)
+    if cells.ndim != 2 or cells.shape[1] != CELLS:
+        raise ValueError(f"Servono posizioni di forma (N, {CELLS}), ricevuto {cells.shape}.")
+    # Un valore fuori da 0-2 darebbe silenziosamente il codice di un'altra posizione
+    if not np.issubdtype(cells.dtype, np.integer) or cells.size and (cells.min() < CELL_EMPTY or cells.max() > max(CELL_X, CELL_O)):
+        raise ValueError(f"Le celle devono valere {CELL_EMPTY} (vuota), {CELL_X} o {CELL_O}.")
+    return cells.astype(np.int32) @ _POWERS
+
+
+def boards_to_array(boards: Iterable[Board]) -> np.ndarray:
+    # Da oggetti Board (3x3) alla matrice (N, 9) int8
+    rows = []
+    for board in boards:
+        if (board.get_width(), board.get_height(), board.get_win_length()) != (3, 3, 3):
+            raise ValueError("La valutazione vettoriale supporta solo il tabellone 3x3 con tris da 3.")
+        rows.append([SYMBOL_CODES[cell] for row in board.get_grid() for cell in row])
+    return np.array(rows, dtype=np.int8).reshape(-1, CELLS)
+
+
+def _line_winning_cells(lines: np.ndarray, player: int) -> np.ndarray:
+    # Per ogni linea con due pietre del giocatore e una cella vuota, il bit della cella vuota
+    almost = ((lines == player).sum(axis=2) == 2) & ((lines == CELL_EMPTY).sum(axis=2) == 1)
+    hits = almost[:, :, None] & (lines == CELL_EMPTY)
+    masks = np.where(hits, _BITS[LINES][None, :, :], 0)
+    return np.bitwise_or.reduce(masks.reshape(len(lines), -1), axis=1).astype(np.uint16)
+
+
+def _build_tables() -> _Tables:
+    cells = decode(np.arange(POSITIONS))
+    lines = cells[:, LINES]  # (19683, 8, 3)
+    empty = cells == CELL_EMPTY
+    return _Tables(
+        x_wins=(lines == CELL_X).all(axis=2).any(axis=1),
+        o_wins=(lines == CELL_O).all(axis=2).any(axis=1),
+        full=~empty.any(axis=1),
+        legal=(empty * _BITS).sum(axis=1).astype(np.uint16),
+        win_x=_line_winning_cells(lines, CELL_X),
+        win_o=_line_winning_cells(lines, CELL_O),
+    )
+
+
+def get_tables() -> _Tables:
+    global _tables
+    if _tables is None:
+        with _tables_lock:
+            if _tables is None:
+                tables = _build_tables()
+                for table in tables:
+                    table.flags.writeable = False
+                _tables = tables
+    return _tables
+
+
+def as_codes(positions: np.ndarray) -> np.ndarray:
+    # Accetta posizioni (N, 9) oppure codici in base 3 (N,)
+    positions = np.asarray(positions)
+    if positions.ndim == 2:
+        return encode(positions)
+    if positions.ndim != 1:
+        raise ValueError(f"Servono posizioni (N, {CELLS}) o codici (N,), ricevuto {positions.shape}.")
+    if positions.size and (positions.min() < 0 or positions.max() >= POSITIONS):
+        raise ValueError(f"I codici devono stare in [0, {POSITIONS}).")
+    return positions.astype(np.int32, copy=False)
+
+
+def unpack_mask(masks: np.ndarray) -> np.ndarray:
+    # Da maschere a bit (N,) a matrici booleane (N, 9)
+    return (masks[:, None] & _BITS) != 0
+
+
+class BatchEvaluation(NamedTuple):
+    x_wins: np.ndarray  # (N,) come Board.check_winner(HUMAN_SYMBOL)
+    o_wins: np.ndarray  # (N,) come Board.check_winner(AI_SYMBOL)
+    winner: np.ndarray  # (N,) int8: 0 nessuno, 1 HUMAN_SYMBOL, 2 AI_SYMBOL (X prima, come Game.check_game_over)
+    full: np.ndarray    # (N,) come Board.is_full()
+    draw: np.ndarray    # (N,) tabellone pieno senza tris
+    legal: np.ndarray   # (N, 9) celle libere
+    win_x: np.ndarray   # (N, 9) celle che danno subito il tris a HUMAN_SYMBOL
+    win_o: np.ndarray   # (N, 9) celle che danno subito il tris ad AI_SYMBOL
+
+
+def evaluate(positions: np.ndarray) -> BatchEvaluation:
+    tables = get_tables()
+    codes = as_codes(positions)
+    x_wins = tables.x_wins[codes]
+    o_wins = tables.o_wins[codes]
+    full = tables.full[codes]
+    winner = np.where(x_wins, CELL_X, np.where(o_wins, CELL_O, CELL_EMPTY)).astype(np.int8)
+    return BatchEvaluation(
+        x_wins=x_wins,
+        o_wins=o_wins,
+        winner=winner,
+        full=full,
+        draw=full & ~x_wins & ~o_wins,
+        legal=unpack_mask(tables.legal[codes]),
+        win_x=unpack_mask(tables.win_x[codes]),
+        win_o=unpack_mask(tables.win_o[codes]),
+    )
+
+
+def tactical_moves(positions: np.ndarray, symbol: str) -> Tuple[np.ndarray, np.ndarray]:
+    # Le mosse cercate da MediumMoveStrategy per chi gioca symbol: la prima cella (in ordine di
+    # riga) che vince subito e la prima che blocca il tris avversario; -1 se non ce ne sono
+    tables = get_tables()
+    codes = as_codes(positions)
+    if symbol == HUMAN_SYMBOL:
+        mine, theirs = tables.win_x[codes], tables.win_o[codes]
+    elif symbol == AI_SYMBOL:
+        mine, theirs = tables.win_o[codes], tables.win_x[codes]
+    else:
+        raise ValueError(f"Simbolo sconosciuto: {symbol!r}")
+    return _FIRST_CELL[mine], _FIRST_CELL[theirs]
+
+
+def medium_moves(positions: np.ndarray, symbol: str) -> np.ndarray:
+    # Mossa deterministica di MediumMoveStrategy (vincere, altrimenti bloccare); -1 dove
+    # la strategia sceglierebbe a caso
+    win, block = tactical_moves(positions, symbol)
+    return np.where(win >= 0, win, block)
@@ -0,0 +1,213 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+from typing import Callable, Dict, List, Optional, Tuple
+from bitboard import BitBoard
+from board import Board
+from bot_player import BotPlayer, EasyMoveStrategy, HardMoveStrategy, MediumMoveStrategy, MoveStrategy
+from constants import AI_SYMBOL, HUMAN_SYMBOL
+from game import Game
+from observer import Observer
+from ollama_cache import OllamaMoveCache
+from ollama_stub import OllamaStub
+from profiling import add_profile_arguments, profiled
+
+# Posizioni rappresentative come sequenze di mosse (X e O si alternano partendo da X)
+POSITIONS: Dict[str, List[Tuple[int, int]]] = {
+    "empty": [],
+    "midgame": [(1, 1), (0, 0), (0, 2), (2, 0)],
+    "x_wins": [(0, 0), (1, 0), (0, 1), (1, 1), (0, 2)],
+    "full_draw": [(0, 0), (1, 1), (0, 2), (0, 1), (2, 1), (1, 0), (1, 2), (2, 2), (2, 0)],
+}
+
+
+def build_board(board_class: type, moves: List[Tuple[int, int]]) -> Board:
+    board = board_class()
+    for turn, (r, c) in enumerate(moves):
+        board.make_move(r, c, HUMAN_SYMBOL if turn % 2 == 0 else AI_SYMBOL)
+    return board
+
+
+class _CountingObserver(Observer):
+    def __init__(self) -> None:
+        self.updates = 0
+
+    def update(self, subject, event) -> None:
+        self.updates += 1
+
+
+def board_benchmarks() -> Dict[str, Callable[[], object]]:
+    cases: Dict[str, Callable[[], object]] = {}
+    for board_class in (Board, BitBoard):
+        prefix = f"board.{board_class.__name__}"
+        for name, moves in POSITIONS.items():
+            board = build_board(board_class, moves)
+            cases[f"{prefix}.check_winner[{name}]"] = lambda b=board: b.check_winner(HUMAN_SYMBOL)
+            cases[f"{prefix}.is_full[{name}]"] = board.is_full
+        fill_moves = POSITIONS["full_draw"]
+        board = board_class()
+
+        def fill(b=board) -> None:
+            for turn, (r, c) in enumerate(fill_moves):
+                b.make_move(r, c, HUMAN_SYMBOL if turn % 2 == 0 else AI_SYMBOL)
+            b.reset()
+        cases[f"{prefix}.make_move[x9+reset]"] = fill
+        midgame = build_board(board_class, POSITIONS["midgame"])
+
+        def push_pop(b=midgame) -> None:
+            for r, c in b.get_available_moves():
+                b.push(r, c, AI_SYMBOL)
+                b.pop()
+        cases[f"{prefix}.push+pop[midgame x5]"] = push_pop
+    return cases
+
+
+def strategy_benchmarks(stub_url: str) -> Dict[str, Callable[[], object]]:
+    strategies: Dict[str, MoveStrategy] = {
+        "easy": EasyMoveStrategy(),
+        "medium": MediumMoveStrategy(),
+        "hard[stub]": HardMoveStrategy(),
+    }
+    # Le strategie aggiunte dopo vivono in moduli propri: si misurano con budget ridotti
+    from mcts import MCTSMoveStrategy
+    from search import AlphaBetaMoveStrategy
+    from solver import PerfectMoveStrategy
+    strategies["perfect"] = PerfectMoveStrategy()
+    strategies["alphabeta[depth=4]"] = AlphaBetaMoveStrategy(time_budget=10.0, max_depth=4)
+    strategies["mcts[200 playouts]"] = MCTSMoveStrategy(playouts=200, workers=1)
+
+    cases: Dict[str, Callable[[], object]] = {}
+    for name, strategy in strategies.items():
+        # Cache che non ricorda nulla: ogni chiamata di hard[stub] fa il giro HTTP, e le risposte
+        # dello stub non finiscono nella cache del processo (né su disco con OLLAMA_MOVE_CACHE)
+        bot = BotPlayer("Bot", AI_SYMBOL, strategy=strategy, move_cache=OllamaMoveCache(max_size=0))
+        bot._ollama_url = stub_url
+        for position in ("empty", "midgame"):
+            board = build_board(Board, POSITIONS[position])
+            cases[f"strategy.{name}.get_move[{position}]"] = lambda s=strategy, b=board, p=bot: s.get_move(b, p)
+    return cases
+
+
+def game_benchmarks() -> Dict[str, Callable[[], object]]:
+    cases: Dict[str, Callable[[], object]] = {}
+    for difficulty in ("facile", "medio"):
+        board = Board()
+        game = Game(BotPlayer("A", HUMAN_SYMBOL, difficulty),
+                    BotPlayer("B", AI_SYMBOL, difficulty), board, random.Random(0))
+        game.attach(_CountingObserver())
+
+        def full_game(g=game) -> None:
+            g.board.reset()
+            g.initialize_turn()
+            while True:
+                current = g.current_player_obj
+                move = current.make_move(g.board)
+                g.play_move(*move)  # include le notifiche agli observer
+                if g.is_over():
+                    return
+        cases[f"game.full_cycle[{difficulty}]"] = full_game
+    return cases
+
+
+def batch_benchmarks() -> Dict[str, Callable[[], object]]:
+    # Valutazione vettoriale: 100k posizioni casuali a chiamata, per confrontare con i casi board.*
+    import numpy as np
+    import batch_eval
+    batch_eval.get_tables()
+    cells = np.random.default_rng(0).integers(0, 3, size=(100_000, batch_eval.CELLS), dtype=np.int8)
+    codes = batch_eval.encode(cells)
+    return {
+        "batch.evaluate[100k cells]": lambda: batch_eval.evaluate(cells),
+        "batch.evaluate[100k codes]": lambda: batch_eval.evaluate(codes),
+        "batch.medium_moves[100k codes]": lambda: batch_eval.medium_moves(codes, AI_SYMBOL),
+    }
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()  # numero di chiamate per campione (almeno 0.2 s)
+    samples = [total / number * 1e9 for total in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min_ns": min(samples),
+        "median_ns": statistics.median(samples),
+        "mean_ns": statistics.fmean(samples),
+        "stdev_ns": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    regressions: List[str] = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]["median_ns"]
+        after = result["median_ns"]
+        change = (after - before) / before if before else 0.0
+        marker = "REGRESSION" if change > threshold else ""
+        print(f"{name:60s} {before:12.0f} -> {after:12.0f} ns ({change:+.1%}) {marker}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark di Board, strategie e ciclo di gioco.")
+    parser.add_argument("--filter", default="", help="esegue solo i benchmark che contengono questa stringa")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="salva i risultati in questo file JSON")
+    parser.add_argument("--compare", help="file JSON di una esecuzione precedente da confrontare")
+    parser.add_argument("--threshold", type=float, default=0.10, help="peggioramento massimo tollerato (0.10 = 10%%)")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    results: Dict[str, Dict[str, float]] = {}
+    # Con --profile i tempi misurati includono il costo del profilatore: non confrontarli con --compare
+    with profiled(args.profile, args.profile_top), OllamaStub() as stub:
+        cases = {**board_benchmarks(), **strategy_benchmarks(stub.generate_url), **game_benchmarks(),
+                 **batch_benchmarks()}
+        for name, fn in cases.items():
+            if args.filter not in name:
+                continue
+            results[name] = measure(fn, args.repeat, args.warmup)
+            print(f"{name:60s} {results[name]['median_ns']:12.0f} ns/op", file=sys.stderr)
+
+    if args.json_path:
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "repeat": args.repeat,
+                "warmup": args.warmup,
+                "seed": args.seed,
+            },
+            "results": results,
+        }
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark peggiorati oltre il {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+from typing import Dict, List, Optional, Set, Tuple
+from board import winning_lines, zobrist_keys
+from constants import EMPTY_CELL
+
+# Ogni lato è un intero: la cella (row, col) corrisponde al bit row * width + col
+FULL_MASK: int = 0b111111111
+
+
+def line_masks(width: int, height: int, win_length: int) -> List[int]:
+    return [sum(1 << cell for cell in line) for line in winning_lines(width, height, win_length)]
+
+
+# Le 8 linee del 3x3 (righe, colonne, diagonali) come maschere di bit
+WIN_MASKS: Tuple[int, ...] = tuple(line_masks(3, 3, 3))
+
+# Tabella precalcolata per il 3x3: per ognuna delle 512 configurazioni dice se contiene un tris
+_WINNING: Tuple[bool, ...] = tuple(
+    any(bits & mask == mask for mask in WIN_MASKS) for bits in range(FULL_MASK + 1)
+)
+
+
+class BitBoard:
+    def __init__(self, width: int = 3, height: int = 3, win_length: int = 3) -> None:
+        if width < 1 or height < 1 or win_length < 1:
+            raise ValueError("Dimensioni del tabellone e lunghezza del tris devono essere positive.")
+        if win_length > max(width, height):
+            raise ValueError("La lunghezza vincente non può superare il lato del tabellone.")
+        self._width: int = width
+        self._height: int = height
+        self._win_length: int = win_length
+        self._full_mask: int = (1 << (width * height)) - 1
+        self._is_classic: bool = (width, height, win_length) == (3, 3, 3)
+        # Per ogni cella, le sole maschere vincenti che la contengono
+        self._masks_by_cell: List[List[int]] = [[] for _ in range(width * height)]
+        for mask in line_masks(width, height, win_length):
+            for index in range(width * height):
+                if (mask >> index) & 1:
+                    self._masks_by_cell[index].append(mask)
+        self._bits: Dict[str, int] = {}
+        self._occupied: int = 0
+        self._winners: Set[str] = set()
+        self._last_move: Optional[Tuple[int, int]] = None
+        self._zobrist: Dict[str, List[int]] = zobrist_keys(width, height)
+        self._hash: int = 0
+        self._history: List[Tuple[str, int, Optional[Tuple[int, int]], bool]] = []
+
+    def make_move(self, row: int, col: int, symbol: str) -> bool:
+        return self.push(row, col, symbol)
+
+    def push(self, row: int, col: int, symbol: str) -> bool:
+        if not self.is_valid_move(row, col):
+            return False
+        index = row * self._width + col
+        bit = 1 << index
+        bits = self._bits.get(symbol, 0) | bit
+        self._bits[symbol] = bits
+        self._occupied |= bit
+        if symbol in self._winners:
+            new_winner = False
+        elif self._is_classic:
+            new_winner = _WINNING[bits]
+        else:
+            new_winner = any(bits & mask == mask for mask in self._masks_by_cell[index])
+        if new_winner:
+            self._winners.add(symbol)
+        self._history.append((symbol, index, self._last_move, new_winner))
+        self._last_move = (row, col)
+        self._hash ^= self._zobrist[symbol][index]
+        return True
+
+    def pop(self) -> Tuple[int, int]:
+        if not self._history:
+            raise IndexError("Nessuna mossa da annullare.")
+        symbol, index, previous_move, new_winner = self._history.pop()
+        bit = 1 << index
+        self._bits[symbol] ^= bit
+        self._occupied ^= bit
+        if new_winner:
+            self._winners.discard(symbol)
+        self._hash ^= self._zobrist[symbol][index]
+        self._last_move = previous_move
+        return divmod(index, self._width)
+
+    def get_hash(self) -> int:
+        return self._hash
+
+    def is_valid_move(self, row: int, col: int) -> bool:
+        return (0 <= row < self._height and 0 <= col < self._width
+                and not (self._occupied >> (row * self._width + col)) & 1)
+
+    def is_full(self) -> bool:
+        return self._occupied == self._full_mask
+
+    def check_winner(self, symbol: str) -> bool:
+        return symbol in self._winners
+
+    def get_bits(self, symbol: str) -> int:
+        return self._bits.get(symbol, 0)
+
+    def get_empty_mask(self) -> int:
+        return ~self._occupied & self._full_mask
+
+    def get_available_moves(self) -> List[Tuple[int, int]]:
+        moves: List[Tuple[int, int]] = []
+        empty = self.get_empty_mask()
+        while empty:
+            low = empty & -empty  # bit meno significativo ancora libero
+            index = low.bit_length() - 1
+            moves.append(divmod(index, self._width))
+            empty ^= low
+        return moves
+
+    def get_last_move(self) -> Optional[Tuple[int, int]]:
+        return self._last_move
+
+    def get_width(self) -> int:
+        return self._width
+
+    def get_height(self) -> int:
+        return self._height
+
+    def get_win_length(self) -> int:
+        return self._win_length
+
+    def get_grid(self) -> List[List[str]]:
+        grid: List[List[str]] = [[EMPTY_CELL for _ in range(self._width)] for _ in range(self._height)]
+        for symbol, bits in self._bits.items():
+            while bits:
+                low = bits & -bits
+                r, c = divmod(low.bit_length() - 1, self._width)
+                grid[r][c] = symbol
+                bits ^= low
+        return grid
+
+    def copy(self) -> "BitBoard":
+        clone = BitBoard.__new__(BitBoard)
+        clone.__dict__.update(self.__dict__)
+        clone._bits = dict(self._bits)
+        clone._winners = set(self._winners)
+        clone._history = self._history[:]
+        return clone
+
+    def reset(self) -> None:
+        self._bits = {}
+        self._occupied = 0
+        self._winners = set()
+        self._last_move = None
+        self._hash = 0
+        self._history = []
@@ -1,56 +1,161 @@
-from typing import List
+import random
+from typing import Dict, List, Optional, Set, Tuple
 from constants import EMPTY_CELL
 
+# Le 4 direzioni delle linee che passano per una cella: orizzontale, verticale, le due diagonali
+DIRECTIONS: Tuple[Tuple[int, int], ...] = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+class _ZobristKeys(dict):
+    # Simbolo -> una chiave casuale a 64 bit per cella, generata al primo uso. Il seed dipende solo
+    # da dimensioni e simbolo: lo stesso tabellone ha lo stesso hash in ogni processo.
+    def __init__(self, width: int, height: int) -> None:
+        super().__init__()
+        self._width = width
+        self._height = height
+
+    def __missing__(self, symbol: str) -> List[int]:
+        rng = random.Random(f"zobrist:{self._width}x{self._height}:{symbol}")
+        keys = [rng.getrandbits(64) for _ in range(self._width * self._height)]
+        self[symbol] = keys
+        return keys
+
+
+_ZOBRIST: Dict[Tuple[int, int], _ZobristKeys] = {}
+
+
+def zobrist_keys(width: int, height: int) -> Dict[str, List[int]]:
+    # Condivise da tutti i tabelloni con le stesse dimensioni (Board, BitBoard, ricerche)
+    keys = _ZOBRIST.get((width, height))
+    if keys is None:
+        keys = _ZOBRIST.setdefault((width, height), _ZobristKeys(width, height))
+    return keys
+
+
+def winning_lines(width: int, height: int, win_length: int) -> List[Tuple[int, ...]]:
+    # Tutte le linee di win_length celle, come indici piatti (riga * width + colonna).
+    # Unica enumerazione per BitBoard, ricerca, tablebase e Q-learning
+    lines: List[Tuple[int, ...]] = []
+    for r in range(height):
+        for c in range(width):
+            for dr, dc in DIRECTIONS:
+                end_r, end_c = r + dr * (win_length - 1), c + dc * (win_length - 1)
+                if 0 <= end_r < height and 0 <= end_c < width:
+                    lines.append(tuple((r + dr * i) * width + c + dc * i for i in range(win_length)))
+    return lines
+
 
 class Board:
-    def __init__(self) -> None:
-        self._grid: List[List[str]] = [[EMPTY_CELL for _ in range(3)] for _ in range(3)]
+    def __init__(self, width: int = 3, height: int = 3, win_length: int = 3) -> None:
+        if width < 1 or height < 1 or win_length < 1:
+            raise ValueError("Dimensioni del tabellone e lunghezza del tris devono essere positive.")
+        if win_length > max(width, height):
+            raise ValueError("La lunghezza vincente non può superare il lato del tabellone.")
+        self._width: int = width
+        self._height: int = height
+        self._win_length: int = win_length
+        self._grid: List[List[str]] = [[EMPTY_CELL for _ in range(width)] for _ in range(height)]
+        self._moves_count: int = 0
+        self._winners: Set[str] = set()
+        self._last_move: Optional[Tuple[int, int]] = None
+        self._zobrist: Dict[str, List[int]] = zobrist_keys(width, height)
+        self._hash: int = 0
+        # Per ogni mossa: riga, colonna, mossa precedente e se ha aggiunto un vincitore (per pop)
+        self._history: List[Tuple[int, int, Optional[Tuple[int, int]], bool]] = []
 
     def make_move(self, row: int, col: int, symbol: str) -> bool:
-        if self.is_valid_move(row, col):
-            self._grid[row][col] = symbol
-            return True
-        return False
+        return self.push(row, col, symbol)
+
+    def push(self, row: int, col: int, symbol: str) -> bool:
+        # Mossa sul posto, annullabile con pop: le ricerche non devono copiare il tabellone
+        if not self.is_valid_move(row, col):
+            return False
+        self._grid[row][col] = symbol
+        self._moves_count += 1
+        new_winner = symbol not in self._winners and self._is_winning_move(row, col, symbol)
+        if new_winner:
+            self._winners.add(symbol)
+        self._history.append((row, col, self._last_move, new_winner))
+        self._last_move = (row, col)
+        self._hash ^= self._zobrist[symbol][row * self._width + col]
+        return True
+
+    def pop(self) -> Tuple[int, int]:
+        if not self._history:
+            raise IndexError("Nessuna mossa da annullare.")
+        row, col, previous_move, new_winner = self._history.pop()
+        symbol = self._grid[row][col]
+        if new_winner:
+            self._winners.discard(symbol)
+        self._hash ^= self._zobrist[symbol][row * self._width + col]
+        self._grid[row][col] = EMPTY_CELL
+        self._moves_count -= 1
+        self._last_move = previous_move
+        return row, col
+
+    def get_hash(self) -> int:
+        # Hash Zobrist della posizione (non dipende da chi deve muovere), aggiornato a ogni mossa
+        return self._hash
 
     def is_valid_move(self, row: int, col: int) -> bool:
-        return 0 <= row < 3 and 0 <= col < 3 and self._grid[row][col] == EMPTY_CELL
+        return 0 <= row < self._height and 0 <= col < self._width and self._grid[row][col] == EMPTY_CELL
 
     def is_full(self) -> bool:
-        for row in self._grid:
-            if EMPTY_CELL in row:
-                return False
-        return True
+        return self._moves_count == self._width * self._height
 
     def check_winner(self, symbol: str) -> bool:
-        return (self._check_rows(symbol) or
-                self._check_columns(symbol) or
-                self._check_diagonals(symbol))
+        # I tris vengono rilevati in make_move, quindi qui basta una lettura
+        return symbol in self._winners
 
-    def _check_rows(self, symbol: str) -> bool:
-        for row_cells in self._grid: 
-            if all(cell == symbol for cell in row_cells):
+    def _is_winning_move(self, row: int, col: int, symbol: str) -> bool:
+        # Conta solo le 4 linee che passano per l'ultima mossa: O(k) invece di O(N²)
+        for dr, dc in DIRECTIONS:
+            count = 1 + self._count_direction(row, col, dr, dc, symbol) + self._count_direction(row, col, -dr, -dc, symbol)
+            if count >= self._win_length:
                 return True
         return False
 
-    def _check_columns(self, symbol: str) -> bool:
-        for col in range(3):
-            if all(self._grid[row][col] == symbol for row in range(3)):
-                return True
-        return False
+    def _count_direction(self, row: int, col: int, dr: int, dc: int, symbol: str) -> int:
+        count = 0
+        r, c = row + dr, col + dc
+        while count < self._win_length - 1 and 0 <= r < self._height and 0 <= c < self._width and self._grid[r][c] == symbol:
+            count += 1
+            r += dr
+            c += dc
+        return count
 
-    def _check_diagonals(self, symbol: str) -> bool:
-        if (self._grid[0][0] == symbol and
-            self._grid[1][1] == symbol and
-            self._grid[2][2] == symbol):
-            return True
-        if (self._grid[0][2] == symbol and
-            self._grid[1][1] == symbol and
-            self._grid[2][0] == symbol):
-            return True
-        return False
+    def get_available_moves(self) -> List[Tuple[int, int]]:
+        return [(r, c) for r in range(self._height) for c in range(self._width) if self._grid[r][c] == EMPTY_CELL]
+
+    def get_last_move(self) -> Optional[Tuple[int, int]]:
+        return self._last_move
+
+    def get_width(self) -> int:
+        return self._width
+
+    def get_height(self) -> int:
+        return self._height
+
+    def get_win_length(self) -> int:
+        return self._win_length
 
     def get_grid(self) -> List[List[str]]:
         return self._grid
 
+    def copy(self) -> "Board":
+        clone = Board(self._width, self._height, self._win_length)
+        clone._grid = [row[:] for row in self._grid]
+        clone._moves_count = self._moves_count
+        clone._winners = set(self._winners)
+        clone._last_move = self._last_move
+        clone._hash = self._hash
+        clone._history = self._history[:]
+        return clone
+
     def reset(self) -> None:
-        self._grid = [[EMPTY_CELL for _ in range(3)] for _ in range(3)]
+        self._grid = [[EMPTY_CELL for _ in range(self._width)] for _ in range(self._height)]
+        self._moves_count = 0
+        self._winners = set()
+        self._last_move = None
+        self._hash = 0
+        self._history = []
@@ -3,11 +3,16 @@ from typing import Optional, Tuple, List
 from board import Board
 from constants import EMPTY_CELL, HUMAN_SYMBOL, AI_SYMBOL
 import random
+import threading
 import time
-import streamlit as st
-import requests
 import logging
 from player import Player
+from metrics import (MOVE_SECONDS, OLLAMA_CACHE_HITS, OLLAMA_FALLBACKS, OLLAMA_GENERATION_SECONDS,
+                     OLLAMA_HEALTH_SECONDS, OLLAMA_REQUESTS, PACING_SECONDS)
+from notifier import get_notifier
+from ollama_cache import OllamaMoveCache, get_default_cache
+from ollama_client import OllamaClient, get_client
+from ollama_dispatch import get_dispatcher
 import re
 
 #Classi per le difficoltà
@@ -16,162 +21,144 @@ class MoveStrategy(ABC):
     def get_move(self, board: Board, bot: 'BotPlayer') -> Optional[Tuple[int, int]]:
         pass
 
+    def ponder_move(self, board: Board, bot: 'BotPlayer', cancel: threading.Event) -> Optional[Tuple[int, int]]:
+        #mossa speculativa (pondering): le strategie con ricerca lunga la interrompono appena cancel è impostato
+        return self.get_move(board, bot)
+
 
 class EasyMoveStrategy(MoveStrategy):
     def get_move(self, board: Board, bot: 'BotPlayer') -> Optional[Tuple[int, int]]:
-        available_moves: List[Tuple[int, int]] = []
-        grid = board.get_grid()
-        for r in range(3):
-            for c in range(3):
-                if grid[r][c] == EMPTY_CELL:
-                    available_moves.append((r, c))
+        available_moves: List[Tuple[int, int]] = board.get_available_moves()
         return random.choice(available_moves) if available_moves else None
 
 
 class MediumMoveStrategy(MoveStrategy):
     def get_move(self, board: Board, bot: 'BotPlayer') -> Optional[Tuple[int, int]]:
-        current_grid: List[List[str]] = [row[:] for row in board.get_grid()]
-
-        for r in range(3):
-            for c in range(3):
-                if current_grid[r][c] == EMPTY_CELL:
-                    current_grid[r][c] = bot.get_symbol()
-                    temp_board = Board()
-                    temp_board._grid = [row[:] for row in current_grid]
-                    if temp_board.check_winner(bot.get_symbol()):
-                        return (r, c)
-                    current_grid[r][c] = EMPTY_CELL
+        available_moves: List[Tuple[int, int]] = board.get_available_moves()
+
+        winning_move = self._find_winning_move(board, available_moves, bot.get_symbol())
+        if winning_move:
+            return winning_move
 
         opponent_symbol: str = HUMAN_SYMBOL if bot.get_symbol() == AI_SYMBOL else AI_SYMBOL
-        for r in range(3):
-            for c in range(3):
-                if current_grid[r][c] == EMPTY_CELL:
-                    current_grid[r][c] = opponent_symbol
-                    temp_board = Board()
-                    temp_board._grid = [row[:] for row in current_grid]
-                    if temp_board.check_winner(opponent_symbol):
-                        return (r, c)
-                    current_grid[r][c] = EMPTY_CELL
+        blocking_move = self._find_winning_move(board, available_moves, opponent_symbol)
+        if blocking_move:
+            return blocking_move
 
         return EasyMoveStrategy().get_move(board, bot)
 
+    @staticmethod
+    def _find_winning_move(board: Board, moves: List[Tuple[int, int]], symbol: str) -> Optional[Tuple[int, int]]:
+        #prova ogni mossa sul posto e la annulla subito: nessuna copia del tabellone
+        for r, c in moves:
+            board.push(r, c, symbol)
+            won = board.check_winner(symbol)
+            board.pop()
+            if won:
+                return (r, c)
+        return None
+
 
 class OllamaMoveFacade:
     def __init__(self, bot: 'BotPlayer') -> None:
         self.bot = bot
+        self.cache: OllamaMoveCache = bot._move_cache if bot._move_cache is not None else get_default_cache()
 
     def get_move(self, board: Board) -> Optional[Tuple[int, int]]:
-        if not self.bot._check_ollama_available():
-            st.warning("Ollama non disponibile. Uso strategia media.")
-            return MediumMoveStrategy().get_move(board, self.bot)
+        notifier = get_notifier()
+        cached_move = self._cached_move(board)
+        if cached_move:
+            notifier.success(f"🦙 Llama sceglie: {cached_move} (cache)")
+            return cached_move
+
+        client = self.bot._get_ollama_client()
+        if not self._is_available(client):
+            notifier.warning("Ollama non disponibile. Uso strategia media.")
+            return self._fallback(board, "unavailable")
+
+        try:
+            with notifier.spinner("🦙 Llama sta pensando..."):
+                parsed_move, move_str = self._generate(client, board)
+        except Exception as e:
+            notifier.error(f"Errore connessione Ollama: {e}")
+            notifier.info("🔄 Uso strategia media come fallback")
+            return self._fallback(board, "error")
 
-        grid = board.get_grid()
-        board_representation = self.bot._format_board_for_ai(grid)
-        opponent_symbol = HUMAN_SYMBOL if self.bot.get_symbol() == AI_SYMBOL else AI_SYMBOL
-        available_moves = [f"({r},{c})" for r in range(3) for c in range(3) if grid[r][c] == EMPTY_CELL]
+        if self._accept(board, parsed_move):
+            notifier.success(f"🦙 Llama sceglie: {parsed_move}")
+            return parsed_move
 
-        prompt = f"""Board state (your symbol: {self.bot.get_symbol()}):
+        if parsed_move:
+            notifier.warning(f"Mossa non valida: {parsed_move}")
+        else:
+            notifier.warning(f"Formato non riconosciuto: '{move_str.strip()}'")
+        notifier.info("🔄 Uso strategia media come fallback")
+        return self._fallback(board, "invalid_move" if parsed_move else "parse_failure")
+
+    def request_move(self, board: Board, cancel: Optional[threading.Event] = None) -> Optional[Tuple[int, int]]:
+        # Solo la mossa di Ollama, senza interfaccia né fallback: None se non c'è una mossa valida.
+        # Pensata per essere eseguita in un thread (vedi HedgedMoveStrategy)
+        cached_move = self._cached_move(board)
+        if cached_move:
+            return cached_move
+        client = self.bot._get_ollama_client()
+        if not self._is_available(client):
+            return None
+        parsed_move, _ = self._generate(client, board, cancel)
+        return parsed_move if self._accept(board, parsed_move) else None
+
+    def _is_available(self, client: OllamaClient) -> bool:
+        with OLLAMA_HEALTH_SECONDS.time():
+            return client.is_available()
+
+    def _generate(self, client: OllamaClient, board: Board,
+                  cancel: Optional[threading.Event] = None) -> Tuple[Optional[Tuple[int, int]], str]:
+        # Tempo di generazione ed esito di ogni richiesta (risposte in cache escluse)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            parsed_move, move_str = get_dispatcher(client).request(self.bot._model, self._build_prompt(board),
+                                                                   board.get_height(), board.get_width(), cancel)
+            if cancel is not None and cancel.is_set():
+                outcome = "cancelled"
+            elif parsed_move is None:
+                outcome = "parse_failure"
+            else:
+                outcome = "ok" if board.is_valid_move(parsed_move[0], parsed_move[1]) else "invalid_move"
+            return parsed_move, move_str
+        finally:
+            OLLAMA_GENERATION_SECONDS.observe(time.perf_counter() - started)
+            OLLAMA_REQUESTS.inc(outcome=outcome)
+
+    def _fallback(self, board: Board, reason: str) -> Optional[Tuple[int, int]]:
+        OLLAMA_FALLBACKS.inc(reason=reason)
+        return MediumMoveStrategy().get_move(board, self.bot)
+
+    def _cached_move(self, board: Board) -> Optional[Tuple[int, int]]:
+        cached_move = self.cache.get(self.bot._model, self.bot.get_symbol(), board)
+        if cached_move and board.is_valid_move(cached_move[0], cached_move[1]):
+            OLLAMA_CACHE_HITS.inc()
+            return cached_move
+        return None
+
+    def _accept(self, board: Board, move: Optional[Tuple[int, int]]) -> bool:
+        # Solo le mosse valide finiscono in cache, mai i fallback
+        if move and board.is_valid_move(move[0], move[1]):
+            self.cache.put(self.bot._model, self.bot.get_symbol(), board, move)
+            return True
+        return False
+
+    def _build_prompt(self, board: Board) -> str:
+        board_representation = self.bot._format_board_for_ai(board.get_grid(), board.get_win_length())
+        available_moves = [f"({r},{c})" for r, c in board.get_available_moves()]
+
+        return f"""Board state (your symbol: {self.bot.get_symbol()}):
 {board_representation}
 
 Available moves: {', '.join(available_moves)}
 
 Return ONLY the coordinates as "(row,col)" (example: "(1,2)"). Only one tuple. No explanation."""
 
-        try:
-            with st.spinner("🦙 Llama sta pensando..."):
-                payload = {                                     #modo in cui sto mandando il messaggio all'indirizzo (pecchetto da mandare)
-                    "model": self.bot._model,
-                    "prompt": prompt,
-                    "stream": False,                            #legge tutto e poi ti risponde
-                    "options": {"temperature": 0.1, "top_p": 0.9, "num_predict": 10}  #temperature: quanto cambia la risposta ogni volta che la generi (indice di creatività)
-                }                                                                     #top_p: considero opzioni sensate, equilibrio tra qualità e controllo
-                response = requests.post(self.bot._ollama_url, json=payload, timeout=30) #num_predict: lunghezza massima della risposta 
-
-                if response.status_code == 200:
-                    result = response.json()
-                    move_str = result['response'].strip()
-                    '''
-                    st.write(f"🦙 Llama risponde: '{move_str}'")
-                    with open('llama_responses.log', 'a', encoding='utf-8') as f:
-                        f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} - Llama risposta: '{move_str}'\n")
-                    '''
-
-                    parsed_move = None
-
-                    if move_str:
-                        # Pulizia base
-                        text = move_str.strip().replace(" ", "").lower()
-                        
-                        # Rimuovi parentesi se ci sono
-                        text = text.replace("(", "").replace(")", "")
-                        
-                        # Cerca la virgola
-                        if "," in text:
-                            parts = text.split(",")
-                            if len(parts) >= 2:
-                                try:
-                                    # Prendi solo i primi caratteri che sono numeri
-                                    row_str = ""
-                                    col_str = ""
-                                    
-                                    # Estrai il primo numero
-                                    for char in parts[0]:
-                                        if char.isdigit():
-                                            row_str += char
-                                            break
-                                    
-                                    # Estrai il secondo numero  
-                                    for char in parts[1]:
-                                        if char.isdigit():
-                                            col_str += char
-                                            break
-                                    
-                                    if row_str and col_str:
-                                        row = int(row_str)
-                                        col = int(col_str)
-                                        
-                                        # Controlla che siano nel range valido
-                                        if 0 <= row <= 2 and 0 <= col <= 2:
-                                            parsed_move = (row, col)
-                                            
-                                except ValueError:
-                                    pass
-                        
-                        # Se non ha funzionato con la virgola, prova a cercare due numeri consecutivi
-                        if not parsed_move:
-                            numbers = []
-                            for char in text:
-                                if char.isdigit():
-                                    num = int(char)
-                                    if 0 <= num <= 2:
-                                        numbers.append(num)
-                                        if len(numbers) == 2:
-                                            break
-                            
-                            if len(numbers) == 2:
-                                parsed_move = (numbers[0], numbers[1])
-
-                    if parsed_move and board.is_valid_move(parsed_move[0], parsed_move[1]):
-                        st.success(f"🦙 Llama sceglie: {parsed_move}")
-                        return parsed_move
-                    else:
-                        if parsed_move:
-                            st.warning(f"Mossa non valida: {parsed_move}")
-                        else:
-                            st.warning(f"Formato non riconosciuto: '{move_str}'")
-                        
-                        # Fallback
-                        st.info("🔄 Uso strategia media come fallback")
-                        return self._get_medium_move(board)
-                else:
-                    st.error(f"Errore Ollama: {response.status_code}")
-                    return self._get_medium_move(board)
-        except Exception as e:
-            st.error(f"Errore connessione Ollama: {e}")
-
-        st.info("🔄 Uso strategia media come fallback")
-        return MediumMoveStrategy().get_move(board, self.bot)
-
 
 class HardMoveStrategy(MoveStrategy):
     def get_move(self, board: Board, bot: 'BotPlayer') -> Optional[Tuple[int, int]]:
@@ -180,50 +167,80 @@ class HardMoveStrategy(MoveStrategy):
 
 #Classe Bot
 class BotPlayer(Player):
-    def __init__(self, name: str, symbol: str, difficulty: str = "facile") -> None:
+    def __init__(self, name: str, symbol: str, difficulty: str = "facile",
+                 strategy: Optional[MoveStrategy] = None, pacing: float = 0.0,
+                 move_cache: Optional[OllamaMoveCache] = None) -> None:
         super().__init__(name, symbol)
         self._difficulty = difficulty
         self._ollama_url = "http://localhost:11434/api/generate"
         self._model = "llama3.2:1b" 
-        self._strategy = self._select_strategy(difficulty)
+        self._move_cache = move_cache  #None = cache condivisa dal processo (vedi ollama_cache)
+        self._strategy = strategy or self._select_strategy(difficulty)
+        self.pacing = pacing  #pausa solo estetica per le interfacce (vedi UI_PACING), misurata a parte
+        self._move_seconds = MOVE_SECONDS.labels(strategy=type(self._strategy).__name__)
 
-    def _select_strategy(self, difficulty: str) -> MoveStrategy:
+    @staticmethod
+    def _select_strategy(difficulty: str) -> MoveStrategy:
         if difficulty == "facile":
             return EasyMoveStrategy()
         elif difficulty == "medio":
             return MediumMoveStrategy()
         elif difficulty == "difficile":
-            return HardMoveStrategy()
+            from hedged import HedgedMoveStrategy
+            return HedgedMoveStrategy()
+        elif difficulty == "perfetto":
+            from solver import PerfectMoveStrategy  # import locale: solver dipende da questo modulo
+            return PerfectMoveStrategy()
+        elif difficulty == "esperto":
+            from search import AlphaBetaMoveStrategy
+            return AlphaBetaMoveStrategy()
+        elif difficulty == "mcts":
+            from mcts import MCTSMoveStrategy
+            return MCTSMoveStrategy()
+        elif difficulty == "tablebase":
+            from tablebase import TablebaseMoveStrategy
+            return TablebaseMoveStrategy()
+        elif difficulty == "appreso":
+            from learning import LearnedMoveStrategy
+            return LearnedMoveStrategy()
         else:
             return EasyMoveStrategy()
 
     def make_move(self, board: Board) -> Optional[Tuple[int, int]]:
-        time.sleep(0.5)
-        return self._strategy.get_move(board, self)
+        if self.pacing > 0:
+            with PACING_SECONDS.time():
+                time.sleep(self.pacing)
+        started = time.perf_counter()
+        try:
+            return self._strategy.get_move(board, self)
+        finally:
+            self._move_seconds.observe(time.perf_counter() - started)  #solo il calcolo, senza la pausa
+
+    def _get_ollama_client(self) -> OllamaClient:
+        return get_client(self._ollama_url.replace("/api/generate", ""))  #client condiviso per server
 
     def _check_ollama_available(self) -> bool:
-        try:
-            response = requests.get("http://localhost:11434/api/tags", timeout=5) #richiesta a questo indirizzo 
-            return response.status_code == 200 
-        except:
-            return False
-
-    def _format_board_for_ai(self, grid: List[List[str]]) -> str:
-        representation = "   0   1   2\n"
-        representation += " ┌───┬───┬───┐\n"
-        for r in range(3):
-            representation += f"{r}│"
-            for c in range(3):
+        return self._get_ollama_client().is_available()  #esito in cache per qualche secondo
+
+    def _format_board_for_ai(self, grid: List[List[str]], win_length: int = 3) -> str:
+        height = len(grid)
+        width = len(grid[0]) if grid else 0
+        representation = "  " + "".join(f"{c:^4}" for c in range(width)) + "\n"
+        representation += "  ┌" + "┬".join("───" for _ in range(width)) + "┐\n"
+        for r in range(height):
+            representation += f"{r:>2}│"
+            for c in range(width):
                 cell = grid[r][c]
                 representation += f" {cell if cell != EMPTY_CELL else '-'} "
-                if c < 2:
+                if c < width - 1:
                     representation += "│"
             representation += "│\n"
-            if r < 2:
-                representation += " ├───┼───┼───┤\n"
-        representation += " └───┴───┴───┘\n"
+            if r < height - 1:
+                representation += "  ├" + "┼".join("───" for _ in range(width)) + "┤\n"
+        representation += "  └" + "┴".join("───" for _ in range(width)) + "┘\n"
         
         representation += f"\nYour symbol: {self.get_symbol()}\n"
-        representation += "Coordinates: (row,col) where row=0-2 (top to bottom), col=0-2 (left to right)\n"
+        representation += f"Goal: {win_length} in a row (horizontal, vertical or diagonal)\n"
+        representation += f"Coordinates: (row,col) where row=0-{height - 1} (top to bottom), col=0-{width - 1} (left to right)\n"
                     
         return representation
\ No newline at end of file
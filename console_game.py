@@ -1,35 +1,52 @@
+import argparse
+import logging
 from board import Board
 from human_player import HumanPlayer
 from bot_player import BotPlayer
-from game import Game
+from game import Game, GameOver, TurnChanged
 from typing import Optional
 from observer import Observer
+from constants import BOT_DIFFICULTIES, EMPTY_CELL, UI_PACING
+from game_log import MAX_CELLS, GameLogWriter, GameRecorder
+from metrics import MetricsObserver, get_registry
+from profiling import add_profile_arguments, profiled
 
 class ConsoleGame(Observer):
-    def __init__(self):
+    def __init__(self, recorder: Optional[GameRecorder] = None):
         self.board = Board()
         self.human: Optional[HumanPlayer] = None
         self.bot: Optional[BotPlayer] = None
         self.game: Optional[Game] = None
+        self.recorder = recorder
+        self.metrics = MetricsObserver()
     
-    def update(self, subject) -> None:
-        print(f"\n E' il turno di {subject.current_player_obj.get_name()} ({subject.current_player_obj.get_symbol()})")
-        self.print_board()  #stampa turno corrente e tabellone aggiornato e viene chiamato ogni volta che Game chiama notify()
+    def update(self, subject, event) -> None:
+        if isinstance(event, TurnChanged):
+            print(f"\n E' il turno di {event.player.get_name()} ({event.player.get_symbol()})")
+            self.print_board()  #stampa turno corrente e tabellone aggiornato a ogni cambio di turno
+        elif isinstance(event, GameOver):
+            self.print_board()
+            if event.winner is None:
+                print("It's a draw!")
+            else:
+                print(f"{event.winner.get_name()} wins!")
 
     def print_board(self):
         grid = self.board.get_grid()
-        print("\n    1   2   3")
-        print("  ┌───┬───┬───┐")
-        for r in range(3):
-            print(f"{r+1} │", end="")
-            for c in range(3):
+        width = self.board.get_width()
+        height = self.board.get_height()
+        print("\n    " + " ".join(f"{c+1:^3}" for c in range(width)))
+        print("   ┌" + "┬".join("───" for _ in range(width)) + "┐")
+        for r in range(height):
+            print(f"{r+1:>2} │", end="")
+            for c in range(width):
                 cell = grid[r][c]
-                symbol = cell if cell != " " else "-"
+                symbol = cell if cell != EMPTY_CELL else "-"
                 print(f" {symbol} ", end="│")
             print()
-            if r < 2:
-                print("  ├───┼───┼───┤")
-        print("  └───┴───┴───┘\n")
+            if r < height - 1:
+                print("   ├" + "┼".join("───" for _ in range(width)) + "┤")
+        print("   └" + "┴".join("───" for _ in range(width)) + "┘\n")
 
     def get_user_settings(self):
         print("\n Tris ")
@@ -42,17 +59,35 @@ class ConsoleGame(Observer):
             print("Invalid symbol. Choose 'X' or 'O'.")
 
         while True:
-            difficulty = input("Choose bot difficulty (facile, medio, difficile): ").strip().lower()
-            if difficulty in ("facile", "medio", "difficile"):
+            difficulty = input(f"Choose bot difficulty ({', '.join(BOT_DIFFICULTIES)}): ").strip().lower()
+            if difficulty in BOT_DIFFICULTIES:
                 break
-            print("Invalid difficulty. Choose from: facile, medio, difficile.")
+            print(f"Invalid difficulty. Choose from: {', '.join(BOT_DIFFICULTIES)}.")
+
+        while True:
+            size = input("Board size as width x height [3x3]: ").strip().lower() or "3x3"
+            win_length = input("Symbols in a row needed to win [3]: ").strip() or "3"
+            try:
+                width, height = map(int, size.split("x"))
+                board = Board(width, height, int(win_length))
+            except ValueError:
+                print("Invalid size. Use e.g. 3x3 with 3 in a row, or 15x15 with 5 in a row.")
+                continue
+            if self.recorder and width * height > MAX_CELLS:
+                print(f"--record supports boards up to {MAX_CELLS} cells (e.g. 4x4). Choose a smaller board.")
+                continue
+            self.board = board
+            break
 
         bot_symbol = "O" if symbol == "X" else "X"
         self.human = HumanPlayer(nickname, symbol)
-        self.bot = BotPlayer("Computer", bot_symbol, difficulty=difficulty)
+        self.bot = BotPlayer("Computer", bot_symbol, difficulty=difficulty, pacing=UI_PACING)
         self.game = Game(self.human, self.bot, self.board)
         self.game.initialize_turn()
         self.game.attach(self)  #registra l'observer nel game
+        self.game.attach(self.metrics)
+        if self.recorder:
+            self.game.attach(self.recorder)  #salva la partita a fine gioco
 
     def play(self):
         self.get_user_settings()
@@ -63,18 +98,9 @@ class ConsoleGame(Observer):
             print(f"Turn: {current.get_name()} ({current.get_symbol()})")
 
             move = current.make_move(self.board) #chiede al giocatore di fare la mossa
-            if move and self.board.make_move(*move, current.get_symbol()):
-                self.print_board()
-                result = self.game.check_game_over()
-                if result:
-                    if result == "draw":
-                        print("It's a draw!")
-                    else:
-                        winner = self.human.get_name() if result == self.human.get_symbol() else self.bot.get_name()
-                        print(f"{winner} wins!")
+            if move and self.game.play_move(*move):  #update() stampa il nuovo turno oppure il risultato
+                if self.game.is_over():
                     break
-                self.game.switch_player()
-                
             else:
                 print("Invalid move. Try again.")
         while True:
@@ -90,7 +116,22 @@ class ConsoleGame(Observer):
                 print(" Inserisci 's' per sì o 'n' per no.")
 
 if __name__ == "__main__":
-    game = ConsoleGame()
-    game.play()
+    parser = argparse.ArgumentParser(description="Tris da terminale.")
+    parser.add_argument("--record", metavar="DIR", help="registra le partite in formato binario in questa cartella")
+    parser.add_argument("--metrics", metavar="PATH", help="scrive le metriche all'uscita (.json oppure testo Prometheus)")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")  #messaggi del bot (notifier) a terminale
+
+    writer = GameLogWriter(args.record, flush_every=1) if args.record else None
+    try:
+        with profiled(args.profile, args.profile_top):
+            game = ConsoleGame(GameRecorder(writer) if writer else None)
+            game.play()
+    finally:
+        if writer:
+            writer.close()
+        if args.metrics:
+            get_registry().write(args.metrics)
     
 
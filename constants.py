@@ -2,6 +2,9 @@
 HUMAN_SYMBOL: str = "X"
 AI_SYMBOL: str = "O"
 EMPTY_CELL: str = ""
+UI_PACING: float = 0.5  #pausa estetica (s) prima della mossa del bot nelle interfacce
+MAX_BOARD_SIDE: int = 15  #lato massimo del tabellone scelto da interfacce e client del server
+BOT_DIFFICULTIES: tuple = ("facile", "medio", "difficile", "perfetto", "esperto", "mcts", "tablebase", "appreso")
 
 #mantengono il codice pulito
 #facilitano modifiche future se voglio cambiare simbolo
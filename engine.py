@@ -0,0 +1,36 @@
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+from bot_player import BotPlayer, MoveStrategy
+from constants import BOT_DIFFICULTIES
+from ollama_cache import OllamaMoveCache, get_default_cache
+import solver
+
+
+@dataclass(frozen=True)
+class EngineResources:
+    # Risorse del motore condivise da tutte le partite del processo. Sono immutabili o protette
+    # da lock: tabella del risolutore, cache delle mosse Ollama e un'istanza per strategia
+    # (le strategie non tengono stato per partita, quindi un'istanza basta per tutti).
+    solver_table: Mapping[Tuple[int, int], int]
+    move_cache: OllamaMoveCache
+    strategies: Mapping[str, MoveStrategy]
+
+    def strategy(self, difficulty: str) -> MoveStrategy:
+        return self.strategies.get(difficulty) or self.strategies["facile"]
+
+    def create_bot(self, name: str, symbol: str, difficulty: str, pacing: float = 0.0,
+                   strategy: Optional[MoveStrategy] = None) -> BotPlayer:
+        # strategy sostituisce l'istanza condivisa quando la partita ha parametri propri
+        return BotPlayer(name, symbol, difficulty, strategy=strategy or self.strategy(difficulty),
+                         pacing=pacing, move_cache=self.move_cache)
+
+
+def load_engine_resources() -> EngineResources:
+    # Costruisce tutto subito (la tabella del risolutore in particolare), così nessuna partita
+    # paga il costo di inizializzazione alla prima mossa
+    return EngineResources(
+        solver_table=solver.get_table(),
+        move_cache=get_default_cache(),
+        strategies=MappingProxyType({difficulty: BotPlayer._select_strategy(difficulty) for difficulty in BOT_DIFFICULTIES}),
+    )
@@ -1,42 +1,116 @@
 import random
-from typing import Optional
+from dataclasses import dataclass
+from enum import Enum
+from typing import List, Optional, Tuple
 from board import Board
-from human_player import HumanPlayer
-from bot_player import BotPlayer
 from player import Player
 from observer import Subject,Observer
 
+
+class GameState(Enum):
+    NOT_STARTED = "not_started"
+    IN_PROGRESS = "in_progress"
+    FINISHED = "finished"
+
+
+#Eventi passati agli observer in update(subject, event)
+@dataclass(frozen=True)
+class MovePlayed:
+    player: Player
+    row: int
+    col: int
+
+
+@dataclass(frozen=True)
+class TurnChanged:
+    player: Player
+
+
+@dataclass(frozen=True)
+class GameOver:
+    result: str  #simbolo del vincitore oppure "draw", come check_game_over
+    winner: Optional[Player]
+
+
 class Game(Subject):
-    def __init__(self, player1: HumanPlayer, player2: BotPlayer, board: Board) -> None:
+    def __init__(self, player1: Player, player2: Player, board: Board, rng: Optional[random.Random] = None) -> None:
         self.board: Board = board
-        self.player1: HumanPlayer = player1
-        self.player2: BotPlayer = player2
+        self.player1: Player = player1
+        self.player2: Player = player2
         self.current_player_obj: Optional[Player] = None
+        self.starting_player: Optional[Player] = None
+        self.moves: List[Tuple[int, int]] = []  #mosse della partita in ordine, per chi registra le partite
+        self.state: GameState = GameState.NOT_STARTED
+        self._rng = rng or random  #un Random con seed rende riproducibile chi inizia (simulazioni)
         self._observers = []
+        self._result: Optional[str] = None  #aggiornato a ogni mossa, letto senza ricontrollare il tabellone
+        self._legal_moves: Optional[Tuple[Tuple[int, int], ...]] = None
 
-    def initialize_turn(self) -> None:
-        if random.choice([True, False]):
+    def initialize_turn(self, first: Optional[Player] = None) -> None:
+        #first forza chi inizia (tornei: si giocano entrambi gli ordini); altrimenti si sorteggia
+        if first is not None:
+            self.current_player_obj = first
+        elif self._rng.choice([True, False]):
             self.current_player_obj = self.player1
         else:
             self.current_player_obj = self.player2
+        self.starting_player = self.current_player_obj
+        self.moves = []
+        self._legal_moves = None
+        self._result = self._full_result()  #unico controllo completo: il tabellone iniziale può non essere vuoto
+        self.state = GameState.FINISHED if self._result else GameState.IN_PROGRESS
+
+    def play_move(self, row: int, col: int) -> bool:
+        #applica la mossa del giocatore di turno; a fine partita notifica GameOver invece di cambiare turno
+        if self.state is not GameState.IN_PROGRESS:
+            return False
+        player = self.current_player_obj
+        symbol = player.get_symbol()
+        if not self.board.make_move(row, col, symbol):
+            return False
+        self.moves.append((row, col))
+        self._legal_moves = None
+        #esito aggiornato prima delle notifiche: chi riceve MovePlayed vede già lo stato dopo la mossa.
+        #solo chi ha appena mosso può aver fatto tris
+        winner = player if self.board.check_winner(symbol) else None
+        if winner is not None or self.board.is_full():
+            self._result = symbol if winner is not None else "draw"
+            self.state = GameState.FINISHED
+        self.notify(MovePlayed(player, row, col))
+        if self.state is GameState.FINISHED:
+            self.notify(GameOver(self._result, winner))
+        else:
+            self.switch_player()
+        return True
 
     def switch_player(self) -> None:
         self.current_player_obj = self.player2 if self.current_player_obj == self.player1 else self.player1
-        self.notify() #chiama il metodo update degli observer, quidni stampa non appena il gioco inizia 
-        
+        self.notify(TurnChanged(self.current_player_obj))
+
     def check_game_over(self) -> Optional[str]:
-        winner_symbol: Optional[str] = None
-        if self.board.check_winner(self.player1.get_symbol()):
-            winner_symbol = self.player1.get_symbol()
-        elif self.board.check_winner(self.player2.get_symbol()):
-            winner_symbol = self.player2.get_symbol()
+        #simbolo del vincitore, "draw" oppure None se la partita continua
+        return self._result
+
+    def is_over(self) -> bool:
+        return self.state is GameState.FINISHED
 
-        if winner_symbol:
-            return winner_symbol
-        elif self.board.is_full():
+    def legal_moves(self) -> Tuple[Tuple[int, int], ...]:
+        #calcolate una volta per mossa; vuote se la partita non è in corso
+        if self.state is not GameState.IN_PROGRESS:
+            return ()
+        if self._legal_moves is None:
+            self._legal_moves = tuple(self.board.get_available_moves())
+        return self._legal_moves
+
+    def _full_result(self) -> Optional[str]:
+        if self.board.check_winner(self.player1.get_symbol()):
+            return self.player1.get_symbol()
+        if self.board.check_winner(self.player2.get_symbol()):
+            return self.player2.get_symbol()
+        if self.board.is_full():
             return "draw"
         return None
-    
+
     def attach(self, observer: 'Observer') -> None:
         if observer not in self._observers:
             self._observers.append(observer)
@@ -45,7 +119,6 @@ class Game(Subject):
         if observer in self._observers:
             self._observers.remove(observer)
 
-    def notify(self) -> None:
+    def notify(self, event: object) -> None:
         for observer in self._observers:
-            observer.update(self)
-
+            observer.update(self, event)
@@ -0,0 +1,248 @@
+import glob
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple
+from game import GameOver
+from observer import Observer
+from player import Player
+
+# Formato binario delle partite registrate.
+#
+# Un segmento è un file append-only che inizia con un'intestazione di 8 byte:
+#   "TRIS" | versione (u8) | larghezza (u8) | altezza (u8) | simboli in fila (u8)
+# seguita da record consecutivi, tutti con le dimensioni dell'intestazione:
+#   mosse n (u8) | flag (u8) | strategia giocatore 1 (u8) | strategia giocatore 2 (u8) | mosse
+# Flag: bit 0 = ha iniziato il giocatore 2, bit 1-2 = risultato (0 pari, 1 vince g1, 2 vince g2).
+# Ogni mossa è l'indice di cella (riga * larghezza + colonna) su 4 bit, due mosse per byte
+# (prima mossa nel nibble basso): il formato vale quindi per tabelloni fino a 16 celle.
+
+MAGIC: bytes = b"TRIS"
+VERSION: int = 1
+MAX_CELLS: int = 16  # limite delle mosse a 4 bit: chi registra deve controllarlo prima di giocare
+_HEADER = struct.Struct("<4sBBBB")
+_RECORD_HEADER = struct.Struct("<BBBB")
+
+RESULT_DRAW, RESULT_PLAYER1, RESULT_PLAYER2 = 0, 1, 2
+
+# Identificativi stabili delle strategie: si aggiungono in coda, non si rinumerano mai
+STRATEGY_IDS = {
+    "HumanPlayer": 0,
+    "EasyMoveStrategy": 1,
+    "MediumMoveStrategy": 2,
+    "HardMoveStrategy": 3,
+    "HedgedMoveStrategy": 4,
+    "PerfectMoveStrategy": 5,
+    "AlphaBetaMoveStrategy": 6,
+    "MCTSMoveStrategy": 7,
+    "TablebaseMoveStrategy": 8,
+    "LearnedMoveStrategy": 9,
+}
+UNKNOWN_STRATEGY: int = 255
+STRATEGY_NAMES = {strategy_id: name for name, strategy_id in STRATEGY_IDS.items()}
+
+
+def strategy_id(player: Player) -> int:
+    strategy = getattr(player, "_strategy", None)
+    name = type(strategy).__name__ if strategy is not None else type(player).__name__
+    return STRATEGY_IDS.get(name, UNKNOWN_STRATEGY)
+
+
+class GameRecord(NamedTuple):
+    width: int
+    height: int
+    win_length: int
+    player2_started: bool
+    result: int
+    strategy1: int
+    strategy2: int
+    moves: Tuple[Tuple[int, int], ...]
+
+
+def encode_record(width: int, player2_started: bool, result: int, strategy1: int, strategy2: int,
+                  moves: List[Tuple[int, int]]) -> bytes:
+    packed = bytearray(_RECORD_HEADER.pack(len(moves), int(player2_started) | (result << 1), strategy1, strategy2))
+    for i in range(0, len(moves), 2):
+        low = moves[i][0] * width + moves[i][1]
+        high = moves[i + 1][0] * width + moves[i + 1][1] if i + 1 < len(moves) else 0
+        packed.append(low | (high << 4))
+    return bytes(packed)
+
+
+class GameLogWriter:
+    # Scrive i record in segmenti append-only; i record restano in un buffer e vengono scritti
+    # a blocchi ogni flush_every partite. Un nuovo segmento parte quando quello attuale supera
+    # segment_size byte o quando cambiano le dimensioni del tabellone.
+
+    def __init__(self, directory: str, segment_size: int = 64 * 1024 * 1024, flush_every: int = 1000) -> None:
+        self._directory = directory
+        self._segment_size = segment_size
+        self._flush_every = flush_every
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._pending = 0
+        self._file = None
+        self._file_size = 0
+        self._dims: Optional[Tuple[int, int, int]] = None
+        self._sequence = 0
+        # Nome unico per writer: più processi e più writer possono scrivere nella stessa cartella
+        self._prefix = f"games-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, dims: Tuple[int, int, int], record: bytes) -> None:
+        if dims[0] * dims[1] > MAX_CELLS:
+            raise ValueError(f"Il formato a 4 bit per mossa supporta tabelloni fino a {MAX_CELLS} celle.")
+        with self._lock:
+            if dims != self._dims:
+                self._flush_locked()
+                self._open_segment(dims)
+            self._buffer += record
+            self._pending += 1
+            if self._pending >= self._flush_every:
+                self._flush_locked()
+
+    def _open_segment(self, dims: Tuple[int, int, int]) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._sequence += 1
+        path = os.path.join(self._directory, f"{self._prefix}-{self._sequence:06d}.tlog")
+        self._file = open(path, "ab")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, *dims))
+        self._file_size = _HEADER.size
+        self._dims = dims
+
+    def _flush_locked(self) -> None:
+        if self._buffer and self._file is not None:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self._file_size += len(self._buffer)
+            self._buffer = bytearray()
+            self._pending = 0
+            if self._file_size >= self._segment_size:
+                self._open_segment(self._dims)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._dims = None
+
+    def __enter__(self) -> "GameLogWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class GameRecorder(Observer):
+    # Observer da collegare con Game.attach: a fine partita scrive il record nel writer
+    def __init__(self, writer: GameLogWriter) -> None:
+        self._writer = writer
+
+    def update(self, subject, event) -> None:
+        if not isinstance(event, GameOver):
+            return
+        if event.winner is None:
+            code = RESULT_DRAW
+        else:
+            code = RESULT_PLAYER1 if event.winner is subject.player1 else RESULT_PLAYER2
+        board = subject.board
+        record = encode_record(board.get_width(), subject.starting_player is subject.player2, code,
+                               strategy_id(subject.player1), strategy_id(subject.player2), subject.moves)
+        self._writer.write((board.get_width(), board.get_height(), board.get_win_length()), record)
+
+
+class GameLogReader:
+    # Legge i segmenti con mmap: i record vengono decodificati uno alla volta senza
+    # caricare i file in memoria, quindi si possono scorrere milioni di partite
+    def __init__(self, paths: List[str]) -> None:
+        files: List[str] = []
+        for path in paths:
+            if os.path.isdir(path):
+                files.extend(sorted(glob.glob(os.path.join(path, "*.tlog"))))
+            else:
+                files.append(path)
+        self._files = files
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        for path in self._files:
+            yield from self._read_segment(path)
+
+    def _read_segment(self, path: str) -> Iterator[GameRecord]:
+        if os.path.getsize(path) < _HEADER.size:
+            return
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                magic, version, width, height, win_length = _HEADER.unpack_from(view, 0)
+                if magic != MAGIC or version != VERSION:
+                    raise ValueError(f"{path}: non è un segmento di partite valido")
+                offset = _HEADER.size
+                end = len(view)
+                while offset + _RECORD_HEADER.size <= end:
+                    count, flags, strategy1, strategy2 = _RECORD_HEADER.unpack_from(view, offset)
+                    offset += _RECORD_HEADER.size
+                    packed_size = (count + 1) // 2
+                    if offset + packed_size > end:
+                        break  # record troncato (scrittura interrotta): si ignora
+                    moves = _decode_moves(view[offset:offset + packed_size], count, width)
+                    offset += packed_size
+                    yield GameRecord(width, height, win_length, bool(flags & 1), (flags >> 1) & 3,
+                                     strategy1, strategy2, moves)
+            finally:
+                view.release()
+
+
+def _decode_moves(packed, count: int, width: int) -> Tuple[Tuple[int, int], ...]:
+    moves = []
+    for byte in packed:
+        moves.append(divmod(byte & 0x0F, width))
+        moves.append(divmod(byte >> 4, width))
+    return tuple(moves[:count])
+
+
+def _read_exact(stream: BinaryIO, size: int) -> Optional[bytes]:
+    data = stream.read(size)
+    while data and len(data) < size:
+        more = stream.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data if len(data) == size else None
+
+
+def read_stream(stream: BinaryIO) -> Iterator[GameRecord]:
+    # Come GameLogReader ma da uno stream (es. stdin o una pipe): i record vengono decodificati
+    # man mano che arrivano. Accetta segmenti concatenati (cat partite/*.tlog): un record non può
+    # iniziare con "TRIS" perché il primo byte (mosse, al massimo 16) vale 84 in ASCII.
+    dims: Optional[Tuple[int, int, int]] = None
+    while True:
+        head = _read_exact(stream, _RECORD_HEADER.size)
+        if head is None:
+            return
+        if head == MAGIC:
+            rest = _read_exact(stream, _HEADER.size - len(MAGIC))
+            if rest is None:
+                return
+            _, version, width, height, win_length = _HEADER.unpack(head + rest)
+            if version != VERSION:
+                raise ValueError(f"Versione del segmento non supportata: {version}")
+            dims = (width, height, win_length)
+            continue
+        if dims is None:
+            raise ValueError("Lo stream non inizia con l'intestazione di un segmento")
+        count, flags, strategy1, strategy2 = _RECORD_HEADER.unpack(head)
+        packed = _read_exact(stream, (count + 1) // 2)
+        if packed is None:
+            return  # record troncato (scrittura interrotta): si ignora
+        yield GameRecord(*dims, bool(flags & 1), (flags >> 1) & 3, strategy1, strategy2,
+                         _decode_moves(packed, count, dims[0]))
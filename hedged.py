@@ -0,0 +1,108 @@
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Deque, Dict, Optional, Tuple
+from board import Board
+from bot_player import BotPlayer, MediumMoveStrategy, MoveStrategy, OllamaMoveFacade
+from metrics import OLLAMA_FALLBACKS, OLLAMA_TIMEOUTS
+from notifier import get_notifier
+
+logger = logging.getLogger(__name__)
+
+# Thread condivisi per le richieste a Ollama: una richiesta oltre la scadenza continua qui
+# finché non viene annullata, senza bloccare chi ha chiesto la mossa
+_llm_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ollama-hedge")
+
+
+class HedgeStats:
+    # Chi ha fornito la mossa e quanto ci mette Ollama, per tarare la scadenza
+    def __init__(self, max_samples: int = 1000) -> None:
+        self._lock = threading.Lock()
+        self.sources: Dict[str, int] = {"llm": 0, "local_timeout": 0, "local_invalid": 0, "local_error": 0}
+        self._llm_latencies: Deque[float] = deque(maxlen=max_samples)
+        # Richieste annullate alla scadenza: la loro latenza è solo "oltre la scadenza" (dato censurato),
+        # quindi non entra nei percentili ma viene contata a parte
+        self.llm_censored = 0
+
+    def record_source(self, source: str) -> None:
+        with self._lock:
+            self.sources[source] = self.sources.get(source, 0) + 1
+
+    def record_llm_latency(self, seconds: float) -> None:
+        with self._lock:
+            self._llm_latencies.append(seconds)
+
+    def record_llm_censored(self) -> None:
+        with self._lock:
+            self.llm_censored += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            latencies = sorted(self._llm_latencies)
+            sources = dict(self.sources)
+            censored = self.llm_censored
+        result: Dict[str, object] = {"sources": sources, "llm_samples": len(latencies), "llm_censored": censored}
+        if latencies:
+            result["llm_p50"] = statistics.median(latencies)
+            result["llm_p90"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))]
+            result["llm_p99"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        return result
+
+
+class HedgedMoveStrategy(MoveStrategy):
+    # Difficile con latenza garantita: la richiesta a Ollama e la strategia locale partono insieme;
+    # si usa la mossa di Ollama se arriva (valida) entro la scadenza, altrimenti quella locale.
+
+    def __init__(self, local: Optional[MoveStrategy] = None, deadline: float = 2.0,
+                 stats: Optional[HedgeStats] = None) -> None:
+        self.local = local or MediumMoveStrategy()
+        self.deadline = deadline
+        self.stats = stats or HedgeStats()
+
+    def get_move(self, board: Board, bot: BotPlayer) -> Optional[Tuple[int, int]]:
+        started = time.perf_counter()
+        cancel = threading.Event()
+        llm_future: Future = _llm_executor.submit(OllamaMoveFacade(bot).request_move, board.copy(), cancel)
+
+        def record_latency(future: Future) -> None:
+            # Solo le generazioni complete con una mossa: un futuro annullato alla scadenza finisce
+            # subito dopo di essa, e la sua durata riporterebbe la scadenza invece della latenza di Ollama
+            if cancel.is_set():
+                self.stats.record_llm_censored()
+            elif not future.cancelled() and future.exception() is None and future.result() is not None:
+                self.stats.record_llm_latency(time.perf_counter() - started)
+        llm_future.add_done_callback(record_latency)
+
+        local_move = self.local.get_move(board.copy(), bot)
+
+        move, source = self._await_llm(llm_future, started, cancel)
+        self.stats.record_source(source)
+        if source == "local_timeout":
+            OLLAMA_TIMEOUTS.inc()
+        if source != "llm":
+            OLLAMA_FALLBACKS.inc(reason=source.removeprefix("local_"))
+        logger.debug("hedged move from %s after %.3fs", source, time.perf_counter() - started)
+        if move is not None:
+            get_notifier().success(f"🦙 Llama sceglie: {move}")
+            return move
+        if source == "local_timeout":
+            get_notifier().info(f"⏱️ Llama non ha risposto entro {self.deadline:.1f}s: uso la strategia locale")
+        return local_move
+
+    def _await_llm(self, llm_future: Future, started: float,
+                   cancel: threading.Event) -> Tuple[Optional[Tuple[int, int]], str]:
+        remaining = self.deadline - (time.perf_counter() - started)
+        try:
+            move = llm_future.result(timeout=max(0.0, remaining))
+        except FutureTimeoutError:
+            cancel.set()  # lo streaming si interrompe alla prossima riga ricevuta
+            return None, "local_timeout"
+        except Exception:
+            return None, "local_error"
+        if move is None:
+            return None, "local_invalid"
+        return move, "llm"
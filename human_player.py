@@ -10,7 +10,7 @@ class HumanPlayer(Player):
     def make_move(self, board: Board) -> Optional[Tuple[int, int]]:
          while True:
             try:
-                move_str = input("Enter your move (row,col) [1-3]: ").strip() #chiede all'utente una mossa in formato '2,3'
+                move_str = input(f"Enter your move (row,col) [1-{board.get_height()},1-{board.get_width()}]: ").strip() #chiede all'utente una mossa in formato '2,3'
                 row, col = map(int, move_str.split(",")) #converte la stringa in due numeri interi
                 row -= 1  # da 1-based a 0-based
                 col -= 1
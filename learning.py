@@ -0,0 +1,239 @@
+import argparse
+import math
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+from board import Board, winning_lines
+from bot_player import BotPlayer, MediumMoveStrategy, MoveStrategy
+from constants import EMPTY_CELL
+from profiling import add_profile_arguments, profiled, single_process_when_profiling
+
+# Bot che ha imparato a giocare: Q-learning tabellare in self-play, addestrato offline.
+#
+# Gli stati sono relativi a chi deve muovere, con lo stesso indice in base 3 delle tablebase
+# (cifra 0 = vuota, 1 = chi muove, 2 = avversario, cella i con peso 3^i). La politica è una
+# matrice int8 (3^celle, celle): Q(stato, cella) * 127, con Q in [-1, 1] dal punto di vista di
+# chi muove. Viene salvata come .npy e letta con mmap alla prima mossa, quindi una mossa è una
+# lettura di riga senza ricerca né rete. La temperatura della softmax regola la forza del bot:
+# 0 sceglie sempre la mossa migliore, valori alti si avvicinano al gioco casuale.
+
+MAX_CELLS: int = 12  # 3^12 * 12 byte = 6 MB di politica
+QUANT: int = 127
+
+
+def policy_path(directory: str, width: int, height: int, win_length: int) -> str:
+    return os.path.join(directory, f"policy-{width}x{height}x{win_length}.npy")
+
+
+def default_directory() -> str:
+    return os.environ.get("POLICY_DIR", "policies")
+
+
+# --- Addestramento (NumPy, solo offline) ---
+
+def _lines_by_cell(width: int, height: int, win_length: int) -> List[List[Tuple[int, ...]]]:
+    # Per ogni cella le linee vincenti che la contengono: dopo una mossa si controllano solo quelle
+    by_cell: List[List[Tuple[int, ...]]] = [[] for _ in range(width * height)]
+    for line in winning_lines(width, height, win_length):
+        for cell in line:
+            by_cell[cell].append(line)
+    return by_cell
+
+
+def _self_play(q_path: str, dims: Tuple[int, int, int], episodes: int, seed: int,
+               alpha: float, gamma: float, epsilon: float):
+    # Un worker gioca episodes partite contro se stesso partendo dalla Q condivisa del giro e
+    # restituisce solo le righe che ha modificato, come differenza rispetto alla Q di partenza
+    import numpy as np
+    width, height, win_length = dims
+    cells = width * height
+    q = np.memmap(q_path, dtype=np.float32, mode="r", shape=(3 ** cells, cells))
+    powers = [3 ** i for i in range(cells)]
+    lines = _lines_by_cell(width, height, win_length)
+    rng = random.Random(seed)
+    rows: Dict[int, List[float]] = {}
+
+    def row(index: int) -> List[float]:
+        values = rows.get(index)
+        if values is None:
+            values = rows[index] = q[index].tolist()
+        return values
+
+    for _ in range(episodes):
+        grid = [0] * cells
+        indices = [0, 0]  # indice della posizione visto da ciascun giocatore
+        empty = list(range(cells))
+        player = 0
+        while True:
+            values = row(indices[player])
+            if rng.random() < epsilon:
+                cell = rng.choice(empty)
+            else:
+                best = max(values[c] for c in empty)
+                cell = rng.choice([c for c in empty if values[c] == best])
+            grid[cell] = player + 1
+            indices[player] += powers[cell]
+            indices[1 - player] += 2 * powers[cell]
+            empty.remove(cell)
+            # Negamax: il valore della mossa è il contrario del valore della risposta migliore
+            if any(all(grid[c] == player + 1 for c in line) for line in lines[cell]):
+                target, done = 1.0, True
+            elif not empty:
+                target, done = 0.0, True
+            else:
+                reply = row(indices[1 - player])
+                target, done = -gamma * max(reply[c] for c in empty), False
+            values[cell] += alpha * (target - values[cell])
+            if done:
+                break
+            player = 1 - player
+
+    changed = np.fromiter(rows, dtype=np.int64, count=len(rows))
+    updated = np.array([rows[index] for index in rows], dtype=np.float32).reshape(-1, cells)
+    return changed, updated - q[changed]
+
+
+def train(dims: Tuple[int, int, int], output: str, episodes: int = 200_000, rounds: int = 20,
+          workers: Optional[int] = None, alpha: float = 0.5, gamma: float = 0.95,
+          epsilon: float = 0.3, seed: int = 0, progress: bool = True) -> None:
+    # A ogni giro i worker partono dalla stessa Q; le loro modifiche vengono unite facendo la media,
+    # stato per stato, delle differenze dei soli worker che hanno visitato quello stato
+    import numpy as np
+    width, height, win_length = dims
+    Board(width, height, win_length)  # solleva ValueError per dimensioni non valide
+    cells = width * height
+    if cells > MAX_CELLS:
+        raise ValueError(f"Politiche apprese supportate fino a {MAX_CELLS} celle.")
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    q_path = output + ".q.tmp"
+    q = np.memmap(q_path, dtype=np.float32, mode="w+", shape=(3 ** cells, cells))
+    per_worker = max(1, episodes // (rounds * workers))
+
+    started = time.perf_counter()
+    try:
+        # Con un solo worker si gioca nel processo principale, dove lo vede anche --profile
+        with ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext() as executor:
+            run = executor.map if executor is not None else map
+            for round_index in range(rounds):
+                q.flush()
+                seeds = [seed + round_index * workers + worker for worker in range(workers)]
+                results = list(run(_self_play, *zip(*[(q_path, dims, per_worker, worker_seed, alpha, gamma, epsilon)
+                                                       for worker_seed in seeds])))
+                touched = np.concatenate([changed for changed, _ in results])
+                states, counts = np.unique(touched, return_counts=True)
+                total = np.zeros((len(states), cells), dtype=np.float32)
+                for changed, delta in results:
+                    np.add.at(total, np.searchsorted(states, changed), delta)
+                q[states] += total / counts[:, None]
+                if progress:
+                    print(f"[{time.perf_counter() - started:7.2f}s] giro {round_index + 1}/{rounds}: "
+                          f"{per_worker * workers * (round_index + 1)} partite, {len(states)} stati aggiornati",
+                          file=sys.stderr)
+
+        temporary = output + ".tmp.npy"
+        np.save(temporary, np.rint(np.clip(q, -1.0, 1.0) * QUANT).astype(np.int8))
+        del q
+        os.replace(temporary, output)  # sostituzione atomica, anche con partite in corso che leggono la politica
+    finally:
+        if os.path.exists(q_path):
+            os.remove(q_path)
+
+
+# --- Gioco ---
+
+_policies: Dict[str, object] = {}
+_policies_lock = threading.Lock()
+
+
+def open_policy(width: int, height: int, win_length: int, directory: Optional[str] = None):
+    # None se per queste dimensioni non c'è una politica addestrata
+    path = policy_path(directory or default_directory(), width, height, win_length)
+    with _policies_lock:
+        if path not in _policies:
+            policy = None
+            if os.path.exists(path):
+                import numpy as np  # import locale: senza politica non serve NumPy
+                policy = np.load(path, mmap_mode="r")
+                cells = width * height
+                if policy.dtype != np.int8 or policy.shape != (3 ** cells, cells):
+                    raise ValueError(f"{path}: politica non valida per un tabellone {width}x{height}")
+            _policies[path] = policy
+        return _policies[path]
+
+
+class LearnedMoveStrategy(MoveStrategy):
+    # Sceglie con una softmax sui valori Q appresi; senza politica per queste dimensioni si usa
+    # la strategia di riserva (di default MediumMoveStrategy, anche lei senza ricerca)
+    def __init__(self, temperature: float = 0.0, directory: Optional[str] = None,
+                 fallback: Optional[MoveStrategy] = None) -> None:
+        self.temperature = temperature
+        self.directory = directory
+        self.fallback = fallback
+
+    def get_move(self, board: Board, bot: BotPlayer) -> Optional[Tuple[int, int]]:
+        width = board.get_width()
+        policy = open_policy(width, board.get_height(), board.get_win_length(), self.directory)
+        if policy is None:
+            return (self.fallback or MediumMoveStrategy()).get_move(board, bot)
+        moves = board.get_available_moves()
+        if not moves:
+            return None
+        symbol = bot.get_symbol()
+        index = 0
+        power = 1
+        for cell in (cell for row in board.get_grid() for cell in row):
+            if cell != EMPTY_CELL:
+                index += power * (1 if cell == symbol else 2)
+            power *= 3
+        values = policy[index].tolist()
+        scores = [values[r * width + c] / QUANT for r, c in moves]
+        best = max(scores)
+        if self.temperature <= 0:
+            return random.choice([move for move, score in zip(moves, scores) if score == best])
+        weights = [math.exp((score - best) / self.temperature) for score in scores]
+        return random.choices(moves, weights)[0]
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Addestra il bot appreso con Q-learning in self-play.")
+    parser.add_argument("--size", default="3x3", help=f"larghezza x altezza, al massimo {MAX_CELLS} celle")
+    parser.add_argument("--win", type=int, default=3, help="simboli in fila per vincere")
+    parser.add_argument("--episodes", type=int, default=200_000, help="partite di self-play in totale")
+    parser.add_argument("--rounds", type=int, default=20, help="giri di unione degli aggiornamenti dei worker")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--alpha", type=float, default=0.5, help="tasso di apprendimento")
+    parser.add_argument("--gamma", type=float, default=0.95, help="sconto: preferisce le vittorie rapide")
+    parser.add_argument("--epsilon", type=float, default=0.3, help="probabilità di mossa esplorativa")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default=None, help="cartella delle politiche (default: POLICY_DIR o policies/)")
+    parser.add_argument("--eval-games", type=int, default=2000, help="partite contro 'medio' per ogni temperatura")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    single_process_when_profiling(args)
+
+    width, height = map(int, args.size.lower().split("x"))
+    dims = (width, height, args.win)
+    directory = args.output_dir or default_directory()
+    output = policy_path(directory, width, height, args.win)
+    with profiled(args.profile, args.profile_top):
+        train(dims, output, args.episodes, args.rounds, args.workers, args.alpha, args.gamma, args.epsilon, args.seed)
+    print(f"{output}: {os.path.getsize(output)} byte")
+
+    # Forza al variare della temperatura, contro la strategia tattica di 'medio'
+    from simulate import SimulationStats, simulate
+    for temperature in (0.0, 0.05, 0.1, 0.2, 0.5, 1.0):
+        stats = SimulationStats()
+        for stats in simulate(LearnedMoveStrategy(temperature, directory), "medio", args.eval_games,
+                              args.workers, seed=args.seed, dims=dims):
+            pass
+        print(f"temperatura {temperature:4.2f}: {stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
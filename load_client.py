@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Generatore di carico per server.py: apre molte connessioni concorrenti, ognuna gioca partite
+# con mosse casuali legali, e misura latenza delle richieste e throughput.
+
+
+@dataclass
+class LoadStats:
+    games: int = 0
+    requests: int = 0
+    errors: int = 0
+    results: Dict[str, int] = field(default_factory=dict)
+    latencies: List[float] = field(default_factory=list)
+
+    def summary(self, elapsed: float) -> str:
+        if not self.latencies:
+            return "no requests completed"
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        return (f"games={self.games} requests={self.requests} errors={self.errors} "
+                f"elapsed={elapsed:.2f}s throughput={self.requests / elapsed:.0f} req/s "
+                f"latency p50={statistics.median(latencies) * 1000:.2f}ms "
+                f"p90={percentile(0.9):.2f}ms p99={percentile(0.99):.2f}ms max={latencies[-1] * 1000:.2f}ms "
+                f"results={self.results}")
+
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                   message: Dict[str, Any], stats: LoadStats) -> Dict[str, Any]:
+    started = time.perf_counter()
+    writer.write(json.dumps(message).encode("utf-8") + b"\n")
+    await writer.drain()
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("server closed the connection")
+    stats.latencies.append(time.perf_counter() - started)
+    stats.requests += 1
+    return json.loads(line)
+
+
+async def _client(host: str, port: int, games: int, new_game: Dict[str, Any], rng: random.Random,
+                  stats: LoadStats) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(games):
+            state = await _request(reader, writer, new_game, stats)
+            while state.get("type") == "state" and state["result"] is None:
+                free = [(r, c) for r, row in enumerate(state["board"]) for c, cell in enumerate(row) if not cell]
+                row, col = rng.choice(free)
+                state = await _request(reader, writer, {"op": "move", "row": row, "col": col}, stats)
+            if state.get("type") == "error":
+                stats.errors += 1
+                continue
+            stats.games += 1
+            result = "win" if state["result"] == new_game["symbol"] else "draw" if state["result"] == "draw" else "loss"
+            stats.results[result] = stats.results.get(result, 0) + 1
+        writer.write(b'{"op": "quit"}\n')
+        await writer.drain()
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_load(host: str, port: int, connections: int, games: int, difficulty: str,
+                   width: int, height: int, win_length: int, seed: Optional[int]) -> LoadStats:
+    stats = LoadStats()
+    new_game = {"op": "new", "name": "load", "symbol": "X", "difficulty": difficulty,
+                "width": width, "height": height, "win_length": win_length}
+    master = random.Random(seed)
+    clients = [_client(host, port, games, new_game, random.Random(master.getrandbits(64)), stats)
+               for _ in range(connections)]
+    for outcome in await asyncio.gather(*clients, return_exceptions=True):
+        if isinstance(outcome, Exception):
+            stats.errors += 1
+    return stats
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generatore di carico per il server del tris.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--connections", type=int, default=100, help="connessioni concorrenti")
+    parser.add_argument("--games", type=int, default=10, help="partite per connessione")
+    parser.add_argument("--difficulty", default="facile")
+    parser.add_argument("--size", type=int, nargs=2, default=(3, 3), metavar=("W", "H"))
+    parser.add_argument("--win", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    stats = asyncio.run(run_load(args.host, args.port, args.connections, args.games, args.difficulty,
+                                 args.size[0], args.size[1], args.win, args.seed))
+    print(stats.summary(time.perf_counter() - started))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,39 @@
+import atexit
+import os
 import streamlit as st
 from typing import List, Tuple, Optional
-from constants import HUMAN_SYMBOL, AI_SYMBOL, EMPTY_CELL
+from constants import HUMAN_SYMBOL, AI_SYMBOL, EMPTY_CELL, BOT_DIFFICULTIES, UI_PACING, MAX_BOARD_SIDE
 from board import Board
 from human_player import HumanPlayer
-from bot_player import BotPlayer
 from game import Game
+from pondering import Ponderer
+from engine import EngineResources, load_engine_resources
+from game_log import MAX_CELLS, GameLogWriter, GameRecorder
+from notifier import StreamlitNotifier, set_notifier
+from metrics import MetricsObserver, serve_metrics
+
+@st.cache_resource
+def get_engine_resources() -> EngineResources:
+    #caricate una sola volta per processo e condivise da tutte le sessioni
+    return load_engine_resources()
+
+@st.cache_resource
+def get_game_recorder() -> Optional[GameRecorder]:
+    #con GAME_LOG_DIR impostata tutte le sessioni registrano le partite nello stesso writer
+    log_dir = os.environ.get("GAME_LOG_DIR")
+    if not log_dir:
+        return None
+    writer = GameLogWriter(log_dir, flush_every=100)
+    atexit.register(writer.close)  #le partite ancora nel buffer vengono scritte alla chiusura
+    return GameRecorder(writer)
+
+@st.cache_resource
+def get_metrics_observer() -> MetricsObserver:
+    #con METRICS_PORT impostata le metriche del processo sono esposte su /metrics e /metrics.json
+    port = os.environ.get("METRICS_PORT")
+    if port:
+        serve_metrics(int(port))
+    return MetricsObserver()
 
 def initialize_session_state() -> None:
     if 'game_started' not in st.session_state:
@@ -12,26 +41,34 @@ def initialize_session_state() -> None:
         st.session_state.player_name = ""
         st.session_state.player_symbol = HUMAN_SYMBOL
         st.session_state.bot_difficulty = "facile"
-        st.session_state.board_obj = Board()
-        st.session_state.player1_obj = None
-        st.session_state.player2_obj = None
-        st.session_state.game_obj = None
-        st.session_state.winner = None
-        st.session_state.draw = False
+        st.session_state.bot_temperature = 0.0
+        st.session_state.board_width = 3
+        st.session_state.board_height = 3
+        st.session_state.win_length = 3
+        st.session_state.game_obj = None  #per sessione restano solo tabellone e turno (dentro Game)
         st.session_state.message = ""
+        st.session_state.ponderer = Ponderer()
 
 def start_new_game() -> None:
+    st.session_state.ponderer.cancel()  #il pondering della partita precedente non serve più
     if st.session_state.game_started:
-        st.session_state.board_obj.reset()
-        st.session_state.winner = None
-        st.session_state.draw = False
         st.session_state.message = ""
 
-        st.session_state.player1_obj = HumanPlayer(st.session_state.player_name, st.session_state.player_symbol)
+        board = Board(st.session_state.board_width, st.session_state.board_height, st.session_state.win_length)
+        human = HumanPlayer(st.session_state.player_name, st.session_state.player_symbol)
         ai_symbol: str = AI_SYMBOL if st.session_state.player_symbol == HUMAN_SYMBOL else HUMAN_SYMBOL
-        st.session_state.player2_obj = BotPlayer("Bot", ai_symbol, st.session_state.bot_difficulty)
-
-        st.session_state.game_obj = Game(st.session_state.player1_obj, st.session_state.player2_obj, st.session_state.board_obj)
+        strategy = None
+        if st.session_state.bot_difficulty == "appreso" and st.session_state.bot_temperature > 0:
+            from learning import LearnedMoveStrategy
+            strategy = LearnedMoveStrategy(st.session_state.bot_temperature)  #forza scelta dall'utente
+        bot = get_engine_resources().create_bot("Bot", ai_symbol, st.session_state.bot_difficulty,
+                                                pacing=UI_PACING, strategy=strategy)
+
+        st.session_state.game_obj = Game(human, bot, board)
+        st.session_state.game_obj.attach(get_metrics_observer())
+        recorder = get_game_recorder()
+        if recorder and board.get_width() * board.get_height() <= MAX_CELLS:
+            st.session_state.game_obj.attach(recorder)
         st.session_state.game_obj.initialize_turn()
     else:
         for key in list(st.session_state.keys()):
@@ -48,12 +85,11 @@ def handle_player_move(row: int, col: int) -> None:
         return
 
     if game.current_player_obj == game.player1:
-        if game.board.make_move(row, col, game.player1.get_symbol()):
+        if game.play_move(row, col):
             game_result: Optional[str] = game.check_game_over()
             if game_result:
                 announce_result(game_result)
             else:
-                game.switch_player()
                 st.rerun()
         else:
             st.session_state.message = "🚫 Mossa non valida!"
@@ -67,30 +103,28 @@ def handle_bot_move() -> None:
         return
 
     if game.current_player_obj == game.player2:
-        with st.spinner("🤖 Il Bot sta pensando..."):
-            bot_move: Optional[Tuple[int, int]] = game.player2.make_move(game.board)
-        if bot_move:
-            row, col = bot_move
-            game.board.make_move(row, col, game.player2.get_symbol())
+        #risposta già calcolata mentre l'umano pensava: nessuna attesa
+        bot_move: Optional[Tuple[int, int]] = st.session_state.ponderer.get_reply(game.board)
+        if bot_move is None:
+            with st.spinner("🤖 Il Bot sta pensando..."):
+                bot_move = game.player2.make_move(game.board)
+        if bot_move and game.play_move(*bot_move):
             game_result: Optional[str] = game.check_game_over()
             if game_result:
                 announce_result(game_result)
-            else:
-                game.switch_player()
             st.rerun()
         else:
             st.session_state.message = "⚠️ Il bot non ha trovato una mossa valida."
             game.switch_player()
 
 def announce_result(result: str) -> None:
+    game: Game = st.session_state.game_obj
     if result == "draw":
-        st.session_state.draw = True
         st.session_state.message = "🤝 Pareggio! Nessun vincitore."
         st.balloons()
     else:
-        winner_name: str = st.session_state.player1_obj.get_name() if result == st.session_state.player1_obj.get_symbol() else st.session_state.player2_obj.get_name()
-        st.session_state.winner = winner_name
-        if result == st.session_state.player1_obj.get_symbol():
+        winner_name: str = game.player1.get_name() if result == game.player1.get_symbol() else game.player2.get_name()
+        if result == game.player1.get_symbol():
             st.session_state.message = f"🎉 {winner_name} ha vinto! 🎉"
             st.balloons()
         else:
@@ -99,6 +133,7 @@ def announce_result(result: str) -> None:
 
 #Interfaccia Streamlit 
 st.set_page_config(layout="centered", page_title="🎲 Gioco del Tris")
+set_notifier(StreamlitNotifier())  #i messaggi di strategie e motore compaiono nella pagina
 
 st.markdown("<h1 style='text-align: center; color: #FF4B4B;'>✨ Gioco del Tris ✨</h1>", unsafe_allow_html=True)
 
@@ -112,14 +147,34 @@ if not st.session_state.game_started:
 
     bot_difficulty_select: str = st.selectbox(
         "🧠 Difficoltà del Bot:", 
-        ["facile", "medio", "difficile"], 
-        index=["facile", "medio", "difficile"].index(st.session_state.bot_difficulty)
+        BOT_DIFFICULTIES,
+        index=BOT_DIFFICULTIES.index(st.session_state.bot_difficulty)
     )
+    bot_temperature_input: float = st.session_state.bot_temperature
+    if bot_difficulty_select == "appreso":
+        #0 = la mossa migliore appresa, valori alti = gioco quasi casuale
+        bot_temperature_input = st.slider("🌡️ Temperatura del bot appreso:", min_value=0.0, max_value=1.0,
+                                          value=st.session_state.bot_temperature, step=0.05)
+
+    size_cols = st.columns(3)
+    with size_cols[0]:
+        board_width_input: int = st.number_input("↔️ Colonne:", min_value=3, max_value=MAX_BOARD_SIDE, value=st.session_state.board_width)
+    with size_cols[1]:
+        board_height_input: int = st.number_input("↕️ Righe:", min_value=3, max_value=MAX_BOARD_SIDE, value=st.session_state.board_height)
+    with size_cols[2]:
+        win_length_input: int = st.number_input("🏁 Simboli in fila:", min_value=3, max_value=MAX_BOARD_SIDE, value=st.session_state.win_length)
 
     if st.button("🚀 Inizia la partita", type="primary"):
+        if win_length_input > max(board_width_input, board_height_input):
+            st.error("I simboli in fila non possono superare il lato del tabellone.")
+            st.stop()
+        st.session_state.board_width = int(board_width_input)
+        st.session_state.board_height = int(board_height_input)
+        st.session_state.win_length = int(win_length_input)
         st.session_state.player_name = player_name_input
         st.session_state.player_symbol = player_symbol_radio
         st.session_state.bot_difficulty = bot_difficulty_select
+        st.session_state.bot_temperature = float(bot_temperature_input)
         st.session_state.game_started = True
         start_new_game()
 else:
@@ -128,18 +183,18 @@ else:
     st.subheader(f"🆚 {game.player1.get_name()} ({game.player1.get_symbol()}) vs {game.player2.get_name()} ({game.player2.get_symbol()})")
     st.markdown(f"<h4 style='color:#4B9CD3;'>🎯 Turno: {game.current_player_obj.get_name()} ({game.current_player_obj.get_symbol()})</h4>", unsafe_allow_html=True)
 
+    #stato letto una volta per render: check_game_over e legal_moves sono già in cache nel Game
+    game_result: Optional[str] = game.check_game_over()
+    my_turn: bool = game.current_player_obj == game.player1
+    playable = set(game.legal_moves()) if my_turn else set()
     grid_cells: List[List[str]] = game.board.get_grid()
-    for r in range(3):
-        row_cols = st.columns(3)
-        for c in range(3):
+    for r in range(game.board.get_height()):
+        row_cols = st.columns(game.board.get_width())
+        for c in range(game.board.get_width()):
             cell_value: str = grid_cells[r][c]
             button_label: str = " " if cell_value == EMPTY_CELL else f"**{cell_value}**"
             style = "color: green;" if cell_value == "X" else "color: red;"
-            disabled = (
-                cell_value != EMPTY_CELL or
-                game.check_game_over() is not None or
-                game.current_player_obj != game.player1 #disabilita i bottoni se la cella è occupata o se non è il tuo turno
-            )
+            disabled = (r, c) not in playable  #cella occupata, partita finita o turno del bot
             with row_cols[c]:
                 if st.button(button_label, key=f"cell_{r}_{c}", disabled=disabled):
                     handle_player_move(r, c)
@@ -157,5 +212,7 @@ else:
         if st.button("🔄 Nuova Partita", type="secondary"):
             start_new_game()
 
-    if game.current_player_obj == game.player2 and not game.check_game_over():
+    if not my_turn and game_result is None:
         handle_bot_move()
+    elif my_turn and game_result is None:
+        st.session_state.ponderer.start(game.board, game.player2, game.player1.get_symbol())
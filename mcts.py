@@ -0,0 +1,175 @@
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from board import DIRECTIONS, Board
+from bot_player import BotPlayer, MoveStrategy
+from constants import EMPTY_CELL
+
+_EXPLORATION: float = math.sqrt(2)
+
+# Pool di processi condiviso da tutte le istanze della strategia, creato alla prima mossa e mai
+# sostituito: altri thread (sessioni Streamlit, motore condiviso) possono starci inviando lavoro.
+# Con più alberi che processi gli alberi in eccesso aspettano in coda.
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=max(workers, os.cpu_count() or 1))
+        return _executor
+
+
+def _is_win(cells: List[int], index: int, player: int, width: int, height: int, win_length: int) -> bool:
+    row, col = divmod(index, width)
+    for dr, dc in DIRECTIONS:
+        count = 1
+        for sign in (1, -1):
+            r, c = row + dr * sign, col + dc * sign
+            while 0 <= r < height and 0 <= c < width and cells[r * width + c] == player:
+                count += 1
+                r += dr * sign
+                c += dc * sign
+        if count >= win_length:
+            return True
+    return False
+
+
+def _candidates(cells: List[int], width: int, height: int) -> List[int]:
+    # Sui tabelloni grandi l'albero si espande solo vicino ai pezzi già giocati
+    empty = [i for i, cell in enumerate(cells) if cell == 0]
+    if len(cells) <= 25 or len(empty) == len(cells):
+        return empty if len(empty) < len(cells) else [(height // 2) * width + width // 2]
+    near = []
+    for index in empty:
+        row, col = divmod(index, width)
+        if any(cells[r * width + c] for r in range(max(0, row - 1), min(height, row + 2))
+               for c in range(max(0, col - 1), min(width, col + 2))):
+            near.append(index)
+    return near
+
+
+class _Node:
+    __slots__ = ("move", "player", "parent", "children", "untried", "visits", "wins")
+
+    def __init__(self, move: int, player: int, parent: Optional["_Node"], untried: List[int]) -> None:
+        self.move = move          # mossa che ha portato a questo nodo
+        self.player = player      # giocatore che ha fatto quella mossa
+        self.parent = parent
+        self.children: List["_Node"] = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0.0
+
+    def select_child(self) -> "_Node":
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits + _EXPLORATION * math.sqrt(log_visits / child.visits))
+
+
+def _search_tree(cells: List[int], width: int, height: int, win_length: int,
+                 playouts: Optional[int], time_limit: Optional[float], seed: int,
+                 cancel: Optional[threading.Event] = None) -> Dict[int, int]:
+    # UCT su un singolo albero; restituisce le visite per mossa alla radice (parallelismo a radice).
+    # cancel si può usare solo nello stesso processo (pondering)
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    root = _Node(-1, 2, None, _candidates(cells, width, height))  # alla radice muove il bot (1)
+    done = 0
+    while ((playouts is None or done < playouts) and (deadline is None or time.perf_counter() < deadline)
+           and not (cancel is not None and cancel.is_set())):
+        done += 1
+        node = root
+        state = cells[:]
+        winner = 0
+
+        # Selezione
+        while not node.untried and node.children:
+            node = node.select_child()
+            state[node.move] = node.player
+        if node.move >= 0 and _is_win(state, node.move, node.player, width, height, win_length):
+            winner = node.player
+        # Espansione
+        elif node.untried:
+            move = node.untried.pop(rng.randrange(len(node.untried)))
+            player = 3 - node.player
+            state[move] = player
+            child = _Node(move, player, node, _candidates(state, width, height))
+            node.children.append(child)
+            node = child
+            if _is_win(state, move, player, width, height, win_length):
+                winner = player
+        # Simulazione casuale
+        if not winner:
+            empty = [i for i, cell in enumerate(state) if cell == 0]
+            rng.shuffle(empty)
+            player = node.player
+            for move in empty:
+                player = 3 - player
+                state[move] = player
+                if _is_win(state, move, player, width, height, win_length):
+                    winner = player
+                    break
+        # Retropropagazione
+        while node is not None:
+            node.visits += 1
+            if winner == node.player:
+                node.wins += 1.0
+            elif winner == 0:
+                node.wins += 0.5
+            node = node.parent
+    return {child.move: child.visits for child in root.children}
+
+
+class MCTSMoveStrategy(MoveStrategy):
+    # Monte Carlo Tree Search (UCT) con parallelismo a radice: ogni processo costruisce un albero
+    # indipendente con il proprio seed e alla fine si sommano le visite delle mosse alla radice.
+
+    def __init__(self, playouts: Optional[int] = None, time_limit: Optional[float] = None,
+                 workers: Optional[int] = None) -> None:
+        if playouts is None and time_limit is None:
+            time_limit = 1.0
+        self.playouts = playouts
+        self.time_limit = time_limit
+        self.workers = workers or os.cpu_count() or 1
+
+    def get_move(self, board: Board, bot: BotPlayer) -> Optional[Tuple[int, int]]:
+        return self._best_move(board, bot)
+
+    def ponder_move(self, board: Board, bot: BotPlayer, cancel: threading.Event) -> Optional[Tuple[int, int]]:
+        # Un solo albero nel thread del pondering: il pool condiviso resta libero per le mosse vere
+        return self._best_move(board, bot, cancel)
+
+    def _best_move(self, board: Board, bot: BotPlayer,
+                   cancel: Optional[threading.Event] = None) -> Optional[Tuple[int, int]]:
+        width, height = board.get_width(), board.get_height()
+        grid = board.get_grid()
+        cells = [0 if cell == EMPTY_CELL else 1 if cell == bot.get_symbol() else 2 for row in grid for cell in row]
+        moves = _candidates(cells, width, height)
+        if not moves:
+            return None
+        if len(moves) == 1:
+            return divmod(moves[0], width)
+
+        workers = 1 if cancel is not None else self.workers
+        playouts = -(-self.playouts // workers) if self.playouts is not None else None
+        seeds = [random.getrandbits(32) for _ in range(workers)]
+        args = (cells, width, height, board.get_win_length(), playouts, self.time_limit)
+        if workers == 1:
+            results = [_search_tree(*args, seeds[0], cancel)]
+        else:
+            executor = _get_executor(workers)
+            results = [future.result() for future in [executor.submit(_search_tree, *args, seed) for seed in seeds]]
+
+        visits: Dict[int, int] = {}
+        for result in results:
+            for move, count in result.items():
+                visits[move] = visits.get(move, 0) + count
+        if not visits:
+            return divmod(random.choice(moves), width)
+        return divmod(max(visits, key=visits.get), width)
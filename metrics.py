@@ -0,0 +1,330 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from game import GameOver, MovePlayed
+from observer import Observer
+
+# Metriche del motore: contatori, istogrammi e meter (contatore + frequenza al secondo).
+# Si esportano in formato testo di Prometheus (file o endpoint HTTP) e in JSON. Solo libreria
+# standard: il modulo è importato anche dalle modalità senza interfaccia.
+#
+# Con più processi (simulate, tournament) ogni worker raccoglie nel proprio registro e passa
+# drain() al processo principale, che lo somma con merge().
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                                      0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, lock: threading.Lock) -> None:
+        self.name = name
+        self.help = help_text
+        self._lock = lock
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        self._inc(_label_key(labels), amount)
+
+    def labels(self, **labels: str) -> "BoundMetric":
+        return BoundMetric(self, _label_key(labels))
+
+    def _inc(self, key: LabelKey, amount: float) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def _snapshot(self) -> List[dict]:
+        return [{"labels": dict(key), "value": value} for key, value in self._values.items()]
+
+    def _merge(self, samples: List[dict]) -> None:
+        for sample in samples:
+            key = _label_key(sample["labels"])
+            self._values[key] = self._values.get(key, 0.0) + sample["value"]
+
+    def _reset(self) -> None:
+        self._values.clear()
+
+    def _prometheus(self, elapsed: float) -> List[str]:
+        lines = [f"# HELP {self.name}_total {self.help}", f"# TYPE {self.name}_total counter"]
+        lines += [f"{self.name}_total{_format_labels(key)} {_format_value(value)}"
+                  for key, value in sorted(self._values.items())]
+        return lines
+
+
+class Meter(Counter):
+    # Contatore che espone anche la frequenza media dall'avvio del registro (partite/s, mosse/s)
+    kind = "meter"
+
+    def _prometheus(self, elapsed: float) -> List[str]:
+        lines = super()._prometheus(elapsed)
+        lines += [f"# HELP {self.name}_per_second {self.help} (media dall'avvio)",
+                  f"# TYPE {self.name}_per_second gauge"]
+        lines += [f"{self.name}_per_second{_format_labels(key)} {_format_value(value / elapsed if elapsed > 0 else 0.0)}"
+                  for key, value in sorted(self._values.items())]
+        return lines
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, lock: threading.Lock,
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._lock = lock
+        # per etichette: conteggi per intervallo (l'ultimo è +Inf), somma e numero di osservazioni
+        self._values: Dict[LabelKey, List] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        self._observe(_label_key(labels), value)
+
+    def labels(self, **labels: str) -> "BoundMetric":
+        return BoundMetric(self, _label_key(labels))
+
+    def _observe(self, key: LabelKey, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            entry = self._values.get(_label_key(labels))
+            return entry[2] if entry else 0
+
+    def _snapshot(self) -> List[dict]:
+        samples = []
+        for key, (counts, total, count) in self._values.items():
+            samples.append({"labels": dict(key), "count": count, "sum": total,
+                            "mean": total / count if count else 0.0,
+                            "p50": self._quantile(counts, count, 0.5), "p90": self._quantile(counts, count, 0.9),
+                            "p99": self._quantile(counts, count, 0.99), "buckets": list(counts)})
+        return samples
+
+    def _quantile(self, counts: List[int], count: int, q: float) -> Optional[float]:
+        # Estremo superiore dell'intervallo che contiene il quantile (None se oltre l'ultimo)
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            cumulative += bucket_count
+            if count and cumulative >= rank:
+                return self.buckets[index] if index < len(self.buckets) else None
+        return None
+
+    def _merge(self, samples: List[dict]) -> None:
+        for sample in samples:
+            key = _label_key(sample["labels"])
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0] = [a + b for a, b in zip(entry[0], sample["buckets"])]
+            entry[1] += sample["sum"]
+            entry[2] += sample["count"]
+
+    def _reset(self) -> None:
+        self._values.clear()
+
+    def _prometheus(self, elapsed: float) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class BoundMetric:
+    # Metrica con etichette già fissate: nei punti caldi (ogni mossa) evita di ricalcolarle
+    __slots__ = ("_family", "_key")
+
+    def __init__(self, family, key: LabelKey) -> None:
+        self._family = family
+        self._key = key
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._family._inc(self._key, amount)
+
+    def observe(self, value: float) -> None:
+        self._family._observe(self._key, value)
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._families: Dict[str, object] = {}
+        self._started = time.perf_counter()
+
+    def _family(self, cls, name: str, help_text: str, **kwargs):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = cls(name, help_text, self._lock, **kwargs)
+            elif type(family) is not cls:
+                raise ValueError(f"Metrica {name} già registrata come {family.kind}")
+            return family
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._family(Counter, name, help_text)
+
+    def meter(self, name: str, help_text: str) -> Meter:
+        return self._family(Meter, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._family(Histogram, name, help_text, buckets=buckets)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            families = {name: {"type": family.kind, "help": family.help, "samples": family._snapshot()}
+                        for name, family in sorted(self._families.items())}
+        return {"elapsed_seconds": self.elapsed(), "metrics": families}
+
+    def drain(self) -> Dict[str, dict]:
+        # Snapshot e azzeramento in un colpo solo: quello che un worker restituisce al padre
+        with self._lock:
+            families = {name: {"type": family.kind, "help": family.help, "samples": family._snapshot()}
+                        for name, family in self._families.items()}
+            for family in self._families.values():
+                family._reset()
+        return {"elapsed_seconds": self.elapsed(), "metrics": families}
+
+    def merge(self, snapshot: Dict[str, dict]) -> None:
+        kinds = {"counter": Counter, "meter": Meter, "histogram": Histogram}
+        for name, data in snapshot.get("metrics", {}).items():
+            family = self._family(kinds[data["type"]], name, data["help"])
+            with self._lock:
+                family._merge(data["samples"])
+
+    def reset(self) -> None:
+        with self._lock:
+            for family in self._families.values():
+                family._reset()
+            self._started = time.perf_counter()
+
+    def to_prometheus(self) -> str:
+        elapsed = self.elapsed()
+        with self._lock:
+            lines = [line for _, family in sorted(self._families.items()) for line in family._prometheus(elapsed)]
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def write(self, path: str) -> None:
+        # .json scrive il dump JSON, qualunque altra estensione il testo per Prometheus
+        # (es. per il textfile collector di node_exporter)
+        content = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        temporary = path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temporary, path)
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0", registry: Optional[MetricsRegistry] = None):
+    # Endpoint in un thread daemon: /metrics in formato Prometheus, /metrics.json in JSON
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # import locale: pesa sull'avvio
+    registry = registry or get_registry()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path == "/metrics":
+                body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/metrics.json":
+                body, content_type = registry.to_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+# --- Metriche del motore ---
+
+MOVE_SECONDS = _registry.histogram("tris_move_seconds", "Tempo di calcolo della mossa del bot per strategia")
+PACING_SECONDS = _registry.histogram("tris_ui_pacing_seconds", "Pausa estetica prima della mossa del bot (interfacce)")
+MOVES = _registry.meter("tris_moves", "Mosse giocate")
+GAMES = _registry.meter("tris_games", "Partite terminate per esito")
+OLLAMA_HEALTH_SECONDS = _registry.histogram("tris_ollama_health_check_seconds", "Durata del controllo di disponibilità di Ollama")
+OLLAMA_GENERATION_SECONDS = _registry.histogram("tris_ollama_generation_seconds", "Durata della generazione della mossa da Ollama")
+OLLAMA_REQUESTS = _registry.counter("tris_ollama_requests", "Richieste di mossa a Ollama per esito")
+OLLAMA_CACHE_HITS = _registry.counter("tris_ollama_cache_hits", "Mosse di Ollama servite dalla cache")
+OLLAMA_TIMEOUTS = _registry.counter("tris_ollama_timeouts", "Mosse di Ollama arrivate oltre la scadenza")
+OLLAMA_FALLBACKS = _registry.counter("tris_ollama_fallbacks", "Mosse giocate dalla strategia locale al posto di Ollama per motivo")
+
+
+class MetricsObserver(Observer):
+    # Da collegare con Game.attach: conta mosse e partite per esito
+    def __init__(self) -> None:
+        self._moves = MOVES.labels()
+        self._wins = GAMES.labels(result="win")
+        self._draws = GAMES.labels(result="draw")
+
+    def update(self, subject, event) -> None:
+        if isinstance(event, MovePlayed):
+            self._moves.inc()
+        elif isinstance(event, GameOver):
+            (self._draws if event.winner is None else self._wins).inc()
@@ -0,0 +1,96 @@
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+# Messaggi per l'utente emessi da strategie e motore (es. "Ollama non disponibile").
+# Il motore non conosce l'interfaccia: scrive sul notifier attivo, che di default li manda
+# al logging; main.py installa StreamlitNotifier per mostrarli nella pagina. Un thread di lavoro
+# senza pagina (es. il pondering) può sostituirlo solo per sé con use_notifier.
+
+logger = logging.getLogger("tris")
+
+
+class Notifier:
+    def info(self, message: str) -> None:
+        logger.info(message)
+
+    def success(self, message: str) -> None:
+        logger.info(message)
+
+    def warning(self, message: str) -> None:
+        logger.warning(message)
+
+    def error(self, message: str) -> None:
+        logger.error(message)
+
+    @contextmanager
+    def spinner(self, message: str) -> Iterator[None]:
+        logger.debug(message)
+        yield
+
+
+class SilentNotifier(Notifier):
+    # Per i calcoli speculativi: i loro messaggi non riguardano la mossa giocata
+    def info(self, message: str) -> None:
+        pass
+
+    def success(self, message: str) -> None:
+        pass
+
+    def warning(self, message: str) -> None:
+        pass
+
+    def error(self, message: str) -> None:
+        pass
+
+    @contextmanager
+    def spinner(self, message: str) -> Iterator[None]:
+        yield
+
+
+class StreamlitNotifier(Notifier):
+    def __init__(self) -> None:
+        import streamlit as st  # import locale: solo l'interfaccia web dipende da Streamlit
+        self._st = st
+
+    def info(self, message: str) -> None:
+        self._st.info(message)
+
+    def success(self, message: str) -> None:
+        self._st.success(message)
+
+    def warning(self, message: str) -> None:
+        self._st.warning(message)
+
+    def error(self, message: str) -> None:
+        self._st.error(message)
+
+    @contextmanager
+    def spinner(self, message: str) -> Iterator[None]:
+        with self._st.spinner(message):
+            yield
+
+
+_notifier: Notifier = Notifier()
+_thread_notifier = threading.local()
+
+
+def get_notifier() -> Notifier:
+    return getattr(_thread_notifier, "notifier", None) or _notifier
+
+
+def set_notifier(notifier: Notifier) -> None:
+    global _notifier
+    _notifier = notifier
+
+
+@contextmanager
+def use_notifier(notifier: Notifier) -> Iterator[None]:
+    # Notifier del solo thread corrente, per la durata del blocco
+    previous = getattr(_thread_notifier, "notifier", None)
+    _thread_notifier.notifier = notifier
+    try:
+        yield
+    finally:
+        _thread_notifier.notifier = previous
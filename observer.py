@@ -2,7 +2,8 @@ from abc import ABC, abstractmethod
 
 class Observer(ABC):
     @abstractmethod
-    def update(self, subject: "Subject") -> None:
+    def update(self, subject: "Subject", event: object) -> None:
+        #event è l'evento tipizzato che ha causato la notifica (es. game.MovePlayed)
         pass
 
 class Subject:
@@ -15,6 +16,6 @@ class Subject:
     def detach(self, observer: Observer) -> None:
         self._observers.remove(observer)
 
-    def notify(self) -> None:
+    def notify(self, event: object) -> None:
         for observer in self._observers:
-            observer.update(self)
+            observer.update(self, event)
@@ -0,0 +1,135 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from board import Board
+from constants import EMPTY_CELL
+from symmetry import invert, square_symmetries
+
+# Cache delle mosse scelte da Ollama. La chiave è (modello, simbolo del bot, forma canonica del
+# tabellone rispetto a rotazioni e riflessioni): posizioni simmetriche condividono la stessa voce
+# e la mossa salvata viene riportata nel sistema di riferimento del tabellone richiesto.
+
+_symmetries_cache: Dict[int, List[Tuple[int, ...]]] = {}
+
+
+def _symmetries(width: int, height: int) -> List[Tuple[int, ...]]:
+    if width != height:
+        return [tuple(range(width * height))]  # sui rettangoli si usa solo l'identità
+    if width not in _symmetries_cache:
+        _symmetries_cache[width] = square_symmetries(width)
+    return _symmetries_cache[width]
+
+
+def canonical_cells(board: Board) -> Tuple[str, Tuple[int, ...]]:
+    # Restituisce le celle canoniche come stringa e la permutazione usata per ottenerle
+    cells = [cell if cell != EMPTY_CELL else "-" for row in board.get_grid() for cell in row]
+    best: Optional[str] = None
+    best_permutation: Tuple[int, ...] = ()
+    for permutation in _symmetries(board.get_width(), board.get_height()):
+        transformed = [""] * len(cells)
+        for index, target in enumerate(permutation):
+            transformed[target] = cells[index]
+        candidate = "".join(transformed)
+        if best is None or candidate < best:
+            best = candidate
+            best_permutation = permutation
+    return best, best_permutation
+
+
+class OllamaMoveCache:
+    # max_size=0 non ricorda nulla (benchmark: ogni mossa passa dal server).
+    # Su disco le scritture sono raggruppate: al più una ogni save_interval secondi, più una
+    # finale all'uscita del processo (flush)
+    def __init__(self, max_size: int = 4096, path: Optional[str] = None, save_interval: float = 5.0) -> None:
+        self._max_size = max_size
+        self._path = path
+        self._save_interval = save_interval
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+        self.hits = 0
+        self.misses = 0
+        if path:
+            if os.path.exists(path):
+                self._load()
+            atexit.register(self.flush)
+
+    def _key(self, model: str, symbol: str, board: Board) -> Tuple[str, Tuple[int, ...]]:
+        cells, permutation = canonical_cells(board)
+        size = f"{board.get_width()}x{board.get_height()}/{board.get_win_length()}"
+        return f"{model}|{symbol}|{size}|{cells}", permutation
+
+    def get(self, model: str, symbol: str, board: Board) -> Optional[Tuple[int, int]]:
+        key, permutation = self._key(model, symbol, board)
+        with self._lock:
+            canonical_move = self._entries.get(key)
+            if canonical_move is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        index = invert(permutation)[canonical_move]
+        return divmod(index, board.get_width())
+
+    def put(self, model: str, symbol: str, board: Board, move: Tuple[int, int]) -> None:
+        # Da chiamare solo con mosse di Ollama già validate, mai con i fallback
+        if self._max_size <= 0:
+            return  # cache disattivata: nemmeno il file su disco va riscritto
+        key, permutation = self._key(model, symbol, board)
+        canonical_move = permutation[move[0] * board.get_width() + move[1]]
+        with self._lock:
+            self._entries[key] = canonical_move
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+            if self._path:
+                self._dirty = True
+                if time.monotonic() - self._last_save >= self._save_interval:
+                    self._save()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._path and self._dirty:
+                self._save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self) -> None:
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return  # file corrotto o illeggibile: si riparte da una cache vuota
+        entries = data.get("entries", [])
+        # Solo le voci più recenti che stanno nel limite; con max_size <= 0 nessuna ([-0:] le prenderebbe tutte)
+        for key, move in entries[max(0, len(entries) - self._max_size):]:
+            self._entries[key] = move
+
+    def _save(self) -> None:
+        # Scrittura atomica: un crash a metà non lascia un file troncato
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": list(self._entries.items())}, f)
+        os.replace(tmp_path, self._path)
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+
+_default_cache: Optional[OllamaMoveCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> OllamaMoveCache:
+    # Cache condivisa dal processo; OLLAMA_MOVE_CACHE indica il file per renderla persistente
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = OllamaMoveCache(path=os.environ.get("OLLAMA_MOVE_CACHE"))
+    return _default_cache
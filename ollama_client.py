@@ -0,0 +1,141 @@
+import json
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Coppia completa "r,c" (con o senza parentesi) seguita da un carattere non numerico:
+# durante lo streaming "1,2" potrebbe ancora diventare "1,23", quindi si aspetta il delimitatore
+_PAIR_PATTERN = re.compile(r"(\d+)\s*,\s*(\d+)(?=\D)")
+_FINAL_PAIR_PATTERN = re.compile(r"(\d+)\s*,\s*(\d+)")
+
+
+def parse_move(text: str, height: int, width: int, final: bool = True) -> Optional[Tuple[int, int]]:
+    # Estrae la prima coppia (riga, colonna) dentro il tabellone. Con final=False il testo è parziale
+    # e si accettano solo coppie già chiuse; a generazione finita si prova anche con due cifre isolate.
+    pattern = _FINAL_PAIR_PATTERN if final else _PAIR_PATTERN
+    for match in pattern.finditer(text):
+        row, col = int(match.group(1)), int(match.group(2))
+        if 0 <= row < height and 0 <= col < width:
+            return (row, col)
+    if final:
+        digits = [int(char) for char in text if char.isdigit()]
+        if len(digits) >= 2 and digits[0] < height and digits[1] < width:
+            return (digits[0], digits[1])
+    return None
+
+
+class OllamaUnavailable(Exception):
+    pass
+
+
+class OllamaClient:
+    def __init__(self, base_url: str = "http://localhost:11434", pool_size: int = 8,
+                 health_ttl: float = 10.0, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 connect_timeout: float = 2.0, read_timeout: float = 30.0) -> None:
+        self.base_url = base_url.rstrip("/")
+        self._health_ttl = health_ttl
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._timeout = (connect_timeout, read_timeout)
+
+        # import locale: requests serve solo a chi parla davvero con Ollama
+        import requests
+        from requests.adapters import HTTPAdapter
+        self._request_errors = requests.RequestException
+
+        # Sessione con pool di connessioni keep-alive, riusata da tutte le mosse
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._health: Optional[bool] = None
+        self._health_checked_at = 0.0
+        self._failures = 0
+        self._open_until = 0.0  # circuit breaker aperto fino a questo istante
+
+    def is_available(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now < self._open_until:
+                return False
+            if self._health is not None and now - self._health_checked_at < self._health_ttl:
+                return self._health
+        try:
+            response = self._session.get(f"{self.base_url}/api/tags", timeout=self._timeout[0])
+            healthy = response.status_code == 200
+        except self._request_errors:
+            healthy = False
+        with self._lock:
+            self._health = healthy
+            self._health_checked_at = time.monotonic()
+        if healthy:
+            self._record_success()
+        else:
+            self._record_failure()
+        return healthy
+
+    def _record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._open_until = 0.0
+
+    def _record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self._failure_threshold:
+                self._open_until = time.monotonic() + self._reset_timeout
+                self._health = None  # dopo la pausa si riprova con un nuovo controllo
+
+    def generate_move(self, model: str, prompt: str, height: int, width: int,
+                      cancel: Optional[threading.Event] = None) -> Tuple[Optional[Tuple[int, int]], str]:
+        # Genera in streaming e chiude la connessione appena il testo contiene una mossa completa:
+        # Ollama interrompe la generazione quando il client si disconnette
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": True,
+            "options": {"temperature": 0.1, "top_p": 0.9, "num_predict": 10},
+        }
+        text = ""
+        try:
+            response = self._session.post(f"{self.base_url}/api/generate", json=payload,
+                                          stream=True, timeout=self._timeout)
+        except self._request_errors:
+            self._record_failure()
+            raise
+        try:
+            if response.status_code != 200:
+                self._record_failure()
+                raise OllamaUnavailable(f"HTTP {response.status_code}")
+            for line in response.iter_lines():
+                if cancel is not None and cancel.is_set():
+                    return None, text
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                text += chunk.get("response", "")
+                if chunk.get("done"):
+                    break
+                move = parse_move(text, height, width, final=False)
+                if move is not None:
+                    self._record_success()
+                    return move, text
+            self._record_success()
+            return parse_move(text, height, width), text
+        finally:
+            response.close()
+
+
+_clients: Dict[str, OllamaClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url: str) -> OllamaClient:
+    # Un client (e quindi un pool di connessioni) per server, condiviso da tutto il processo
+    with _clients_lock:
+        if base_url not in _clients:
+            _clients[base_url] = OllamaClient(base_url)
+        return _clients[base_url]
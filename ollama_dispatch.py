@@ -0,0 +1,199 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Tuple
+from ollama_client import OllamaClient, OllamaUnavailable
+
+# Smistamento delle richieste di mossa verso un server Ollama condiviso da molte sessioni.
+#
+# - Single-flight: richieste concorrenti con lo stesso (modello, prompt) — cioè stesso modello,
+#   simbolo e tabellone — condividono un'unica chiamata in volo.
+# - Micro-batch: le richieste distinte che arrivano entro batch_window vengono raccolte e inviate
+#   insieme (Ollama non ha un endpoint batch, ma elabora in parallelo le richieste che arrivano
+#   insieme, vedi OLLAMA_NUM_PARALLEL), con al massimo max_concurrency chiamate aperte.
+#   Una richiesta isolata parte subito, senza aspettare la finestra.
+# - Coda limitata: oltre max_pending richieste in attesa si rifiuta subito con OllamaUnavailable,
+#   così chi chiede la mossa passa alla strategia locale invece di accodarsi all'infinito.
+
+FlightKey = Tuple[str, str, int, int]
+MoveResult = Tuple[Optional[Tuple[int, int]], str]
+
+
+class _Flight:
+    __slots__ = ("key", "future", "cancel", "waiters")
+
+    def __init__(self, key: FlightKey) -> None:
+        self.key = key
+        self.future: Future = Future()
+        self.cancel = threading.Event()  # impostato quando nessuno aspetta più il risultato
+        self.waiters = 0
+
+
+class OllamaDispatcher:
+    def __init__(self, client: OllamaClient, max_concurrency: int = 2, batch_window: float = 0.01,
+                 max_batch: int = 8, max_pending: int = 64, poll_interval: float = 0.05) -> None:
+        self._client = client
+        self._batch_window = batch_window
+        self._max_batch = max_batch
+        self._poll_interval = poll_interval
+        self._queue: "queue.Queue[_Flight]" = queue.Queue(maxsize=max_pending)
+        self._slots = threading.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="ollama-dispatch")
+        self._lock = threading.Lock()
+        self._inflight: Dict[FlightKey, _Flight] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {"requests": 0, "coalesced": 0, "dispatched": 0, "batches": 0,
+                                      "rejected": 0, "cancelled": 0}
+
+    def request(self, model: str, prompt: str, height: int, width: int,
+                cancel: Optional[threading.Event] = None) -> MoveResult:
+        # Stessa interfaccia di OllamaClient.generate_move: (mossa, testo), (None, testo parziale) se annullata
+        flight = self._join((model, prompt, height, width))
+        try:
+            while True:
+                try:
+                    return flight.future.result(timeout=self._poll_interval)
+                except FutureTimeoutError:
+                    if cancel is not None and cancel.is_set():
+                        return None, ""
+        finally:
+            self._leave(flight)
+
+    def _join(self, key: FlightKey) -> _Flight:
+        with self._lock:
+            self.stats["requests"] += 1
+            flight = self._inflight.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.stats["coalesced"] += 1
+                return flight
+            flight = _Flight(key)
+            flight.waiters = 1
+            try:
+                self._queue.put_nowait(flight)
+            except queue.Full:
+                self.stats["rejected"] += 1
+                flight.future.set_exception(OllamaUnavailable("Troppe richieste a Ollama in coda"))
+                return flight
+            self._inflight[key] = flight
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ollama-batcher", daemon=True)
+                self._thread.start()
+            return flight
+
+    def _leave(self, flight: _Flight) -> None:
+        with self._lock:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.future.done():
+                # Nessuno aspetta più: lo streaming si interrompe (o la richiesta non parte proprio)
+                flight.cancel.set()
+                if self._inflight.get(flight.key) is flight:
+                    del self._inflight[flight.key]
+
+    def _run(self) -> None:
+        while True:
+            batch: List[_Flight] = [self._queue.get()]
+            window_end = time.monotonic() + self._batch_window
+            while len(batch) < self._max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                # Una richiesta isolata (il caso tipico di Streamlit) parte subito; la finestra
+                # resta aperta solo se nel frattempo ne sono arrivate altre
+                remaining = window_end - time.monotonic()
+                if len(batch) == 1 or remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            with self._lock:
+                self.stats["batches"] += 1
+            for flight in batch:
+                self._slots.acquire()  # al massimo max_concurrency chiamate aperte verso Ollama
+                if flight.cancel.is_set():
+                    self._slots.release()
+                    self._finish(flight, result=(None, ""), cancelled=True)
+                    continue
+                self._executor.submit(self._execute, flight)
+
+    def _execute(self, flight: _Flight) -> None:
+        try:
+            with self._lock:
+                self.stats["dispatched"] += 1
+            model, prompt, height, width = flight.key
+            result = self._client.generate_move(model, prompt, height, width, flight.cancel)
+        except Exception as e:
+            self._finish(flight, error=e)
+        else:
+            self._finish(flight, result=result)
+        finally:
+            self._slots.release()
+
+    def _finish(self, flight: _Flight, result: Optional[MoveResult] = None,
+                error: Optional[BaseException] = None, cancelled: bool = False) -> None:
+        with self._lock:
+            if self._inflight.get(flight.key) is flight:
+                del self._inflight[flight.key]
+            if cancelled:
+                self.stats["cancelled"] += 1
+        if error is not None:
+            flight.future.set_exception(error)
+        else:
+            flight.future.set_result(result)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats, pending=self._queue.qsize(), inflight=len(self._inflight))
+
+
+_dispatchers: Dict[int, OllamaDispatcher] = {}
+_dispatchers_lock = threading.Lock()
+
+
+def get_dispatcher(client: OllamaClient) -> OllamaDispatcher:
+    # Un dispatcher per client (quindi per server Ollama); la concorrenza si regola con
+    # OLLAMA_MAX_CONCURRENCY, di solito uguale a OLLAMA_NUM_PARALLEL del server
+    with _dispatchers_lock:
+        dispatcher = _dispatchers.get(id(client))
+        if dispatcher is None:
+            dispatcher = OllamaDispatcher(client, max_concurrency=int(os.environ.get("OLLAMA_MAX_CONCURRENCY", "2")))
+            _dispatchers[id(client)] = dispatcher
+        return dispatcher
+
+
+if __name__ == "__main__":
+    # Prova di carico contro lo stub: molte sessioni concorrenti, poche posizioni distinte
+    import argparse
+    from ollama_stub import OllamaStub
+
+    parser = argparse.ArgumentParser(description="Prova il dispatcher Ollama contro un server finto.")
+    parser.add_argument("--sessions", type=int, default=200, help="richieste concorrenti")
+    parser.add_argument("--distinct", type=int, default=20, help="prompt distinti tra le richieste")
+    parser.add_argument("--delay", type=float, default=0.05, help="latenza del server finto")
+    parser.add_argument("--concurrency", type=int, default=2)
+    args = parser.parse_args()
+
+    with OllamaStub(delay=args.delay) as stub:
+        dispatcher = OllamaDispatcher(OllamaClient(stub.base_url), max_concurrency=args.concurrency,
+                                      max_pending=args.sessions)
+        results: List[MoveResult] = []
+
+        def session(i: int) -> None:
+            prompt = f"Position {i % args.distinct}\nAvailable moves: ({i % args.distinct % 3},{i % 3})"
+            results.append(dispatcher.request("stub", prompt, 3, 3))
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=session, args=(i,)) for i in range(args.sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        print(f"{args.sessions} richieste in {elapsed:.2f}s, {stub.requests} chiamate al server, "
+              f"{sum(1 for move, _ in results if move)} mosse; {dispatcher.snapshot()}")
@@ -0,0 +1,120 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+# Server HTTP locale che imita le API di Ollama usate dal bot (/api/tags e /api/generate).
+# Serve per benchmark, tornei e prove senza un vero modello: risponde con la prima mossa
+# disponibile indicata nel prompt, dopo un ritardo configurabile.
+
+_MOVE_PATTERN = re.compile(r"\((\d+),(\d+)\)")
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: "_StubServer"
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # niente log su stderr a ogni richiesta
+
+    def _send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": self.server.model}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        if self.path != "/api/generate":
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.lock:
+            self.server.requests += 1
+        if self.server.delay:
+            time.sleep(self.server.delay)
+
+        reply = self.server.reply
+        if reply is None:
+            available = payload.get("prompt", "").split("Available moves:")[-1]
+            match = _MOVE_PATTERN.search(available)
+            reply = f"({match.group(1)},{match.group(2)})" if match else ""
+
+        if not payload.get("stream", True):
+            self._send_json(200, {"model": payload.get("model"), "response": reply, "done": True})
+            return
+
+        # Streaming come Ollama: un oggetto JSON per riga, un frammento di testo alla volta
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for char in reply:
+                self.wfile.write(json.dumps({"response": char, "done": False}).encode("utf-8") + b"\n")
+                self.wfile.flush()
+            self.wfile.write(json.dumps({"response": "", "done": True}).encode("utf-8") + b"\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # il client ha interrotto la generazione
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class OllamaStub:
+    def __init__(self, port: int = 0, delay: float = 0.0, reply: Optional[str] = None, model: str = "stub") -> None:
+        self._server = _StubServer(("127.0.0.1", port), _StubHandler)
+        self._server.delay = delay
+        self._server.reply = reply
+        self._server.model = model
+        self._server.requests = 0
+        self._server.lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def generate_url(self) -> str:
+        return f"{self.base_url}/api/generate"
+
+    @property
+    def requests(self) -> int:
+        return self._server.requests
+
+    def start(self) -> "OllamaStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "OllamaStub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Finto server Ollama per prove locali.")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--delay", type=float, default=0.0)
+    args = parser.parse_args()
+    stub = OllamaStub(args.port, args.delay)
+    print(f"Stub Ollama in ascolto su {stub.base_url}")
+    stub._server.serve_forever()
@@ -0,0 +1,114 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from board import Board
+from bot_player import BotPlayer, HardMoveStrategy
+from constants import EMPTY_CELL
+from hedged import HedgedMoveStrategy
+from mcts import MCTSMoveStrategy
+from notifier import SilentNotifier, use_notifier
+from search import AlphaBetaMoveStrategy
+from tablebase import TablebaseMoveStrategy
+
+# Thread condivisi da tutte le partite: ogni partita ha al massimo un lavoro di pondering alla volta
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ponder")
+
+BoardKey = Tuple[Tuple[str, ...], ...]
+
+# Le strategie con ricerca (circa 1 s a mossa) pensano solo alle risposte umane più probabili e
+# mai sui tabelloni grandi, dove le risposte possibili sono troppe: ogni ricerca contende il GIL
+# all'interfaccia. Tablebase conta fra queste perché senza tablebase usa la ricerca alpha-beta.
+_SEARCHING = (AlphaBetaMoveStrategy, MCTSMoveStrategy, TablebaseMoveStrategy)
+SEARCH_CANDIDATES: int = 3
+SEARCH_MAX_CELLS: int = 25
+PONDER_BUDGET: float = 5.0  # secondi di pondering al massimo per posizione
+
+
+def board_key(board: Board) -> BoardKey:
+    return tuple(tuple(row) for row in board.get_grid())
+
+
+def likely_replies(board: Board) -> List[Tuple[int, int]]:
+    # Mosse legali dalla più alla meno probabile: prima quelle con più pezzi vicini, poi le più centrali
+    grid = board.get_grid()
+    width, height = board.get_width(), board.get_height()
+
+    def rank(move: Tuple[int, int]) -> Tuple[int, float]:
+        row, col = move
+        neighbours = sum(1 for r in range(max(0, row - 1), min(height, row + 2))
+                         for c in range(max(0, col - 1), min(width, col + 2)) if grid[r][c] != EMPTY_CELL)
+        return -neighbours, abs(row - (height - 1) / 2) + abs(col - (width - 1) / 2)
+    return sorted(board.get_available_moves(), key=rank)
+
+
+class Ponderer:
+    # Mentre l'umano pensa, calcola in background la risposta del bot alle sue mosse legali,
+    # dalle più probabili, entro PONDER_BUDGET.
+    # Le risposte stanno in una cache per partita indicizzata dalla posizione dopo la mossa umana.
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._replies: Dict[BoardKey, Tuple[int, int]] = {}
+        self._position: Optional[BoardKey] = None
+        self._cancel = threading.Event()
+        self._future: Optional[Future] = None
+
+    def start(self, board: Board, bot: BotPlayer, human_symbol: str) -> None:
+        if isinstance(bot._strategy, (HardMoveStrategy, HedgedMoveStrategy)):
+            return  # niente richieste speculative a Ollama, una per ogni mossa umana possibile
+        if isinstance(bot._strategy, _SEARCHING) and board.get_width() * board.get_height() > SEARCH_MAX_CELLS:
+            return
+        key = board_key(board)
+        with self._lock:
+            if key == self._position:
+                return  # stiamo già pensando su questa posizione (es. rerun di Streamlit)
+        self.cancel()
+        cancel = threading.Event()
+        with self._lock:
+            self._position = key
+            self._cancel = cancel
+            self._future = _executor.submit(self._ponder, board.copy(), bot, human_symbol, cancel)
+
+    def _ponder(self, board: Board, bot: BotPlayer, human_symbol: str, cancel: threading.Event) -> None:
+        # Il thread non ha una pagina Streamlit: i messaggi delle strategie vengono scartati
+        with use_notifier(SilentNotifier()):
+            self._ponder_moves(board, bot, human_symbol, cancel)
+
+    def _ponder_moves(self, board: Board, bot: BotPlayer, human_symbol: str, cancel: threading.Event) -> None:
+        moves = likely_replies(board)
+        if isinstance(bot._strategy, _SEARCHING):
+            moves = moves[:SEARCH_CANDIDATES]
+        deadline = time.perf_counter() + PONDER_BUDGET
+        for row, col in moves:
+            if cancel.is_set() or time.perf_counter() > deadline:
+                return
+            child = board.copy()
+            child.make_move(row, col, human_symbol)
+            if child.check_winner(human_symbol) or child.is_full():
+                continue  # la partita finisce con la mossa umana: il bot non risponde
+            # cancel interrompe anche la ricerca in corso, non solo le successive
+            reply = bot._strategy.ponder_move(child, bot, cancel)
+            with self._lock:
+                if cancel.is_set():
+                    return
+                if reply is not None:
+                    self._replies[board_key(child)] = reply
+
+    def get_reply(self, board: Board) -> Optional[Tuple[int, int]]:
+        # Risposta precalcolata per la posizione attuale, se c'è; il lavoro residuo diventa inutile
+        with self._lock:
+            reply = self._replies.get(board_key(board))
+        self.cancel()
+        if reply is not None and board.is_valid_move(reply[0], reply[1]):
+            return reply
+        return None
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancel.set()
+            if self._future is not None:
+                self._future.cancel()  # se non è ancora partito non parte più
+            self._future = None
+            self._position = None
+            self._replies = {}
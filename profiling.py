@@ -0,0 +1,135 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+# Profilazione a richiesta per le modalità da terminale: --profile PREFISSO avvolge l'esecuzione
+# in cProfile (tempo per funzione) e tracemalloc (memoria per riga), più un campionatore di stack
+# per i flame graph. Scrive:
+#   PREFISSO.pstats     statistiche di cProfile (python -m pstats, snakeviz, ...)
+#   PREFISSO.collapsed  stack campionati in formato "a;b;c conteggio" (flamegraph.pl, speedscope)
+# e stampa su stderr le funzioni e le righe di allocazione più costose.
+# Senza --profile non si importa né si attiva nulla: nessun costo.
+
+SAMPLE_INTERVAL: float = 0.001
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--profile", metavar="PREFIX", default=None,
+                        help="profila l'esecuzione e scrive PREFIX.pstats e PREFIX.collapsed")
+    parser.add_argument("--profile-top", type=int, default=20, metavar="N",
+                        help="funzioni e righe di allocazione da mostrare con --profile")
+
+
+def single_process_when_profiling(args: argparse.Namespace) -> None:
+    # Con --profile e senza --workers esplicito si lavora in un solo processo:
+    # il profilatore vede solo il processo principale
+    if args.profile and args.workers is None:
+        args.workers = 1
+
+
+class _StackSampler:
+    # Thread che legge lo stack del thread profilato a intervalli regolari. cProfile non conserva
+    # gli stack completi, che servono ai flame graph; il campionamento sì, e costa poco.
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL) -> None:
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self.stacks: Counter = Counter()
+        self.peak_snapshot = None  # allocazioni vive quando la memoria tracciata era al massimo
+        self._snapshot_size = 0
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        labels: Dict[object, str] = {}
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+            self._check_memory()
+
+    def _check_memory(self) -> None:
+        # Nuova fotografia solo quando la memoria cresce di un quarto: poche fotografie anche
+        # nelle esecuzioni lunghe, e quella finale è vicina al picco
+        import tracemalloc
+        current = tracemalloc.get_traced_memory()[0]
+        if current > max(self._snapshot_size * 1.25, 1 << 20):
+            self.peak_snapshot = tracemalloc.take_snapshot()
+            self._snapshot_size = current
+
+
+@contextmanager
+def profiled(prefix: Optional[str], top: int = 20) -> Iterator[None]:
+    if not prefix:
+        yield
+        return
+    import cProfile
+    import tracemalloc
+    directory = os.path.dirname(os.path.abspath(prefix))
+    os.makedirs(directory, exist_ok=True)
+
+    tracemalloc.start()
+    sampler = _StackSampler(threading.get_ident())
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        if sampler.peak_snapshot is not None and sampler._snapshot_size > tracemalloc.get_traced_memory()[0]:
+            snapshot = sampler.peak_snapshot
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        _report(prefix, top, profiler, sampler, snapshot, peak, elapsed)
+
+
+def _report(prefix: str, top: int, profiler, sampler: _StackSampler, snapshot, peak: int, elapsed: float) -> None:
+    import pstats
+    import tracemalloc
+    profiler.dump_stats(prefix + ".pstats")
+    with open(prefix + ".collapsed", "w", encoding="utf-8") as f:
+        for stack, count in sorted(sampler.stacks.items()):
+            f.write(f"{stack} {count}\n")
+
+    out = sys.stderr
+    stats = pstats.Stats(profiler).stats  # (file, riga, funzione) -> (primitive, chiamate, tempo proprio, cumulativo, chiamanti)
+    print(f"\nProfilo: {elapsed:.2f}s, picco di memoria tracciata {peak / 1024:.0f} KiB, "
+          f"{sum(sampler.stacks.values())} campioni di stack", file=out)
+    print(f"{'proprio ms':>11} {'cumul. ms':>10} {'chiamate':>10}  funzione", file=out)
+    for (filename, line, name), (_, calls, own, cumulative, _) in sorted(stats.items(), key=lambda item: item[1][2],
+                                                                         reverse=True)[:top]:
+        where = f"{os.path.basename(filename)}:{line}" if line else filename
+        print(f"{own * 1000:11.1f} {cumulative * 1000:10.1f} {calls:10d}  {name} ({where})", file=out)
+
+    # Allocazioni vive al picco di memoria (o a fine esecuzione), per riga; il profilatore è escluso
+    allocations = snapshot.filter_traces([tracemalloc.Filter(False, __file__),
+                                          tracemalloc.Filter(False, tracemalloc.__file__)]).statistics("lineno")
+    print(f"\n{'KiB':>11} {'blocchi':>10}  riga di allocazione", file=out)
+    for stat in allocations[:top]:
+        frame = stat.traceback[0]
+        print(f"{stat.size / 1024:11.1f} {stat.count:10d}  {os.path.basename(frame.filename)}:{frame.lineno}", file=out)
+    print(f"\nScritti {prefix}.pstats e {prefix}.collapsed", file=out)
@@ -0,0 +1,276 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from board import Board, winning_lines, zobrist_keys
+from bot_player import BotPlayer, MoveStrategy
+from constants import AI_SYMBOL, EMPTY_CELL, HUMAN_SYMBOL
+
+WIN_SCORE: int = 1_000_000_000
+_NODES_BETWEEN_CLOCK_CHECKS: int = 256
+
+# Tipo di valore salvato nella tabella di trasposizione
+_EXACT, _LOWER, _UPPER = 0, 1, 2
+# Oltre questa soglia il punteggio è una vittoria forzata e dipende dalla distanza dalla radice
+_MATE_THRESHOLD: int = WIN_SCORE // 2
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+class _SearchState:
+    # Rappresentazione interna per la ricerca: celle piatte (0 vuota, 1 bot, 2 avversario)
+    # con conteggi per finestra di k celle aggiornati a ogni mossa, così la valutazione è incrementale
+
+    def __init__(self, board: Board, bot_symbol: str) -> None:
+        self.width = board.get_width()
+        self.height = board.get_height()
+        self.win_length = board.get_win_length()
+        size = self.width * self.height
+
+        self.windows: List[Tuple[int, ...]] = winning_lines(self.width, self.height, self.win_length)
+        self.cell_windows: List[List[int]] = [[] for _ in range(size)]
+        for w, window in enumerate(self.windows):
+            for index in window:
+                self.cell_windows[index].append(w)
+
+        # Minacce: una finestra con n pezzi di un solo giocatore vale 10^n (k-1 pezzi = minaccia di vittoria)
+        self.weights: List[int] = [0] + [10 ** n for n in range(1, self.win_length)] + [WIN_SCORE]
+
+        # Sui tabelloni grandi si considerano solo le celle vicine ai pezzi già giocati
+        self.radius = 1 if size > 25 else max(self.width, self.height)
+        self.neighbours: List[List[int]] = []
+        for index in range(size):
+            r, c = divmod(index, self.width)
+            self.neighbours.append([
+                rr * self.width + cc
+                for rr in range(max(0, r - self.radius), min(self.height, r + self.radius + 1))
+                for cc in range(max(0, c - self.radius), min(self.width, c + self.radius + 1))
+                if (rr, cc) != (r, c)
+            ])
+
+        self.cells: List[int] = [0] * size
+        self.counts: List[List[int]] = [[0, 0, 0] for _ in self.windows]
+        self.near: List[int] = [0] * size
+        self.score: int = 0  # valutazione dal punto di vista del bot
+        self.stones: int = 0
+        self.won: bool = False
+        # Hash Zobrist con le stesse chiavi di Board: alla fine del costruttore vale board.get_hash()
+        keys = zobrist_keys(self.width, self.height)
+        opponent_symbol = HUMAN_SYMBOL if bot_symbol == AI_SYMBOL else AI_SYMBOL
+        self.keys: List[List[int]] = [[], keys[bot_symbol], keys[opponent_symbol]]
+        self.hash: int = 0
+
+        grid = board.get_grid()
+        for r in range(self.height):
+            for c in range(self.width):
+                cell = grid[r][c]
+                if cell != EMPTY_CELL:
+                    self.play(r * self.width + c, 1 if cell == bot_symbol else 2)
+        self.won = False
+
+    def _window_value(self, counts: List[int]) -> int:
+        if counts[2] == 0:
+            return self.weights[counts[1]]
+        if counts[1] == 0:
+            return -self.weights[counts[2]]
+        return 0
+
+    def play(self, index: int, player: int) -> None:
+        self.cells[index] = player
+        self.stones += 1
+        self.hash ^= self.keys[player][index]
+        for w in self.cell_windows[index]:
+            counts = self.counts[w]
+            self.score -= self._window_value(counts)
+            counts[player] += 1
+            self.score += self._window_value(counts)
+            if counts[player] == self.win_length:
+                self.won = True
+        for n in self.neighbours[index]:
+            self.near[n] += 1
+
+    def undo(self, index: int, player: int) -> None:
+        self.cells[index] = 0
+        self.stones -= 1
+        self.hash ^= self.keys[player][index]
+        for w in self.cell_windows[index]:
+            counts = self.counts[w]
+            self.score -= self._window_value(counts)
+            counts[player] -= 1
+            self.score += self._window_value(counts)
+        for n in self.neighbours[index]:
+            self.near[n] -= 1
+        self.won = False
+
+    def threat(self, index: int, player: int) -> int:
+        # Quanto la mossa migliora le proprie finestre e rovina quelle avversarie (per l'ordinamento)
+        opponent = 3 - player
+        value = 0
+        for w in self.cell_windows[index]:
+            counts = self.counts[w]
+            if counts[opponent] == 0:
+                value += self.weights[counts[player] + 1]
+            if counts[player] == 0:
+                value += self.weights[counts[opponent]]
+        return value
+
+    def candidates(self) -> List[int]:
+        if self.stones == 0:
+            return [(self.height // 2) * self.width + self.width // 2]
+        return [i for i, cell in enumerate(self.cells) if cell == 0 and self.near[i] > 0]
+
+
+def _to_table(score: int, ply: int) -> int:
+    # Le vittorie forzate si salvano come distanza dal nodo, non dalla radice
+    if score > _MATE_THRESHOLD:
+        return score + ply
+    if score < -_MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _from_table(score: int, ply: int) -> int:
+    if score > _MATE_THRESHOLD:
+        return score - ply
+    if score < -_MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+class _Search:
+    # Contesto di una singola ricerca: killer move per ply, history heuristic, tabella di
+    # trasposizione (indicizzata dall'hash Zobrist) e scadenza. Viene creato a ogni chiamata,
+    # quindi la strategia resta senza stato e condivisibile fra thread. Nella stessa ricerca
+    # una posizione ha sempre lo stesso giocatore di turno, quindi l'hash basta come chiave.
+    # cancel (pondering) interrompe la ricerca come la scadenza.
+
+    def __init__(self, state: _SearchState, deadline: float, cancel: Optional[threading.Event] = None) -> None:
+        self.state = state
+        self.deadline = deadline
+        self.cancel = cancel
+        self.nodes = 0
+        self.history: List[int] = [0] * len(state.cells)
+        self.killers: List[List[int]] = [[-1, -1] for _ in range(len(state.cells) + 1)]
+        self.table: Dict[int, Tuple[int, int, int, int]] = {}  # hash -> (profondità, punteggio, tipo, mossa)
+
+    def search_root(self, root_moves: List[int], depth: int) -> Tuple[int, int]:
+        state = self.state
+        alpha = -WIN_SCORE - 1
+        best_move = root_moves[0]
+        for index in root_moves:
+            state.play(index, 1)
+            if state.won:
+                score = WIN_SCORE - 1
+            else:
+                score = -self.negamax(depth - 1, 1, -WIN_SCORE - 1, -alpha, 2)
+            state.undo(index, 1)
+            if score > alpha:
+                alpha = score
+                best_move = index
+        return alpha, best_move
+
+    def negamax(self, depth: int, ply: int, alpha: int, beta: int, player: int) -> int:
+        self.nodes += 1
+        if self.nodes % _NODES_BETWEEN_CLOCK_CHECKS == 0 and (
+                time.perf_counter() > self.deadline or self.cancel is not None and self.cancel.is_set()):
+            raise _SearchTimeout()
+
+        state = self.state
+        if state.stones == len(state.cells):
+            return 0
+        if depth == 0:
+            return state.score if player == 1 else -state.score
+
+        alpha_start = alpha
+        table_move = -1
+        entry = self.table.get(state.hash)
+        if entry is not None:
+            entry_depth, entry_score, bound, table_move = entry
+            if entry_depth >= depth:
+                entry_score = _from_table(entry_score, ply)
+                if bound == _EXACT:
+                    return entry_score
+                if bound == _LOWER and entry_score >= beta:
+                    return entry_score
+                if bound == _UPPER and entry_score <= alpha:
+                    return entry_score
+
+        moves = state.candidates()
+        killers = self.killers[ply]
+        history = self.history
+        moves.sort(key=lambda i: (i == table_move, i in killers, history[i] + state.threat(i, player)), reverse=True)
+
+        best = -WIN_SCORE - 1
+        best_move = moves[0] if moves else -1
+        for index in moves:
+            state.play(index, player)
+            if state.won:
+                score = WIN_SCORE - ply - 1  # vincere prima vale di più
+            else:
+                score = -self.negamax(depth - 1, ply + 1, -beta, -alpha, 3 - player)
+            state.undo(index, player)
+            if score > best:
+                best = score
+                best_move = index
+            if best > alpha:
+                alpha = best
+            if alpha >= beta:
+                if killers[0] != index:
+                    killers[1] = killers[0]
+                    killers[0] = index
+                history[index] += depth * depth
+                break
+
+        if best <= alpha_start:
+            bound = _UPPER
+        elif best >= beta:
+            bound = _LOWER
+        else:
+            bound = _EXACT
+        self.table[state.hash] = (depth, _to_table(best, ply), bound, best_move)
+        return best
+
+
+class AlphaBetaMoveStrategy(MoveStrategy):
+    # Iterative deepening + alpha-beta entro un budget di tempo per mossa: allo scadere
+    # restituisce la mossa migliore dell'ultima profondità completata.
+
+    def __init__(self, time_budget: float = 1.0, max_depth: Optional[int] = None) -> None:
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+
+    def get_move(self, board: Board, bot: BotPlayer) -> Optional[Tuple[int, int]]:
+        return self._best_move(board, bot)
+
+    def ponder_move(self, board: Board, bot: BotPlayer, cancel: threading.Event) -> Optional[Tuple[int, int]]:
+        return self._best_move(board, bot, cancel)
+
+    def _best_move(self, board: Board, bot: BotPlayer,
+                   cancel: Optional[threading.Event] = None) -> Optional[Tuple[int, int]]:
+        deadline = time.perf_counter() + self.time_budget
+        state = _SearchState(board, bot.get_symbol())
+        root_moves = state.candidates()
+        if not root_moves or state.stones == len(state.cells):
+            return None
+        if len(root_moves) == 1:
+            return divmod(root_moves[0], state.width)
+
+        search = _Search(state, deadline, cancel)
+        root_moves.sort(key=lambda i: state.threat(i, 1), reverse=True)
+        best_move = root_moves[0]
+        empty_cells = len(state.cells) - state.stones
+        max_depth = min(self.max_depth or empty_cells, empty_cells)
+
+        for depth in range(1, max_depth + 1):
+            try:
+                score, move = search.search_root(root_moves, depth)
+            except _SearchTimeout:
+                break
+            best_move = move
+            # La mossa migliore va in testa all'iterazione successiva (principal variation)
+            root_moves.remove(move)
+            root_moves.insert(0, move)
+            if abs(score) >= WIN_SCORE - len(state.cells):
+                break  # risultato forzato trovato, inutile approfondire
+        return divmod(best_move, state.width)
@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+from board import Board
+from bot_player import BotPlayer
+from constants import AI_SYMBOL, BOT_DIFFICULTIES, EMPTY_CELL, HUMAN_SYMBOL, MAX_BOARD_SIDE
+from engine import EngineResources, load_engine_resources
+from game import Game
+from human_player import HumanPlayer
+from metrics import MOVE_SECONDS, MetricsObserver, get_registry, serve_metrics
+
+# Server asyncio con protocollo JSON a righe su TCP. Ogni connessione ospita una partita.
+#
+# Richieste (una per riga):
+#   {"op": "new", "name": "Anna", "symbol": "X", "difficulty": "medio", "width": 3, "height": 3, "win_length": 3}
+#   {"op": "move", "row": 0, "col": 2}
+#   {"op": "quit"}
+# Risposte:
+#   {"type": "state", "board": [[...]], "turn": "X", "last_move": [r, c], "result": null | "X" | "O" | "draw"}
+#   {"type": "error", "message": "..."}
+
+logger = logging.getLogger(__name__)
+
+MAX_LINE_BYTES: int = 64 * 1024
+
+# Latenza della mossa del bot vista dal server: attesa nel pool e comunicazione fra processi comprese
+BOT_MOVE_SECONDS = get_registry().histogram("tris_server_bot_move_seconds", "Tempo di risposta della mossa del bot per difficoltà")
+
+# Nei processi del pool le risorse del motore si caricano una volta per processo
+_worker_resources: Optional[EngineResources] = None
+
+
+def _compute_move(difficulty: str, symbol: str, grid: list,
+                  dims: Tuple[int, int, int]) -> Tuple[Optional[Tuple[int, int]], float]:
+    # Eseguita in un processo del pool: ricostruisce il tabellone e chiede la mossa alla strategia.
+    # Il registro delle metriche del processo non è quello del server: il tempo di calcolo
+    # torna indietro con la mossa e viene registrato in tris_move_seconds dal server
+    global _worker_resources
+    if _worker_resources is None:
+        _worker_resources = load_engine_resources()
+    board = Board(*dims)
+    for r, row in enumerate(grid):
+        for c, cell in enumerate(row):
+            if cell != EMPTY_CELL:
+                board.make_move(r, c, cell)
+    strategy = None
+    if difficulty == "mcts":
+        # Il pool è già un processo per mossa: l'MCTS condiviso ne aprirebbe altri cpu_count
+        from mcts import MCTSMoveStrategy
+        strategy = MCTSMoveStrategy(workers=1)
+    bot = _worker_resources.create_bot("Bot", symbol, difficulty, strategy=strategy)
+    started = time.perf_counter()
+    move = bot.make_move(board)
+    return move, time.perf_counter() - started
+
+
+class GameServer:
+    def __init__(self, workers: Optional[int] = None, max_pending_moves: int = 256) -> None:
+        self._resources = load_engine_resources()
+        # Strategie di calcolo in processi separati (niente GIL); Ollama è I/O e va nei thread
+        self._cpu_pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self._io_pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="ollama")
+        self._move_slots = asyncio.Semaphore(max_pending_moves)
+        self.connections = 0
+        self.games_started = 0
+        self._metrics_observer = MetricsObserver()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        session: Dict[str, Any] = {"game": None}
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # riga oltre il limite dello StreamReader
+                    await self._send(writer, {"type": "error", "message": "request too long"})
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    await self._send(writer, {"type": "error", "message": "invalid JSON"})
+                    continue
+                if request.get("op") == "quit":
+                    break
+                # Una richiesta alla volta per connessione: finché la risposta non è stata inviata
+                # (drain) non si legge la successiva, così un client veloce non accumula lavoro
+                await self._send(writer, await self._dispatch(session, request))
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionResetError, BrokenPipeError):
+                pass
+
+    async def _send(self, writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+        writer.write(json.dumps(message).encode("utf-8") + b"\n")
+        await writer.drain()
+
+    async def _dispatch(self, session: Dict[str, Any], request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "new":
+            return await self._new_game(session, request)
+        if op == "move":
+            return await self._human_move(session, request)
+        return {"type": "error", "message": f"unknown op: {op}"}
+
+    async def _new_game(self, session: Dict[str, Any], request: Dict[str, Any]) -> Dict[str, Any]:
+        symbol = request.get("symbol", HUMAN_SYMBOL)
+        difficulty = request.get("difficulty", "facile")
+        if symbol not in (HUMAN_SYMBOL, AI_SYMBOL) or difficulty not in BOT_DIFFICULTIES:
+            return {"type": "error", "message": "invalid symbol or difficulty"}
+        try:
+            dims = int(request.get("width", 3)), int(request.get("height", 3)), int(request.get("win_length", 3))
+            # Il tabellone si costruisce nel ciclo degli eventi: dimensioni limitate come nell'interfaccia web
+            if max(dims) > MAX_BOARD_SIDE:
+                return {"type": "error", "message": f"board sides and win_length must be at most {MAX_BOARD_SIDE}"}
+            board = Board(*dims)
+        except (TypeError, ValueError) as e:
+            return {"type": "error", "message": str(e)}
+        bot_symbol = AI_SYMBOL if symbol == HUMAN_SYMBOL else HUMAN_SYMBOL
+        human = HumanPlayer(str(request.get("name", "Giocatore")), symbol)
+        bot = self._resources.create_bot("Bot", bot_symbol, difficulty)
+        game = Game(human, bot, board)
+        game.attach(self._metrics_observer)
+        game.initialize_turn()
+        session["game"] = game
+        self.games_started += 1
+        if game.current_player_obj is bot:
+            await self._bot_move(game)
+        return self._state(game)
+
+    async def _human_move(self, session: Dict[str, Any], request: Dict[str, Any]) -> Dict[str, Any]:
+        game: Optional[Game] = session["game"]
+        if game is None:
+            return {"type": "error", "message": "no game in progress"}
+        if game.current_player_obj is not game.player1:
+            return {"type": "error", "message": "not your turn"}
+        try:
+            row, col = int(request["row"]), int(request["col"])
+        except (KeyError, TypeError, ValueError):
+            return {"type": "error", "message": "row and col are required"}
+        if not game.play_move(row, col):
+            return {"type": "error", "message": "invalid move"}
+        if not game.is_over():
+            await self._bot_move(game)
+        return self._state(game)
+
+    async def _bot_move(self, game: Game) -> None:
+        bot: BotPlayer = game.player2
+        board = game.board
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        async with self._move_slots:  # limite globale di mosse del bot in calcolo
+            if bot._difficulty == "difficile":
+                move = await loop.run_in_executor(self._io_pool, bot.make_move, board.copy())
+            else:
+                dims = (board.get_width(), board.get_height(), board.get_win_length())
+                move, seconds = await loop.run_in_executor(self._cpu_pool, _compute_move, bot._difficulty,
+                                                           bot.get_symbol(), board.get_grid(), dims)
+                MOVE_SECONDS.observe(seconds, strategy=type(bot._strategy).__name__)
+        BOT_MOVE_SECONDS.observe(loop.time() - started, difficulty=bot._difficulty)
+        if move is None or not game.play_move(move[0], move[1]):
+            # La partita non deve restare ferma sul turno del bot: si gioca una mossa legale a caso
+            logger.warning("bot %s produced an invalid move: %s; playing a random legal move", bot._difficulty, move)
+            legal = game.legal_moves()
+            if legal:
+                game.play_move(*random.choice(legal))
+
+    def _state(self, game: Game) -> Dict[str, Any]:
+        current = game.current_player_obj
+        last_move = game.board.get_last_move()
+        return {
+            "type": "state",
+            "board": game.board.get_grid(),
+            "turn": current.get_symbol() if current else None,
+            "last_move": list(last_move) if last_move else None,
+            "result": game.check_game_over(),
+        }
+
+    def close(self) -> None:
+        self._cpu_pool.shutdown(wait=False, cancel_futures=True)
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def serve(host: str, port: int, workers: Optional[int], backlog: int = 1024) -> None:
+    game_server = GameServer(workers)
+    server = await asyncio.start_server(game_server.handle_connection, host, port,
+                                        limit=MAX_LINE_BYTES, backlog=backlog)
+    addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    logger.info("Server del tris in ascolto su %s", addresses)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        game_server.close()
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Server del tris: molte partite in un solo processo.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="processi per le mosse del bot")
+    parser.add_argument("--backlog", type=int, default=1024, help="connessioni in attesa di accept")
+    parser.add_argument("--metrics-port", type=int, default=None, help="porta HTTP per /metrics e /metrics.json")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.metrics_port is not None:
+        serve_metrics(args.metrics_port, args.host)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.backlog))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional, Set, Tuple, Union
+from bitboard import BitBoard
+from board import Board
+from bot_player import BotPlayer, MoveStrategy
+from constants import AI_SYMBOL, HUMAN_SYMBOL
+from game import Game
+from game_log import MAX_CELLS, GameLogWriter, GameRecorder
+from metrics import MetricsObserver, get_registry
+from profiling import add_profile_arguments, profiled, single_process_when_profiling
+
+# Una strategia si indica con il nome della difficoltà ("medio") oppure con un'istanza di MoveStrategy
+StrategySpec = Union[str, MoveStrategy]
+
+
+@dataclass
+class SimulationStats:
+    games: int = 0
+    wins_a: int = 0
+    wins_b: int = 0
+    draws: int = 0
+    total_moves: int = 0
+    lengths: Dict[int, int] = field(default_factory=dict)  # lunghezza partita -> numero di partite
+    metrics: Dict[str, dict] = field(default_factory=dict)  # metriche raccolte dallo shard (vedi metrics.drain)
+
+    def record(self, result: int, moves: int) -> None:
+        self.games += 1
+        if result > 0:
+            self.wins_a += 1
+        elif result < 0:
+            self.wins_b += 1
+        else:
+            self.draws += 1
+        self.total_moves += moves
+        self.lengths[moves] = self.lengths.get(moves, 0) + 1
+
+    def merge(self, other: "SimulationStats") -> None:
+        self.games += other.games
+        self.wins_a += other.wins_a
+        self.wins_b += other.wins_b
+        self.draws += other.draws
+        self.total_moves += other.total_moves
+        for moves, count in other.lengths.items():
+            self.lengths[moves] = self.lengths.get(moves, 0) + count
+
+    def summary(self) -> str:
+        if not self.games:
+            return "no games"
+        return (f"games={self.games} A={self.wins_a} ({self.wins_a / self.games:.1%}) "
+                f"B={self.wins_b} ({self.wins_b / self.games:.1%}) "
+                f"draws={self.draws} ({self.draws / self.games:.1%}) "
+                f"avg_len={self.total_moves / self.games:.2f} "
+                f"len=[{min(self.lengths)}..{max(self.lengths)}]")
+
+
+def make_bot(name: str, symbol: str, spec: StrategySpec) -> BotPlayer:
+    if isinstance(spec, str):
+        return BotPlayer(name, symbol, difficulty=spec)
+    return BotPlayer(name, symbol, strategy=spec)
+
+
+_metrics_observer = MetricsObserver()
+
+
+def play_game(bot_a: BotPlayer, bot_b: BotPlayer, board: Board, rng: random.Random,
+              recorder: Optional[GameRecorder] = None, first: Optional[BotPlayer] = None) -> Tuple[int, int]:
+    # Gioca una partita senza interfaccia: +1 vince A, -1 vince B, 0 pareggio; più il numero di mosse
+    board.reset()
+    game = Game(bot_a, bot_b, board, rng)
+    game.attach(_metrics_observer)
+    if recorder is not None:
+        game.attach(recorder)
+    game.initialize_turn(first)
+    while True:
+        current = game.current_player_obj
+        move = current.make_move(board)
+        if move is None or not game.play_move(move[0], move[1]):
+            # Una mossa illegale è una sconfitta a tavolino per chi l'ha giocata
+            return (-1 if current is bot_a else 1), len(game.moves)
+        result = game.check_game_over()
+        if result:
+            if result == "draw":
+                return 0, len(game.moves)
+            return (1 if result == bot_a.get_symbol() else -1), len(game.moves)
+
+
+def run_shard(spec_a: StrategySpec, spec_b: StrategySpec, games: int, seed: int,
+              dims: Tuple[int, int, int] = (3, 3, 3), bitboard: bool = False,
+              record_dir: Optional[str] = None) -> SimulationStats:
+    # Ogni shard ha il proprio seed: anche le strategie che usano il modulo random diventano riproducibili
+    random.seed(seed)
+    rng = random.Random(seed)
+    bot_a = make_bot("A", HUMAN_SYMBOL, spec_a)
+    bot_b = make_bot("B", AI_SYMBOL, spec_b)
+    board = BitBoard(*dims) if bitboard else Board(*dims)
+    stats = SimulationStats()
+    writer = GameLogWriter(record_dir) if record_dir else None
+    recorder = GameRecorder(writer) if writer else None
+    try:
+        for _ in range(games):
+            result, moves = play_game(bot_a, bot_b, board, rng, recorder)
+            stats.record(result, moves)
+    finally:
+        if writer:
+            writer.close()
+    stats.metrics = get_registry().drain()  # il processo principale le somma al proprio registro
+    return stats
+
+
+def simulate(spec_a: StrategySpec, spec_b: StrategySpec, games: int, workers: Optional[int] = None,
+             shard_size: int = 1000, seed: int = 0, dims: Tuple[int, int, int] = (3, 3, 3),
+             bitboard: bool = False, record_dir: Optional[str] = None) -> Iterator[SimulationStats]:
+    # Restituisce le statistiche aggregate dopo ogni shard completato (in streaming).
+    # Gli shard in volo sono limitati, così anche milioni di partite usano memoria costante.
+    if record_dir and dims[0] * dims[1] > MAX_CELLS:
+        raise ValueError(f"Il formato registrato supporta tabelloni fino a {MAX_CELLS} celle.")
+    workers = workers or os.cpu_count() or 1
+    shards = [(index, min(shard_size, games - start)) for index, start in enumerate(range(0, games, shard_size))]
+    total = SimulationStats()
+
+    if workers == 1:
+        for index, size in shards:
+            shard = run_shard(spec_a, spec_b, size, seed + index, dims, bitboard, record_dir)
+            get_registry().merge(shard.metrics)
+            total.merge(shard)
+            yield total
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Set[Future] = set()
+        queue = iter(shards)
+        while True:
+            for index, size in queue:
+                pending.add(executor.submit(run_shard, spec_a, spec_b, size, seed + index, dims, bitboard, record_dir))
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                shard = future.result()
+                get_registry().merge(shard.metrics)
+                total.merge(shard)
+                yield total
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Partite bot contro bot senza interfaccia.")
+    parser.add_argument("--a", default="medio", help="difficoltà del bot A")
+    parser.add_argument("--b", default="facile", help="difficoltà del bot B")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--shard-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size", default="3x3", help="larghezza x altezza, es. 15x15")
+    parser.add_argument("--win", type=int, default=3, help="simboli in fila per vincere")
+    parser.add_argument("--bitboard", action="store_true", help="usa BitBoard al posto di Board")
+    parser.add_argument("--record", metavar="DIR", help="registra le partite in formato binario in questa cartella")
+    parser.add_argument("--metrics", metavar="PATH", help="scrive le metriche a fine simulazione (.json oppure testo Prometheus)")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    single_process_when_profiling(args)
+
+    width, height = map(int, args.size.lower().split("x"))
+    if args.record and width * height > MAX_CELLS:
+        parser.error(f"--record supporta tabelloni fino a {MAX_CELLS} celle")
+    start = time.perf_counter()
+    stats = SimulationStats()
+    with profiled(args.profile, args.profile_top):
+        for stats in simulate(args.a, args.b, args.games, args.workers, args.shard_size, args.seed,
+                              (width, height, args.win), args.bitboard, args.record):
+            elapsed = time.perf_counter() - start
+            print(f"[{elapsed:7.2f}s] {stats.summary()} ({stats.games / elapsed:.0f} games/s)", file=sys.stderr)
+    print(stats.summary())
+    if args.metrics:
+        get_registry().write(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import random
+import threading
+from collections import ChainMap
+from types import MappingProxyType
+from typing import Dict, List, Mapping, MutableMapping, Optional, Tuple
+from board import Board
+from bitboard import FULL_MASK, _WINNING
+from bot_player import BotPlayer, MediumMoveStrategy, MoveStrategy
+from constants import EMPTY_CELL
+from symmetry import canonical_3x3
+
+# Tabella di trasposizione condivisa: forma canonica (mie, avversarie) -> punteggio negamax
+# dal punto di vista di chi deve muovere. Vittoria = celle libere + 1, sconfitta = -(celle libere + 1)
+_table: Optional[Mapping[Tuple[int, int], int]] = None
+_table_lock = threading.Lock()
+
+
+def _negamax(mine: int, theirs: int, table: MutableMapping[Tuple[int, int], int]) -> int:
+    key, _ = canonical_3x3(mine, theirs)
+    cached = table.get(key)
+    if cached is not None:
+        return cached
+
+    occupied = mine | theirs
+    empty = ~occupied & FULL_MASK
+    free_cells = bin(empty).count("1")
+    if _WINNING[theirs]:
+        score = -(free_cells + 1)  # l'avversario ha appena chiuso un tris
+    elif not empty:
+        score = 0
+    else:
+        score = -10
+        while empty:
+            bit = empty & -empty
+            empty ^= bit
+            child = -_negamax(theirs, mine | bit, table)
+            if child > score:
+                score = child
+    table[key] = score
+    return score
+
+
+def get_table() -> Mapping[Tuple[int, int], int]:
+    # Risolve l'intero albero una sola volta per processo (765 posizioni canoniche);
+    # la tabella è in sola lettura, quindi si può condividere fra thread e sessioni
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                table: Dict[Tuple[int, int], int] = {}
+                _negamax(0, 0, table)
+                _table = MappingProxyType(table)
+    return _table
+
+
+def evaluate(mine: int, theirs: int) -> int:
+    table = get_table()
+    key, _ = canonical_3x3(mine, theirs)
+    if key in table:
+        return table[key]
+    # Posizione non raggiungibile giocando (es. tabellone impostato a mano): la risolviamo
+    # senza toccare la tabella condivisa
+    return _negamax(mine, theirs, ChainMap({}, table))
+
+
+def grid_to_bits(grid: List[List[str]], symbol: str) -> Tuple[int, int]:
+    mine = 0
+    theirs = 0
+    for r in range(3):
+        for c in range(3):
+            cell = grid[r][c]
+            if cell == EMPTY_CELL:
+                continue
+            if cell == symbol:
+                mine |= 1 << (r * 3 + c)
+            else:
+                theirs |= 1 << (r * 3 + c)
+    return mine, theirs
+
+
+class PerfectMoveStrategy(MoveStrategy):
+    def get_move(self, board: Board, bot: BotPlayer) -> Optional[Tuple[int, int]]:
+        if (board.get_width(), board.get_height(), board.get_win_length()) != (3, 3, 3):
+            # La tabella copre solo il tris classico
+            return MediumMoveStrategy().get_move(board, bot)
+
+        mine, theirs = grid_to_bits(board.get_grid(), bot.get_symbol())
+        empty = ~(mine | theirs) & FULL_MASK
+        if not empty:
+            return None
+
+        best_score = -10
+        best_moves: List[Tuple[int, int]] = []
+        for index in range(9):
+            bit = 1 << index
+            if not empty & bit:
+                continue
+            score = -evaluate(theirs, mine | bit)
+            if score > best_score:
+                best_score = score
+                best_moves = [divmod(index, 3)]
+            elif score == best_score:
+                best_moves.append(divmod(index, 3))
+        return random.choice(best_moves)
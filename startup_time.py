@@ -0,0 +1,95 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Tempo di avvio a freddo delle modalità senza interfaccia web: ogni misura è un interprete nuovo
+# che importa il modulo d'ingresso. Controlla anche che non vengano caricate dipendenze pesanti
+# che quelle modalità non usano (Streamlit, requests, NumPy).
+
+TARGETS: Dict[str, str] = {
+    "console": "console_game",
+    "simulate": "simulate",
+    "tournament": "tournament",
+    "server": "server",
+    "engine": "engine",
+}
+FORBIDDEN_MODULES: Tuple[str, ...] = ("streamlit", "requests", "numpy")
+
+_PROBE = (
+    "import sys, time; start = time.perf_counter(); import {module}; elapsed = time.perf_counter() - start; "
+    "print(elapsed); print(','.join(m for m in {forbidden!r} if m in sys.modules))"
+)
+
+
+def measure_import(module: str, runs: int) -> Tuple[List[float], List[float], List[str]]:
+    # Restituisce i tempi totali del processo, i tempi del solo import e i moduli vietati caricati
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = _PROBE.format(module=module, forbidden=FORBIDDEN_MODULES)
+    totals: List[float] = []
+    imports: List[float] = []
+    loaded: List[str] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", code], cwd=here, check=True,
+                                capture_output=True, text=True).stdout.splitlines()
+        totals.append(time.perf_counter() - start)
+        imports.append(float(output[0]))
+        loaded = [name for name in output[1].split(",") if name] if len(output) > 1 else []
+    return totals, imports, loaded
+
+
+def slowest_imports(module: str, top: int) -> List[Tuple[int, str]]:
+    # I moduli più costosi secondo -X importtime (tempo cumulativo in microsecondi)
+    here = os.path.dirname(os.path.abspath(__file__))
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=here,
+                            check=True, capture_output=True, text=True).stderr
+    rows: List[Tuple[int, str]] = []
+    for line in stderr.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # intestazione o righe estranee
+        name = fields[2].strip()
+        if name != module:
+            rows.append((int(fields[1]), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tempo di avvio a freddo delle modalità senza interfaccia.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=5, help="moduli più lenti da mostrare per ogni modalità")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="tempo mediano massimo per l'import; se superato il comando termina con codice 1")
+    parser.add_argument("targets", nargs="*", help=f"modalità da misurare tra {', '.join(TARGETS)} (default: tutte)")
+    args = parser.parse_args(argv)
+    unknown = [target for target in args.targets if target not in TARGETS]
+    if unknown:
+        parser.error(f"modalità sconosciute: {', '.join(unknown)}")
+
+    baseline, _, _ = measure_import("sys", args.runs)
+    print(f"{'interpreter':12s} {statistics.median(baseline) * 1000:8.1f} ms (python -c 'import sys')")
+    failed = False
+    for target in args.targets or list(TARGETS):
+        module = TARGETS[target]
+        totals, imports, loaded = measure_import(module, args.runs)
+        import_ms = statistics.median(imports) * 1000
+        line = (f"{target:12s} {statistics.median(totals) * 1000:8.1f} ms total, "
+                f"{import_ms:7.1f} ms import {module}")
+        if loaded:
+            line += f"  LOADS {', '.join(loaded)}"
+            failed = True
+        if args.budget_ms is not None and import_ms > args.budget_ms:
+            line += "  OVER BUDGET"
+            failed = True
+        print(line)
+        for cumulative, name in slowest_imports(module, args.top):
+            print(f"{'':12s} {cumulative / 1000:8.1f} ms  {name}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
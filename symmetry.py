@@ -0,0 +1,63 @@
+from typing import List, Tuple
+
+# Le 8 simmetrie del quadrato (rotazioni e riflessioni) come permutazioni degli indici di cella.
+# Per la permutazione p, la cella di indice i finisce nella cella p[i].
+
+
+def square_symmetries(size: int) -> List[Tuple[int, ...]]:
+    last = size - 1
+    mappings = (
+        lambda r, c: (r, c),                   # identità
+        lambda r, c: (c, last - r),            # rotazione 90°
+        lambda r, c: (last - r, last - c),     # rotazione 180°
+        lambda r, c: (last - c, r),            # rotazione 270°
+        lambda r, c: (r, last - c),            # riflessione orizzontale
+        lambda r, c: (last - r, c),            # riflessione verticale
+        lambda r, c: (c, r),                   # diagonale principale
+        lambda r, c: (last - c, last - r),     # antidiagonale
+    )
+    permutations: List[Tuple[int, ...]] = []
+    for mapping in mappings:
+        permutation = []
+        for index in range(size * size):
+            r, c = mapping(*divmod(index, size))
+            permutation.append(r * size + c)
+        permutations.append(tuple(permutation))
+    return permutations
+
+
+def invert(permutation: Tuple[int, ...]) -> Tuple[int, ...]:
+    inverse = [0] * len(permutation)
+    for index, target in enumerate(permutation):
+        inverse[target] = index
+    return tuple(inverse)
+
+
+def permute_bits(bits: int, permutation: Tuple[int, ...]) -> int:
+    result = 0
+    for index, target in enumerate(permutation):
+        if (bits >> index) & 1:
+            result |= 1 << target
+    return result
+
+
+SYMMETRIES_3X3: List[Tuple[int, ...]] = square_symmetries(3)
+
+# Per il 3x3 le trasformazioni delle bitboard sono tabelle da 512 elementi, così la forma
+# canonica costa 16 accessi a tupla invece di 8 permutazioni bit a bit
+_TABLES_3X3: List[Tuple[int, ...]] = [
+    tuple(permute_bits(bits, permutation) for bits in range(512)) for permutation in SYMMETRIES_3X3
+]
+
+
+def canonical_3x3(mine: int, theirs: int) -> Tuple[Tuple[int, int], int]:
+    # Restituisce la coppia di bitboard minima fra le 8 simmetriche e l'indice della simmetria usata
+    best = (mine, theirs)
+    best_index = 0
+    for index in range(1, 8):
+        table = _TABLES_3X3[index]
+        candidate = (table[mine], table[theirs])
+        if candidate < best:
+            best = candidate
+            best_index = index
+    return best, best_index
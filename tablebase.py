@@ -0,0 +1,291 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+from board import Board, winning_lines
+from bot_player import BotPlayer, MoveStrategy
+from constants import EMPTY_CELL
+from profiling import add_profile_arguments, profiled, single_process_when_profiling
+
+# Tablebase: il risultato esatto di ogni posizione di un tabellone piccolo (fino a 16 celle),
+# calcolato offline e letto con mmap.
+#
+# Le posizioni sono relative a chi deve muovere: cifra 0 = vuota, 1 = chi muove, 2 = avversario.
+# L'indice è il numero in base 3 con la cella i come cifra di peso 3^i, quindi ogni tabellone ha
+# esattamente un indice in [0, 3^celle) e viceversa.
+#
+# Formato del file:
+#   intestazione "<4sBBBBQ": "TBAS" | versione | larghezza | altezza | simboli in fila | posizioni
+#   risultati: 2 bit per posizione (4 per byte, prima posizione nei bit bassi)
+#   distanze: 1 byte per posizione, mosse alla fine della partita con gioco perfetto
+
+MAGIC: bytes = b"TBAS"
+VERSION: int = 1
+_HEADER = struct.Struct("<4sBBBBQ")
+
+# Risultato per chi deve muovere; UNKNOWN = posizione impossibile (chi muove ha già un tris)
+UNKNOWN, WIN, LOSS, DRAW = 0, 1, 2, 3
+MAX_CELLS: int = 16
+_CHUNK: int = 1 << 20
+
+
+def tablebase_path(directory: str, width: int, height: int, win_length: int) -> str:
+    return os.path.join(directory, f"tb-{width}x{height}x{win_length}.bin")
+
+
+def default_directory() -> str:
+    return os.environ.get("TABLEBASE_DIR", "tablebases")
+
+
+# --- Generazione (NumPy, solo offline) ---
+
+def _work_paths(output: str) -> Tuple[str, str, str]:
+    return output + ".values.tmp", output + ".distances.tmp", output + ".stones.tmp"
+
+
+def _count_chunk(output: str, cells: int, start: int, stop: int) -> None:
+    # Pietre per posizione, 255 se la posizione non è raggiungibile: ogni strato poi seleziona
+    # le sue posizioni senza decodificare di nuovo tutti gli indici
+    import numpy as np
+    stones = np.memmap(_work_paths(output)[2], dtype=np.uint8, mode="r+", shape=(3 ** cells,))
+    powers = 3 ** np.arange(cells, dtype=np.int64)
+    digits = (np.arange(start, stop, dtype=np.int64)[:, None] // powers) % 3
+    movers = (digits == 1).sum(axis=1)
+    opponents = (digits == 2).sum(axis=1)
+    # Chi muove ha tante pietre quante l'avversario o una in meno
+    reachable = (movers == opponents) | (movers + 1 == opponents)
+    stones[start:stop] = np.where(reachable, movers + opponents, 255)
+    stones.flush()
+
+
+def _solve_chunk(output: str, dims: Tuple[int, int, int], stones: int, start: int, stop: int) -> int:
+    # Risolve le posizioni con stones pietre nell'intervallo [start, stop). Le posizioni con una
+    # pietra in più sono già risolte: ogni strato dipende solo dal successivo (analisi retrograda).
+    import numpy as np
+    width, height, win_length = dims
+    cells = width * height
+    total = 3 ** cells
+    values_path, distances_path, stones_path = _work_paths(output)
+    values = np.memmap(values_path, dtype=np.uint8, mode="r+", shape=(total,))
+    distances = np.memmap(distances_path, dtype=np.uint8, mode="r+", shape=(total,))
+    powers = 3 ** np.arange(cells, dtype=np.int64)
+
+    layer = np.memmap(stones_path, dtype=np.uint8, mode="r", shape=(total,))[start:stop]
+    indices = start + np.flatnonzero(layer == stones).astype(np.int64)
+    if not len(indices):
+        return 0
+    digits = ((indices[:, None] // powers) % 3).astype(np.int8)
+
+    lines = np.array(winning_lines(width, height, win_length), dtype=np.intp)
+    on_lines = digits[:, lines]
+    mover_line = (on_lines == 1).all(axis=2).any(axis=1)
+    opponent_line = (on_lines == 2).all(axis=2).any(axis=1)
+
+    result = np.full(len(indices), UNKNOWN, dtype=np.uint8)
+    distance = np.zeros(len(indices), dtype=np.uint8)
+    result[opponent_line & ~mover_line] = LOSS  # l'avversario ha appena chiuso un tris
+    open_positions = ~mover_line & ~opponent_line
+    if stones == cells:
+        result[open_positions] = DRAW
+    elif open_positions.any():
+        open_digits = digits[open_positions]
+        # Il figlio visto da chi muove dopo: i ruoli si scambiano e la nuova pietra è "avversario"
+        swapped = np.where(open_digits == 0, 0, 3 - open_digits).astype(np.int64) @ powers
+        empty = open_digits == 0
+        children = np.where(empty, swapped[:, None] + 2 * powers[None, :], 0)
+        child_values = np.where(empty, values[children], UNKNOWN)
+        child_distances = distances[children].astype(np.int16)
+
+        wins = child_values == LOSS
+        draws = (child_values == DRAW).any(axis=1)
+        has_win = wins.any(axis=1)
+        win_distance = np.where(wins, child_distances, 255).min(axis=1) + 1
+        loss_distance = np.where(empty, child_distances, 0).max(axis=1) + 1
+        result[open_positions] = np.where(has_win, WIN, np.where(draws, DRAW, LOSS))
+        distance[open_positions] = np.where(has_win, win_distance,
+                                            np.where(draws, cells - stones, loss_distance))
+
+    values[indices] = result
+    distances[indices] = distance
+    values.flush()
+    distances.flush()
+    return len(indices)
+
+
+def generate(dims: Tuple[int, int, int], output: str, workers: Optional[int] = None,
+             progress: bool = True) -> None:
+    import numpy as np
+    width, height, win_length = dims
+    Board(width, height, win_length)  # stesse validazioni del tabellone
+    cells = width * height
+    if cells > MAX_CELLS:
+        raise ValueError(f"Tablebase supportate fino a {MAX_CELLS} celle.")
+    total = 3 ** cells
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    work_paths = _work_paths(output)
+    values_path, distances_path, _ = work_paths
+    for path in work_paths:
+        np.memmap(path, dtype=np.uint8, mode="w+", shape=(total,)).flush()
+
+    started = time.perf_counter()
+    ranges = [(start, min(start + _CHUNK, total)) for start in range(0, total, _CHUNK)]
+    try:
+        # Con un solo worker si lavora nel processo principale, dove lo vede anche --profile
+        with ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext() as executor:
+            run = executor.map if executor is not None else map
+            list(run(_count_chunk, *zip(*[(output, cells, start, stop) for start, stop in ranges])))
+            for stones in range(cells, -1, -1):
+                solved = sum(run(_solve_chunk, *zip(*[(output, dims, stones, start, stop)
+                                                      for start, stop in ranges])))
+                if progress:
+                    print(f"[{time.perf_counter() - started:7.2f}s] {stones:2d} pietre: {solved} posizioni",
+                          file=sys.stderr)
+
+        values = np.memmap(values_path, dtype=np.uint8, mode="r", shape=(total,))
+        padded = np.zeros(-(-total // 4) * 4, dtype=np.uint8)
+        padded[:total] = values
+        quads = padded.reshape(-1, 4)
+        packed = quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)
+        temporary = output + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, width, height, win_length, total))
+            f.write(packed.tobytes())
+            f.write(np.memmap(distances_path, dtype=np.uint8, mode="r", shape=(total,)).tobytes())
+        del values
+        os.replace(temporary, output)  # chi legge vede il file vecchio o quello completo
+    finally:
+        for path in work_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# --- Lettura (solo libreria standard) ---
+
+class Tablebase:
+    # File mappato in memoria in sola lettura: nessun caricamento iniziale, e le pagine lette
+    # stanno nella page cache del sistema, condivise da tutti i processi che aprono lo stesso file
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, width, height, win_length, total = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: non è una tablebase valida")
+        self.dims: Tuple[int, int, int] = (width, height, win_length)
+        self._powers: List[int] = [3 ** i for i in range(width * height)]
+        self._values_offset = _HEADER.size
+        self._distances_offset = _HEADER.size + (total + 3) // 4
+        if len(self._mmap) != self._distances_offset + total:
+            raise ValueError(f"{path}: file troncato")
+
+    def probe_index(self, index: int) -> Tuple[int, int]:
+        packed = self._mmap[self._values_offset + (index >> 2)]
+        return (packed >> ((index & 3) * 2)) & 3, self._mmap[self._distances_offset + index]
+
+    def index(self, grid: List[List[str]], mover_symbol: str) -> int:
+        index = 0
+        for i, cell in enumerate(cell for row in grid for cell in row):
+            if cell != EMPTY_CELL:
+                index += self._powers[i] * (1 if cell == mover_symbol else 2)
+        return index
+
+    def probe(self, board: Board, mover_symbol: str) -> Tuple[int, int]:
+        # Risultato e distanza per chi deve muovere con mover_symbol
+        return self.probe_index(self.index(board.get_grid(), mover_symbol))
+
+    def scored_moves(self, board: Board, mover_symbol: str) -> List[Tuple[Tuple[int, int], int, int]]:
+        # Per ogni mossa legale: (mossa, risultato per chi la gioca, distanza)
+        width = board.get_width()
+        # Dopo la mossa muove l'avversario: i ruoli delle cifre si scambiano
+        base = 0
+        for i, cell in enumerate(cell for row in board.get_grid() for cell in row):
+            if cell != EMPTY_CELL:
+                base += self._powers[i] * (2 if cell == mover_symbol else 1)
+        scored = []
+        for r, c in board.get_available_moves():
+            value, distance = self.probe_index(base + 2 * self._powers[r * width + c])
+            outcome = WIN if value == LOSS else LOSS if value == WIN else value
+            scored.append(((r, c), outcome, distance + 1))
+        return scored
+
+
+_tablebases: Dict[str, Optional[Tablebase]] = {}
+_tablebases_lock = threading.Lock()
+
+
+def open_tablebase(width: int, height: int, win_length: int, directory: Optional[str] = None) -> Optional[Tablebase]:
+    # Una mappatura per file e processo; None se la tablebase non è stata generata
+    path = tablebase_path(directory or default_directory(), width, height, win_length)
+    with _tablebases_lock:
+        if path not in _tablebases:
+            _tablebases[path] = Tablebase(path) if os.path.exists(path) else None
+        return _tablebases[path]
+
+
+class TablebaseMoveStrategy(MoveStrategy):
+    # Gioco perfetto in O(1) per mossa leggendo la tablebase; vince il prima possibile, perde il
+    # più tardi possibile. Senza tablebase per queste dimensioni si usa la strategia di riserva.
+    def __init__(self, directory: Optional[str] = None, fallback: Optional[MoveStrategy] = None) -> None:
+        self.directory = directory
+        self.fallback = fallback
+
+    def get_move(self, board: Board, bot: BotPlayer) -> Optional[Tuple[int, int]]:
+        tablebase = open_tablebase(board.get_width(), board.get_height(), board.get_win_length(), self.directory)
+        if tablebase is None:
+            return self._fallback().get_move(board, bot)
+        scored = tablebase.scored_moves(board, bot.get_symbol())
+        if not scored:
+            return None
+
+        def preference(item: Tuple[Tuple[int, int], int, int]) -> Tuple[int, int]:
+            _, outcome, distance = item
+            if outcome == WIN:
+                return (2, -distance)
+            if outcome == DRAW:
+                return (1, 0)
+            return (0, distance)
+
+        best = max(preference(item) for item in scored)
+        return random.choice([move for move, *rest in scored if preference((move, *rest)) == best])
+
+    def ponder_move(self, board: Board, bot: BotPlayer, cancel: threading.Event) -> Optional[Tuple[int, int]]:
+        if open_tablebase(board.get_width(), board.get_height(), board.get_win_length(), self.directory) is None:
+            return self._fallback().ponder_move(board, bot, cancel)
+        return self.get_move(board, bot)
+
+    def _fallback(self) -> MoveStrategy:
+        if self.fallback is None:
+            from search import AlphaBetaMoveStrategy
+            self.fallback = AlphaBetaMoveStrategy()
+        return self.fallback
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Genera una tablebase con analisi retrograda.")
+    parser.add_argument("--size", default="4x4", help="larghezza x altezza, al massimo 16 celle")
+    parser.add_argument("--win", type=int, default=3, help="simboli in fila per vincere")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output-dir", default=None, help="cartella delle tablebase (default: TABLEBASE_DIR o tablebases/)")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    single_process_when_profiling(args)
+
+    width, height = map(int, args.size.lower().split("x"))
+    output = tablebase_path(args.output_dir or default_directory(), width, height, args.win)
+    with profiled(args.profile, args.profile_top):
+        generate((width, height, args.win), output, args.workers)
+    tablebase = Tablebase(output)
+    value, distance = tablebase.probe_index(0)
+    names = {WIN: "vince chi inizia", LOSS: "perde chi inizia", DRAW: "patta"}
+    print(f"{output}: {os.path.getsize(output)} byte, posizione iniziale: {names.get(value, '?')} in {distance} mosse")
+
+
+if __name__ == "__main__":
+    main()
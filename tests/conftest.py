@@ -0,0 +1,5 @@
+import os
+import sys
+
+# I moduli del gioco stanno nella radice del progetto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,46 @@
+from board import Board
+from game import Game
+from human_player import HumanPlayer
+
+
+class _Recorder:
+    def __init__(self):
+        self.seen = []
+
+    def update(self, subject, event):
+        # Stato della partita visto dall'observer nel momento della notifica
+        self.seen.append((type(event).__name__, subject.is_over(), subject.check_game_over()))
+
+
+def _game():
+    first, second = HumanPlayer("A", "X"), HumanPlayer("B", "O")
+    game = Game(first, second, Board())
+    game.initialize_turn(first=first)
+    recorder = _Recorder()
+    game.attach(recorder)
+    return game, recorder
+
+
+def test_move_played_sees_the_state_after_a_winning_move():
+    game, recorder = _game()
+    for row, col in [(0, 0), (1, 0), (0, 1), (1, 1)]:
+        game.play_move(row, col)
+    recorder.seen.clear()
+    game.play_move(0, 2)
+    assert recorder.seen == [("MovePlayed", True, "X"), ("GameOver", True, "X")]
+
+
+def test_move_played_sees_the_state_after_a_drawing_move():
+    game, recorder = _game()
+    moves = [(0, 0), (1, 1), (0, 2), (0, 1), (2, 1), (1, 0), (1, 2), (2, 2)]
+    for row, col in moves:
+        game.play_move(row, col)
+    recorder.seen.clear()
+    game.play_move(2, 0)
+    assert recorder.seen == [("MovePlayed", True, "draw"), ("GameOver", True, "draw")]
+
+
+def test_ongoing_move_notifies_move_then_turn():
+    game, recorder = _game()
+    game.play_move(1, 1)
+    assert recorder.seen == [("MovePlayed", False, None), ("TurnChanged", False, None)]
@@ -0,0 +1,37 @@
+from board import Board
+from ollama_cache import OllamaMoveCache
+
+
+def _board_after(row: int, col: int) -> Board:
+    board = Board()
+    board.make_move(row, col, "X")
+    return board
+
+
+def test_disabled_cache_loads_and_keeps_nothing(tmp_path):
+    path = str(tmp_path / "moves.json")
+    full = OllamaMoveCache(path=path)
+    full.put("model", "O", _board_after(1, 1), (0, 0))
+    full.put("model", "O", _board_after(0, 0), (1, 1))
+    full.flush()
+    assert len(OllamaMoveCache(path=path)) == 2
+
+    disabled = OllamaMoveCache(max_size=0, path=path)
+    assert len(disabled) == 0
+    disabled.put("model", "O", _board_after(0, 1), (1, 1))
+    assert len(disabled) == 0
+    assert disabled.get("model", "O", _board_after(0, 1)) is None
+    disabled.flush()
+    assert len(OllamaMoveCache(path=path)) == 2  # il file della cache piena resta intatto
+
+
+def test_load_keeps_only_the_most_recent_entries(tmp_path):
+    path = str(tmp_path / "moves.json")
+    full = OllamaMoveCache(path=path)
+    full.put("model", "O", _board_after(1, 1), (0, 0))
+    full.put("model", "O", _board_after(0, 0), (1, 1))
+    full.flush()
+
+    bounded = OllamaMoveCache(max_size=1, path=path)
+    assert len(bounded) == 1
+    assert bounded.get("model", "O", _board_after(0, 0)) == (1, 1)
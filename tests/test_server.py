@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from board import Board
+from bot_player import BotPlayer, MoveStrategy
+from game import Game
+from human_player import HumanPlayer
+from metrics import MOVE_SECONDS
+from server import GameServer, _compute_move
+
+
+class _FixedMoveStrategy(MoveStrategy):
+    def __init__(self, move):
+        self.move = move
+
+    def get_move(self, board, bot):
+        return self.move
+
+
+@pytest.fixture
+def server():
+    game_server = GameServer(workers=1)
+    yield game_server
+    game_server.close()
+
+
+@pytest.mark.parametrize("bad_move", [None, (1, 1), (5, 5)])
+def test_invalid_bot_move_does_not_stall_the_game(server, bad_move):
+    # "difficile" passa dal pool di thread, quindi la strategia finta resta nel processo del test
+    human = HumanPlayer("Anna", "X")
+    bot = BotPlayer("Bot", "O", "difficile", strategy=_FixedMoveStrategy(bad_move))
+    board = Board()
+    game = Game(human, bot, board)
+    game.initialize_turn(first=human)
+    assert game.play_move(1, 1)
+    assert game.current_player_obj is bot
+
+    asyncio.run(server._bot_move(game))
+
+    assert game.current_player_obj is human
+    assert len(game.moves) == 2
+
+
+def test_new_game_rejects_oversized_boards(server):
+    session = {"game": None}
+    reply = asyncio.run(server._new_game(session, {"op": "new", "width": 30000, "height": 30000}))
+    assert reply["type"] == "error"
+    assert session["game"] is None
+
+
+def test_compute_move_returns_the_strategy_time():
+    move, seconds = _compute_move("medio", "O", [["X", "", ""], ["", "", ""], ["", "", ""]], (3, 3, 3))
+    assert move is not None and seconds >= 0
+
+
+def test_pool_moves_are_recorded_in_the_server_registry(server):
+    # La mossa è calcolata in un altro processo: il tempo deve arrivare nel registro del server
+    before = MOVE_SECONDS.count(strategy="MediumMoveStrategy")
+    session = {"game": None}
+    state = asyncio.run(server._new_game(session, {"op": "new", "difficulty": "medio", "symbol": "X"}))
+    row, col = next((r, c) for r, cells in enumerate(state["board"]) for c, cell in enumerate(cells) if not cell)
+    reply = asyncio.run(server._human_move(session, {"op": "move", "row": row, "col": col}))
+    assert reply["type"] == "state"
+    assert MOVE_SECONDS.count(strategy="MediumMoveStrategy") > before
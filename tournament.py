@@ -0,0 +1,302 @@
+import argparse
+import itertools
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from contextlib import ExitStack
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from board import Board
+from bot_player import BotPlayer, HardMoveStrategy, MoveStrategy
+from constants import AI_SYMBOL, BOT_DIFFICULTIES, HUMAN_SYMBOL
+from metrics import get_registry
+from ollama_cache import OllamaMoveCache
+from profiling import add_profile_arguments, profiled, single_process_when_profiling
+from ollama_stub import OllamaStub
+from simulate import make_bot, play_game
+
+# Torneo all'italiana tra strategie. Ogni coppia gioca a blocchi di 4 partite (entrambi i simboli,
+# entrambi gli ordini di inizio) e si ferma appena un test sequenziale (SPRT) decide l'esito.
+
+Pair = Tuple[str, str]
+
+
+def build_strategy(name: str) -> MoveStrategy:
+    # Le strategie lente hanno budget ridotti: in un torneo contano le partite, non la singola mossa
+    if name == "difficile":
+        return HardMoveStrategy()  # interroga un finto Ollama locale, vedi play_blocks
+    if name == "esperto":
+        from search import AlphaBetaMoveStrategy
+        return AlphaBetaMoveStrategy(time_budget=0.05)
+    if name == "mcts":
+        from mcts import MCTSMoveStrategy
+        return MCTSMoveStrategy(playouts=200, workers=1)
+    if name == "tablebase":
+        from search import AlphaBetaMoveStrategy
+        from tablebase import TablebaseMoveStrategy
+        return TablebaseMoveStrategy(fallback=AlphaBetaMoveStrategy(time_budget=0.05))
+    return BotPlayer._select_strategy(name)
+
+
+def play_blocks(name_a: str, name_b: str, blocks: int, seed: int,
+                dims: Tuple[int, int, int] = (3, 3, 3)) -> Tuple[int, int, int]:
+    # Gioca blocks blocchi da 4 partite e restituisce vittorie, pareggi e sconfitte di A
+    random.seed(seed)
+    rng = random.Random(seed)
+    with ExitStack() as stack:
+        stub_url = None
+        if "difficile" in (name_a, name_b):
+            stub_url = stack.enter_context(OllamaStub()).generate_url
+        bots: Dict[Tuple[str, str], BotPlayer] = {}
+        for name, symbol in itertools.product((name_a, name_b), (HUMAN_SYMBOL, AI_SYMBOL)):
+            bot = make_bot(name, symbol, build_strategy(name))
+            if stub_url is not None:
+                bot._ollama_url = stub_url
+                bot._move_cache = OllamaMoveCache()  # niente mosse ricordate da altri processi
+            bots[(name, symbol)] = bot
+        board = Board(*dims)
+        wins = draws = losses = 0
+        for _ in range(blocks):
+            for symbol_a, symbol_b in ((HUMAN_SYMBOL, AI_SYMBOL), (AI_SYMBOL, HUMAN_SYMBOL)):
+                bot_a, bot_b = bots[(name_a, symbol_a)], bots[(name_b, symbol_b)]
+                for first in (bot_a, bot_b):
+                    result, _ = play_game(bot_a, bot_b, board, rng, first=first)
+                    if result > 0:
+                        wins += 1
+                    elif result < 0:
+                        losses += 1
+                    else:
+                        draws += 1
+    return wins, draws, losses
+
+
+def _play_batch(name_a: str, name_b: str, blocks: int, seed: int,
+                dims: Tuple[int, int, int]) -> Tuple[Tuple[int, int, int], Dict[str, dict]]:
+    # play_blocks più le metriche raccolte nel processo che l'ha eseguito
+    outcome = play_blocks(name_a, name_b, blocks, seed, dims)
+    return outcome, get_registry().drain()
+
+
+def expected_score(elo: float) -> float:
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_from_score(score: float) -> float:
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1) + 0.0  # + 0.0: niente "-0" nelle stampe
+
+
+@dataclass
+class SPRT:
+    # SPRT generalizzato (approssimazione normale sul punteggio medio, come nei test dei motori di scacchi).
+    # Due test unilaterali: A più forte di elo_bound, B più forte di elo_bound, o nessuno dei due.
+    elo_bound: float = 20.0
+    alpha: float = 0.05
+    beta: float = 0.05
+
+    @property
+    def lower(self) -> float:
+        return math.log(self.beta / (1 - self.alpha))
+
+    @property
+    def upper(self) -> float:
+        return math.log((1 - self.beta) / self.alpha)
+
+    def llr(self, games: int, mean: float, variance: float, elo0: float, elo1: float) -> float:
+        s0, s1 = expected_score(elo0), expected_score(elo1)
+        # Con sole patte la varianza è nulla: il minimo fa servire qualche decina di partite
+        # prima di dichiarare due strategie equivalenti
+        variance = max(variance, 0.01)
+        return games * (s1 - s0) * (2 * mean - s0 - s1) / (2 * variance)
+
+    def decide(self, games: int, mean: float, variance: float) -> Optional[str]:
+        stronger = self.llr(games, mean, variance, 0.0, self.elo_bound)
+        weaker = self.llr(games, mean, variance, 0.0, -self.elo_bound)
+        if stronger >= self.upper:
+            return ">"
+        if weaker >= self.upper:
+            return "<"
+        if stronger <= self.lower and weaker <= self.lower:
+            return "="
+        return None
+
+
+@dataclass
+class PairResult:
+    a: str
+    b: str
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+    verdict: Optional[str] = None  # ">", "<", "=" dal punto di vista di A, "?" se finiscono le partite
+
+    @property
+    def games(self) -> int:
+        return self.wins + self.draws + self.losses
+
+    @property
+    def score(self) -> float:
+        return (self.wins + 0.5 * self.draws) / self.games if self.games else 0.5
+
+    @property
+    def variance(self) -> float:
+        if not self.games:
+            return 0.0
+        mean = self.score
+        return (self.wins * (1 - mean) ** 2 + self.draws * (0.5 - mean) ** 2 + self.losses * mean ** 2) / self.games
+
+    def elo_interval(self, z: float = 1.96) -> Tuple[float, float, float]:
+        margin = z * math.sqrt(self.variance / self.games) if self.games else 0.5
+        return elo_from_score(self.score), elo_from_score(self.score - margin), elo_from_score(self.score + margin)
+
+    def record(self, wins: int, draws: int, losses: int) -> None:
+        self.wins += wins
+        self.draws += draws
+        self.losses += losses
+
+    def summary(self) -> str:
+        elo, low, high = self.elo_interval()
+        verdict = self.verdict or "…"
+        return (f"{self.a:>10} {verdict} {self.b:<10} +{self.wins} ={self.draws} -{self.losses} "
+                f"({self.games} games) score={self.score:.3f} elo={elo:+.0f} [{low:+.0f}, {high:+.0f}]")
+
+
+def fit_ratings(pairs: Sequence[PairResult], names: Sequence[str], iterations: int = 200) -> Dict[str, float]:
+    # Bradley-Terry (patta = mezza vittoria) con l'algoritmo MM; una patta virtuale per coppia
+    # evita rating infiniti quando una strategia vince tutte le partite
+    wins = {name: 0.0 for name in names}
+    games: Dict[Pair, float] = {}
+    for pair in pairs:
+        wins[pair.a] += pair.wins + 0.5 * pair.draws + 0.5
+        wins[pair.b] += pair.losses + 0.5 * pair.draws + 0.5
+        games[(pair.a, pair.b)] = games.get((pair.a, pair.b), 0.0) + pair.games + 1
+    gamma = {name: 1.0 for name in names}
+    for _ in range(iterations):
+        for name in names:
+            denominator = sum(n / (gamma[a] + gamma[b]) for (a, b), n in games.items() if name in (a, b))
+            if denominator:
+                gamma[name] = wins[name] / denominator
+        norm = math.exp(sum(math.log(g) for g in gamma.values()) / len(gamma))
+        gamma = {name: g / norm for name, g in gamma.items()}
+    return {name: 400 * math.log10(g) for name, g in gamma.items()}
+
+
+def rating_intervals(pairs: Sequence[PairResult], names: Sequence[str], samples: int = 200,
+                     seed: int = 0) -> Dict[str, Tuple[float, float]]:
+    # Intervalli al 95% con bootstrap: si ricampionano i risultati di ogni coppia e si rifà il fit
+    rng = random.Random(seed)
+    fitted: Dict[str, List[float]] = {name: [] for name in names}
+    for _ in range(samples):
+        resampled = []
+        for pair in pairs:
+            outcomes = rng.choices((1, 0, -1), weights=(pair.wins, pair.draws, pair.losses), k=pair.games) if pair.games else []
+            resampled.append(PairResult(pair.a, pair.b, outcomes.count(1), outcomes.count(0), outcomes.count(-1)))
+        for name, rating in fit_ratings(resampled, names, iterations=50).items():
+            fitted[name].append(rating)
+    intervals = {}
+    for name, values in fitted.items():
+        values.sort()
+        intervals[name] = (values[int(0.025 * (len(values) - 1))], values[int(0.975 * (len(values) - 1))])
+    return intervals
+
+
+def tournament(names: Sequence[str], workers: Optional[int] = None, blocks_per_batch: int = 4,
+               max_games: int = 2000, sprt: Optional[SPRT] = None, seed: int = 0,
+               dims: Tuple[int, int, int] = (3, 3, 3)) -> Iterator[Dict[Pair, PairResult]]:
+    # Restituisce lo stato di tutte le coppie dopo ogni lotto completato (in streaming).
+    # Ogni coppia ha al massimo due lotti in volo: una coppia decisa smette subito di occupare il pool.
+    sprt = sprt or SPRT()
+    workers = workers or os.cpu_count() or 1
+    results = {(a, b): PairResult(a, b) for a, b in itertools.combinations(names, 2)}
+    batch_games = blocks_per_batch * 4
+    in_flight: Dict[Pair, int] = {pair: 0 for pair in results}
+    seeds = itertools.count(seed)
+
+    def needs_batch(pair: Pair) -> bool:
+        result = results[pair]
+        return (result.verdict is None and in_flight[pair] < 2
+                and result.games + in_flight[pair] * batch_games < max_games)
+
+    def settle(pair: Pair, batch: Tuple[Tuple[int, int, int], Dict[str, dict]]) -> None:
+        outcome, metrics = batch
+        get_registry().merge(metrics)
+        result = results[pair]
+        result.record(*outcome)
+        if result.verdict is None:
+            result.verdict = sprt.decide(result.games, result.score, result.variance)
+            if result.verdict is None and result.games >= max_games:
+                result.verdict = "?"
+
+    if workers == 1:
+        while any(needs_batch(pair) for pair in results):
+            for pair in results:
+                if needs_batch(pair):
+                    settle(pair, _play_batch(pair[0], pair[1], blocks_per_batch, next(seeds), dims))
+                    yield results
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Dict[Future, Pair] = {}
+        while True:
+            for pair in results:
+                while needs_batch(pair):
+                    future = executor.submit(_play_batch, pair[0], pair[1], blocks_per_batch, next(seeds), dims)
+                    pending[future] = pair
+                    in_flight[pair] += 1
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pair = pending.pop(future)
+                in_flight[pair] -= 1
+                settle(pair, future.result())
+            yield results
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Torneo tra strategie con SPRT e rating Elo.")
+    parser.add_argument("--entrants", nargs="+", default=list(BOT_DIFFICULTIES), choices=BOT_DIFFICULTIES)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--blocks", type=int, default=4, help="blocchi da 4 partite per lotto")
+    parser.add_argument("--max-games", type=int, default=2000, help="partite massime per coppia")
+    parser.add_argument("--elo-bound", type=float, default=20.0, help="differenza Elo che l'SPRT deve distinguere")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size", default="3x3", help="larghezza x altezza, es. 4x4")
+    parser.add_argument("--win", type=int, default=3, help="simboli in fila per vincere")
+    parser.add_argument("--metrics", metavar="PATH", help="scrive le metriche a fine torneo (.json oppure testo Prometheus)")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    single_process_when_profiling(args)
+
+    width, height = map(int, args.size.lower().split("x"))
+    names = list(dict.fromkeys(args.entrants))
+    start = time.perf_counter()
+    results: Dict[Pair, PairResult] = {}
+    with profiled(args.profile, args.profile_top):
+        for results in tournament(names, args.workers, args.blocks, args.max_games,
+                                  SPRT(args.elo_bound, args.alpha, args.beta), args.seed, (width, height, args.win)):
+            decided = sum(1 for result in results.values() if result.verdict)
+            played = sum(result.games for result in results.values())
+            print(f"[{time.perf_counter() - start:7.2f}s] {decided}/{len(results)} pairs decided, {played} games",
+                  file=sys.stderr)
+
+    pairs = list(results.values())
+    for pair in pairs:
+        print(pair.summary())
+    ratings = fit_ratings(pairs, names)
+    intervals = rating_intervals(pairs, names, seed=args.seed)
+    print()
+    for rank, name in enumerate(sorted(names, key=ratings.get, reverse=True), 1):
+        low, high = intervals[name]
+        print(f"{rank}. {name:<10} elo={ratings[name]:+7.1f} [{low:+.0f}, {high:+.0f}]")
+    if args.metrics:
+        get_registry().write(args.metrics)
+
+
+if __name__ == "__main__":
+    main()